@@ -1,19 +1,248 @@
 import time
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Deque, FrozenSet, IO, Iterable, Iterator, Tuple
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field, replace
+import bisect
+import cProfile
+import csv
+import difflib
+import functools
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
 import json
+import os
+import pstats
+import random
+import shutil
+import sqlite3
+import string
+import subprocess
+import sys
+import re
+import tarfile
+import tempfile
+import threading
+import tracemalloc
+import uuid
+import zipfile
+from http.client import responses as HTTP_REASONS
+from urllib.parse import urlsplit
 
 import requests
 import streamlit as st
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+try:  # optional: columnar history export
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:  # optional: sampling profiler for the profiling panel
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:
+    InstrumentProfiler = None
 
 # ----------------- Configuration -----------------
 
 PIPIO_GENERATE_URL = "https://generate.pipio.ai/single-clip"
 PIPIO_JOB_STATUS_URL = "https://generate.pipio.ai/jobs/{job_id}"
+PIPIO_CATALOG_URLS = {
+    "actors": "https://generate.pipio.ai/actors",
+    "voices": "https://generate.pipio.ai/voices",
+}
 
 MAX_POLL_SECONDS = 300
 POLL_INTERVAL_SECONDS = 5
 
+# Local data (video cache, thumbnails, preview proxies)
+PIPIO_DATA_DIR = os.environ.get("PIPIO_DATA_DIR", ".pipio")
+VIDEO_CACHE_DIR = os.path.join(PIPIO_DATA_DIR, "videos")
+MEDIA_DIR = os.path.join(PIPIO_DATA_DIR, "media")
+EXPORT_DIR = os.path.join(PIPIO_DATA_DIR, "exports")
+CATALOG_DIR = os.path.join(PIPIO_DATA_DIR, "catalog")
+
+# Actor/voice catalog cache
+CATALOG_TTL_SECONDS = 6 * 3600
+CATALOG_RETRY_SECONDS = 60
+CATALOG_SUGGESTIONS = 5
+
+# Shared job store (history persisted across sessions)
+JOB_STORE_PATH = os.path.join(PIPIO_DATA_DIR, "jobs.db")
+HISTORY_LIMIT = 50
+IMPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 64 * 1024
+CONFIG_KEYS = {"max_poll_seconds", "poll_interval"}
+
+# Streamed history export
+HISTORY_EXPORT_FIELDS = ["job_id", "status", "timestamp", "actor_id", "voice_id", "video_url", "script"]
+HISTORY_EXPORT_FORMATS = ["jsonl", "csv"] + (["parquet"] if pa is not None else [])
+EXPORT_BATCH_SIZE = 1000
+
+# Post-completion media pipeline (requires ffmpeg on PATH)
+FFMPEG_BIN = shutil.which("ffmpeg")
+MEDIA_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+THUMBNAIL_WIDTH = 320
+PREVIEW_HEIGHT = 240
+PREVIEW_VIDEO_BITRATE = "250k"
+MEDIA_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Local branding (intro/outro clips, watermark, background music)
+FFPROBE_BIN = shutil.which("ffprobe")
+BRANDING_DIR = os.path.join(PIPIO_DATA_DIR, "branding")
+BRANDING_STEPS = ("intro", "outro", "watermark", "bgm")
+BRANDING_ASSET_TYPES = {
+    "intro": ["mp4", "mov", "webm"],
+    "outro": ["mp4", "mov", "webm"],
+    "watermark": ["png"],
+    "bgm": ["mp3", "m4a", "wav", "aac"],
+}
+BRANDING_CRF = 18
+WATERMARK_WIDTH_RATIO = 0.12
+WATERMARK_MARGIN = 24
+WATERMARK_OPACITY = 0.8
+BGM_VOLUME = 0.15
+
+# Rendition fan-out (other formats cropped/scaled locally from a master render)
+RESOLUTION_HEIGHTS = {"1080p": 1080, "720p": 720, "480p": 480}
+RENDITION_CRF = 18
+
+# Bulk video export
+EXPORT_DOWNLOAD_WORKERS = 4
+EXPORT_TTL_SECONDS = 24 * 3600
+EXPORT_BROWSER_MAX_BYTES = 256 * 1024 * 1024
+EXPORT_MANIFEST_FIELDS = ["job_id", "status", "timestamp", "actor_id", "voice_id", "video_url", "file", "error", "script"]
+
+# Request validation (mirrors the options offered in the GENERATE tab)
+ASPECT_RATIOS = ["16:9", "9:16", "1:1", "4:3"]
+RESOLUTIONS = ["1080p", "720p", "480p"]
+FRAME_RATES = ["24", "30", "60"]
+MAX_SCRIPT_CHARS = 5000
+MAX_ID_LENGTH = 128
+EXTRAS_RANGES = {
+    "speakingRate": (0.5, 2.0),
+    "pitch": (0.5, 2.0),
+    "volume": (0.0, 1.5),
+    "backgroundBlur": (0, 100),
+    "brightness": (0.0, 2.0),
+    "contrast": (0.0, 2.0),
+}
+EXTRAS_FLAGS = {"captions"}
+EXTRAS_COLORS = {"backgroundColor"}
+
+# Draft previews
+DRAFT_RESOLUTION = "480p"
+DRAFT_MAX_CHARS = 300
+DRAFT_TTL_SECONDS = 24 * 3600
+
+# Script analysis and duration model
+DEFAULT_WORDS_PER_SECOND = 2.5
+SENTENCE_PAUSE_SECONDS = 0.45
+CLAUSE_PAUSE_SECONDS = 0.2
+PARAGRAPH_PAUSE_SECONDS = 0.6
+CALIBRATION_MIN_SAMPLES = 3
+CALIBRATION_MAX_SAMPLES = 200
+
+# Presets (saved generation settings) and the GENERATE widgets they drive
+RENDER_REUSE_TTL_SECONDS = 24 * 3600
+RENDER_CHECK_TIMEOUT = 10
+PRESET_SETTINGS = ("actor_id", "voice_id", "aspect_ratio", "resolution", "fps", "extras")
+SETTING_WIDGET_DEFAULTS = {
+    "aspect_ratio": "16:9",
+    "resolution": "1080p",
+    "fps": "30",
+    "bg_color": "#000000",
+    "bg_blur": 0,
+    "brightness": 100,
+    "contrast": 100,
+    "speaking_rate": 1.0,
+    "pitch": 1.0,
+    "volume": 100,
+    "enable_captions": False,
+}
+
+# Template campaigns
+CAMPAIGN_MAX_IN_FLIGHT = 4
+CAMPAIGN_OVERRIDE_COLUMNS = ("actor_id", "voice_id")
+CAMPAIGN_PRESET_COLUMN = "preset"
+
+# Render cost model and budgets (credits ~ rendered seconds at 1080p/30fps)
+CREDITS_PER_RENDER_SECOND = 1.0
+RESOLUTION_COST_FACTORS = {"1080p": 1.0, "720p": 0.6, "480p": 0.35}
+FPS_COST_FACTORS = {"24": 0.85, "30": 1.0, "60": 1.8}
+DEFAULT_DAILY_BUDGET = 900.0
+DEFAULT_USER_BUDGET = 300.0
+# Server-side ceilings; the sidebar budgets can only lower them
+MAX_DAILY_BUDGET = float(os.environ.get("PIPIO_MAX_DAILY_BUDGET", DEFAULT_DAILY_BUDGET))
+MAX_USER_BUDGET = float(os.environ.get("PIPIO_MAX_USER_BUDGET", DEFAULT_USER_BUDGET))
+OFF_PEAK_START_HOUR = 22
+OFF_PEAK_END_HOUR = 6
+JOB_PRIORITIES = {"High": 0, "Normal": 1, "Low": 2}
+
+# Scheduled and recurring jobs
+SCHEDULER_TICK_SECONDS = 15
+SCHEDULE_JITTER_SECONDS = 60
+SCHEDULER_MAX_IN_FLIGHT = 4
+SCHEDULE_PREVIEW_RUNS = 3
+SCHEDULE_SCRIPT_FIELDS = ("date", "weekday", "month", "time", "run")
+CRON_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+
+# Profiling
+PROFILE_HISTORY_RUNS = 20
+PROFILE_HISTORY_BYTES = 48 * 1024
+PROFILE_TOP_FUNCTIONS = 25
+MEMORY_TRACE_IDLE_SECONDS = 600
+PROFILE_CAPTURE_MODES = ["off", "cProfile"] + (["pyinstrument"] if InstrumentProfiler is not None else [])
+
+# Per-session memory bounds
+OPEN_VIDEOS_LIMIT = 3
+STALE_SESSION_PREFIXES = ("show_video_",)
+SESSION_OFFLOAD_KEYS = ("soak_report",)
+SESSION_OFFLOAD_BYTES = 64 * 1024
+SESSION_BLOB_TTL_SECONDS = 24 * 3600
+
+# API trace record & replay
+TRACE_DIR = os.path.join(PIPIO_DATA_DIR, "traces")
+TRANSPORT_MODES = ["Live", "Record", "Replay"]
+TRACE_HEADERS = ("Content-Type", "Content-Length", "ETag", "Last-Modified")
+TRACE_REDACTED_FIELDS = {"authorization", "apikey", "api_key", "token", "access_token", "secret", "password", "signature"}
+REPLAY_HOST = "replay.pipio.invalid"
+REPLAY_DEFAULT_COMPRESSION = 60
+REPLAY_MAX_DOWNLOAD_BYTES = 1 << 20
+
+# Upstream health tracking and circuit breaking (per endpoint)
+HEALTH_WINDOW_SECONDS = 120
+HEALTH_MIN_REQUESTS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_SLOW_SECONDS = 20.0
+BREAKER_OPEN_SECONDS = 30
+BREAKER_HALF_OPEN_PROBES = 1
+
+# API key registry (several Pipio accounts)
+KEY_MAX_CONCURRENCY = 4
+KEY_RATE_PER_MINUTE = 120
+KEY_POOL_SIZE = 8
+KEY_SELECTION_POLICIES = ["least-loaded", "round-robin"]
+KEY_IDLE_TTL_SECONDS = 3600
+SHARED_KEYS_TOKEN = os.environ.get("PIPIO_SHARED_KEYS_TOKEN", "")
+
 # Matrix theme colors
 MATRIX_GREEN = "#00FF41"
 MATRIX_DARK_GREEN = "#008F11"
@@ -221,6 +450,179 @@ def apply_matrix_theme():
     """, unsafe_allow_html=True)
 
 
+# ----------------- Request Model -----------------
+
+class PayloadValidationError(ValueError):
+    """Raised when a generation request fails local validation."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+class BudgetExceededError(ValueError):
+    """Raised for a job that costs more than any single day's budget allows."""
+
+    def __init__(self, cost: float, limit: float):
+        super().__init__(f"job needs {cost:.1f} credits, more than the {limit:.1f} a day allows")
+        self.cost = cost
+        self.limit = limit
+
+
+_HEX_COLOR = re.compile(r"^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+_UNFILLED_PLACEHOLDER = re.compile(r"\{([A-Za-z_]\w*)\}")
+
+
+def _normalize_aspect_ratio(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return re.sub(r"\s*[x/×]\s*", ":", str(value).strip().lower())
+
+
+def _normalize_resolution(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    text = str(value).strip().lower()
+    return f"{text}p" if text.isdigit() else text
+
+
+def _normalize_extras(extras: Dict[str, Any], problems: List[str]) -> Dict[str, Any]:
+    normalized: Dict[str, Any] = {}
+    for key, value in extras.items():
+        if value is None:
+            continue
+        if key in EXTRAS_RANGES:
+            low, high = EXTRAS_RANGES[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                problems.append(f"{key} must be a number")
+            elif not low <= value <= high:
+                problems.append(f"{key} must be between {low} and {high} (got {value})")
+            else:
+                normalized[key] = round(float(value), 3) if isinstance(low, float) else int(value)
+        elif key in EXTRAS_FLAGS:
+            if not isinstance(value, bool):
+                problems.append(f"{key} must be true or false")
+            elif value:
+                normalized[key] = True
+        elif key in EXTRAS_COLORS:
+            match = _HEX_COLOR.match(str(value).strip())
+            if not match:
+                problems.append(f"{key} must be a hex color like #00FF41")
+            else:
+                digits = match.group(1)
+                if len(digits) == 3:
+                    digits = "".join(c * 2 for c in digits)
+                normalized[key] = f"#{digits.upper()}"
+        else:
+            problems.append(f"Unknown option '{key}'")
+    return normalized
+
+
+@dataclass(frozen=True)
+class GenerationRequest:
+    """A validated, normalized generation request ready to submit."""
+
+    actor_id: str
+    voice_id: str
+    script: str
+    aspect_ratio: Optional[str] = None
+    resolution: Optional[str] = None
+    fps: Optional[int] = None
+    extras: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def build(
+        cls,
+        actor_id: str,
+        voice_id: str,
+        script: str,
+        aspect_ratio: Optional[str] = None,
+        resolution: Optional[str] = None,
+        fps: Optional[Any] = None,
+        extras: Optional[Dict[str, Any]] = None,
+    ) -> "GenerationRequest":
+        """Normalize raw inputs; raises PayloadValidationError listing every problem."""
+        problems: List[str] = []
+
+        actor_id = (actor_id or "").strip()
+        voice_id = (voice_id or "").strip()
+        for name, value in (("Actor ID", actor_id), ("Voice ID", voice_id)):
+            if not value:
+                problems.append(f"{name} is required")
+            elif len(value) > MAX_ID_LENGTH or any(c.isspace() for c in value):
+                problems.append(f"{name} must be a single token of at most {MAX_ID_LENGTH} characters")
+
+        script = "\n".join(line.rstrip() for line in (script or "").replace("\r\n", "\n").split("\n")).strip()
+        if not script:
+            problems.append("Script cannot be empty")
+        elif len(script) > MAX_SCRIPT_CHARS:
+            problems.append(f"Script is {len(script)} characters; the limit is {MAX_SCRIPT_CHARS}")
+        unfilled = list(dict.fromkeys(_UNFILLED_PLACEHOLDER.findall(script)))
+        if unfilled:
+            problems.append(
+                f"Script has unfilled placeholders {', '.join('{' + name + '}' for name in unfilled)}; "
+                "fill them in or run it as a template campaign"
+            )
+
+        aspect_ratio = _normalize_aspect_ratio(aspect_ratio)
+        if aspect_ratio and aspect_ratio not in ASPECT_RATIOS:
+            problems.append(f"Unknown aspect ratio '{aspect_ratio}' (use {', '.join(ASPECT_RATIOS)})")
+
+        resolution = _normalize_resolution(resolution)
+        if resolution and resolution not in RESOLUTIONS:
+            problems.append(f"Unknown resolution '{resolution}' (use {', '.join(RESOLUTIONS)})")
+
+        fps_value: Optional[int] = None
+        if fps not in (None, ""):
+            fps_text = str(fps).strip().lower().removesuffix("fps")
+            if fps_text not in FRAME_RATES:
+                problems.append(f"Unsupported frame rate '{fps}' (use {', '.join(FRAME_RATES)})")
+            else:
+                fps_value = int(fps_text)
+
+        normalized_extras = _normalize_extras(extras or {}, problems)
+
+        if problems:
+            raise PayloadValidationError(problems)
+        return cls(actor_id, voice_id, script, aspect_ratio, resolution, fps_value, normalized_extras)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """API payload with optional fields omitted."""
+        payload: Dict[str, Any] = {
+            "actorId": self.actor_id,
+            "voiceId": self.voice_id,
+            "script": self.script,
+        }
+        if self.aspect_ratio:
+            payload["aspectRatio"] = self.aspect_ratio
+        if self.resolution:
+            payload["resolution"] = self.resolution
+        if self.fps:
+            payload["fps"] = self.fps
+        payload.update(self.extras)
+        return payload
+
+    def to_json(self) -> str:
+        """Canonical serialization: sorted keys, compact separators."""
+        return json.dumps(self.to_payload(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def fingerprint(self) -> str:
+        """Content hash of the canonical payload."""
+        return hashlib.sha256(self.to_json().encode("utf-8")).hexdigest()
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for call_pipio_generate / run_generation_job."""
+        return {
+            "actor_id": self.actor_id,
+            "voice_id": self.voice_id,
+            "script": self.script,
+            "aspect_ratio": self.aspect_ratio,
+            "resolution": self.resolution,
+            "fps": self.fps,
+            "extras": dict(self.extras) or None,
+        }
+
+
 # ----------------- Helper Functions -----------------
 
 def _headers(api_key: str) -> Dict[str, str]:
@@ -238,55 +640,77 @@ def call_pipio_generate(
     aspect_ratio: Optional[str] = None,
     resolution: Optional[str] = None,
     extras: Optional[Dict[str, Any]] = None,
+    fps: Optional[Any] = None,
+    http: Optional[requests.Session] = None,
 ) -> requests.Response:
     """Call Pipio API to generate a video."""
-    payload: Dict[str, Any] = {
-        "actorId": actor_id,
-        "voiceId": voice_id,
-        "script": script.strip(),
-    }
+    request = GenerationRequest.build(actor_id, voice_id, script, aspect_ratio, resolution, fps, extras)
+    return submit_generation_request(api_key, request, http)
+
+
+def submit_generation_request(
+    api_key: str, request: GenerationRequest, http: Optional[requests.Session] = None
+) -> requests.Response:
+    """POST a validated request using its canonical JSON body through ``http`` (live by default)."""
+    with profile_section("network.generate"):
+        return send_request(
+            http,
+            "POST",
+            PIPIO_GENERATE_URL,
+            data=request.to_json().encode("utf-8"),
+            headers=_headers(api_key),
+            timeout=60,
+        )
+
+
+COMPLETED_STATUSES = {"completed", "finished", "success", "done", "complete"}
+FAILED_STATUSES = {"failed", "error"}
+
 
-    if aspect_ratio:
-        payload["aspectRatio"] = aspect_ratio
-    if resolution:
-        payload["resolution"] = resolution
-    if extras:
-        payload.update(extras)
-
-    return requests.post(
-        PIPIO_GENERATE_URL,
-        json=payload,
-        headers=_headers(api_key),
-        timeout=60,
+def job_payload_status(payload: Dict[str, Any], default: str = "") -> str:
+    """Read the job status from a status payload."""
+    return str(
+        payload.get("status")
+        or payload.get("state")
+        or payload.get("jobStatus")
+        or default
     )
 
 
-def poll_job_status(api_key: str, job_id: str) -> Dict[str, Any]:
-    """Poll job status until completion or timeout."""
+def wait_for_job(
+    api_key: str,
+    job_id: str,
+    max_seconds: int = MAX_POLL_SECONDS,
+    interval: int = POLL_INTERVAL_SECONDS,
+    on_update: Optional[Callable[[str, str, float], None]] = None,
+    http: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
+    """Poll job status until completion, failure or timeout, reporting progress through ``on_update`` (no UI)."""
     status_url = PIPIO_JOB_STATUS_URL.format(job_id=job_id)
+    notify = on_update or (lambda level, message, elapsed: None)
+    sleep = getattr(http, "sleep", time.sleep)
     start = time.time()
     last_data: Dict[str, Any] = {}
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
 
     while True:
         elapsed = time.time() - start
-        progress = min(elapsed / MAX_POLL_SECONDS, 1.0)
-        progress_bar.progress(progress)
-        
-        if elapsed > MAX_POLL_SECONDS:
-            status_text.warning("⏰ Polling timeout reached")
+
+        if elapsed > max_seconds:
+            notify("warning", "⏰ Polling timeout reached", elapsed)
             break
 
         try:
-            r = requests.get(status_url, headers=_headers(api_key), timeout=30)
+            with profile_section("network.status"):
+                r = send_request(http, "GET", status_url, headers=_headers(api_key), timeout=30)
+        except CircuitOpenError as e:
+            notify("error", f"⚡ {e} - job {job_id} keeps running upstream", elapsed)
+            break
         except requests.RequestException as e:
-            status_text.error(f"Network error: {e}")
+            notify("error", f"Network error: {e}", elapsed)
             break
 
         if r.status_code != 200:
-            status_text.error(f"Status endpoint error: {r.status_code}")
+            notify("error", f"Status endpoint error: {r.status_code}", elapsed)
             try:
                 last_data = r.json()
             except Exception:
@@ -299,25 +723,38 @@ def poll_job_status(api_key: str, job_id: str) -> Dict[str, Any]:
             data = {"raw_text": r.text}
 
         last_data = data
-        status = str(
-            data.get("status")
-            or data.get("state")
-            or data.get("jobStatus")
-            or ""
-        ).lower()
-        
-        status_text.info(f"Status: {status.upper()} | Elapsed: {int(elapsed)}s")
-
-        if status in {"completed", "finished", "success", "done", "complete"}:
-            progress_bar.progress(1.0)
-            status_text.success("✅ Job completed!")
+        status = job_payload_status(data).lower()
+
+        if status in COMPLETED_STATUSES:
+            notify("success", "✅ Job completed!", elapsed)
             break
-        if status in {"failed", "error"}:
-            status_text.error("❌ Job failed")
+        if status in FAILED_STATUSES:
+            notify("error", "❌ Job failed", elapsed)
             break
+        notify("info", f"Status: {status.upper()} | Elapsed: {int(elapsed)}s", elapsed)
+
+        sleep(interval)
+
+    return last_data
+
+
+def poll_job_status(
+    api_key: str,
+    job_id: str,
+    max_seconds: int = MAX_POLL_SECONDS,
+    interval: int = POLL_INTERVAL_SECONDS,
+    http: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
+    """Poll job status until completion or timeout."""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    def on_update(level: str, message: str, elapsed: float) -> None:
+        progress_bar.progress(1.0 if level == "success" else min(elapsed / max_seconds, 1.0))
+        getattr(status_text, level)(message)
+
+    last_data = wait_for_job(api_key, job_id, max_seconds, interval, on_update, http)
 
-        time.sleep(POLL_INTERVAL_SECONDS)
-    
     progress_bar.empty()
     status_text.empty()
     return last_data
@@ -361,6 +798,155 @@ def extract_video_url(payload: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+# ----------------- Session State -----------------
+
+class SessionState:
+    """Typed accessors for the per-session values the app keeps."""
+
+    @property
+    def jobs(self) -> List[Dict[str, Any]]:
+        return st.session_state["pipio_jobs"]
+
+    @jobs.setter
+    def jobs(self, jobs: List[Dict[str, Any]]) -> None:
+        st.session_state["pipio_jobs"] = jobs
+
+    @property
+    def favorites(self) -> Dict[str, str]:
+        return st.session_state["favorites"]
+
+    @property
+    def owner(self) -> str:
+        return st.session_state.get("history_owner", "")
+
+    def set_owner(self, owner: str) -> None:
+        """Switch the session to ``owner``'s stored history and favorites when the key changes."""
+        if st.session_state.get("history_owner") != owner:
+            st.session_state["history_owner"] = owner
+            self.jobs = load_recent_jobs(owner)
+            st.session_state["favorites"] = load_favorites(owner)
+            st.session_state["open_videos"] = {}
+
+    def count(self, name: str) -> int:
+        return st.session_state.get(name, 0)
+
+    def bump(self, name: str) -> None:
+        st.session_state[name] = self.count(name) + 1
+
+    def count_job(self, status: str) -> None:
+        """Book a finished job in the total/success/failure counters."""
+        self.bump("total_videos")
+        if status.lower() in {"completed", "finished", "done", "success", "complete"}:
+            self.bump("successful_videos")
+        elif status.lower() in {"failed", "error"}:
+            self.bump("failed_videos")
+
+    def reset_history(self) -> None:
+        self.jobs = []
+        for name in ("total_videos", "successful_videos", "failed_videos"):
+            st.session_state[name] = 0
+        st.session_state["open_videos"] = {}
+
+    def is_video_open(self, job: Dict[str, Any]) -> bool:
+        return job_fingerprint(job) in st.session_state["open_videos"]
+
+    def open_video(self, job: Dict[str, Any]) -> None:
+        """Button callback: show a history card's player; only the latest few stay open."""
+        opened: Dict[str, None] = st.session_state["open_videos"]
+        fingerprint = job_fingerprint(job)
+        opened.pop(fingerprint, None)
+        opened[fingerprint] = None
+        while len(opened) > OPEN_VIDEOS_LIMIT:
+            del opened[next(iter(opened))]
+
+    def merge_scheduled_runs(self, dispatcher: "ScheduleDispatcher", key_id: str) -> None:
+        """Put jobs ``key_id``'s schedules finished since this session last looked at the top of history."""
+        seen = st.session_state.setdefault("schedule_runs_seen", dispatcher.completed)
+        completed, records = dispatcher.runs_since(seen, key_id)
+        if completed != seen:
+            self.jobs[:0] = reversed(records)
+            del self.jobs[HISTORY_LIMIT:]
+            st.session_state["schedule_runs_seen"] = completed
+
+    def merge_campaign_run(self, run: "CampaignRun") -> None:
+        """Put the jobs a background campaign finished since the last rerun at the top of history."""
+        records = run.take_records()
+        if run.owner == self.owner:
+            self.jobs[:0] = reversed(records)
+            del self.jobs[HISTORY_LIMIT:]
+        for record in records:
+            self.count_job(record["status"])
+
+    def get_large(self, key: str, default: Any = None) -> Any:
+        """A value ``compact`` may have offloaded, read back from the job store if so."""
+        value = st.session_state.get(key, default)
+        if isinstance(value, dict) and value.keys() == {"_offloaded"}:
+            value = load_session_blob(key)
+            return default if value is None else value
+        return value
+
+    def size(self) -> int:
+        return sum(session_state_sizes().values())
+
+    def compact(self) -> Dict[str, int]:
+        """Drop stale UI flags and duplicate jobs and offload large values; returns what changed."""
+        stats = {"flags": 0, "duplicates": 0, "offloaded": 0}
+        for key in [k for k in st.session_state.keys() if str(k).startswith(STALE_SESSION_PREFIXES)]:
+            del st.session_state[key]
+            stats["flags"] += 1
+
+        # Only repeats of the same record count: the fingerprint plus when it was added
+        seen = set()
+        jobs = []
+        for job in self.jobs:
+            fingerprint = (job_fingerprint(job), job.get("timestamp"))
+            if fingerprint in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(fingerprint)
+            jobs.append(job)
+        if stats["duplicates"]:
+            self.jobs = jobs
+        del self.jobs[HISTORY_LIMIT:]
+
+        for key in SESSION_OFFLOAD_KEYS:
+            value = st.session_state.get(key)
+            if value is None or (isinstance(value, dict) and value.keys() == {"_offloaded"}):
+                continue
+            if approx_size(value) > SESSION_OFFLOAD_BYTES:
+                save_session_blob(key, value)
+                st.session_state[key] = {"_offloaded": True}
+                stats["offloaded"] += 1
+        return stats
+
+
+session = SessionState()
+
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def save_session_blob(key: str, value: Any) -> None:
+    """Park a large session value in the job store, expiring abandoned sessions' blobs."""
+    now = time.time()
+    with job_store() as conn:
+        conn.execute("DELETE FROM session_blobs WHERE updated_at < ?", (now - SESSION_BLOB_TTL_SECONDS,))
+        conn.execute(
+            "INSERT OR REPLACE INTO session_blobs VALUES (?, ?, ?, ?)",
+            (_session_id(), key, json.dumps(value, default=str), now),
+        )
+
+
+def load_session_blob(key: str) -> Any:
+    with job_store() as conn:
+        row = conn.execute(
+            "SELECT value FROM session_blobs WHERE session_id = ? AND key = ?", (_session_id(), key)
+        ).fetchone()
+    return json.loads(row["value"]) if row else None
+
+
 def init_session_state():
     """Initialize session state variables."""
     if "pipio_jobs" not in st.session_state:
@@ -372,7 +958,26 @@ def init_session_state():
     if "failed_videos" not in st.session_state:
         st.session_state["failed_videos"] = 0
     if "favorites" not in st.session_state:
-        st.session_state["favorites"] = []
+        st.session_state["favorites"]: Dict[str, str] = {}
+    if "open_videos" not in st.session_state:
+        st.session_state["open_videos"]: Dict[str, None] = {}
+    for key, value in SETTING_WIDGET_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+    if "max_poll_seconds" not in st.session_state:
+        st.session_state["max_poll_seconds"] = MAX_POLL_SECONDS
+    if "poll_interval" not in st.session_state:
+        st.session_state["poll_interval"] = POLL_INTERVAL_SECONDS
+    if "profiling_capture" not in st.session_state:
+        st.session_state["profiling_capture"] = "off"
+    
+    # Apply configuration imported on the previous run, before widgets exist
+    pending_config = st.session_state.pop("pending_config", None)
+    if pending_config:
+        if "max_poll_seconds" in pending_config:
+            st.session_state["max_poll_seconds"] = min(max(pending_config["max_poll_seconds"], 60), 600)
+        if "poll_interval" in pending_config:
+            st.session_state["poll_interval"] = min(max(pending_config["poll_interval"], 2), 10)
 
 
 def add_job_to_history(
@@ -382,9 +987,10 @@ def add_job_to_history(
     video_url: Optional[str],
     actor_id: str = "",
     voice_id: str = "",
+    extra: Optional[Dict[str, Any]] = None,
 ):
     """Add job to history with metadata."""
-    jobs = st.session_state["pipio_jobs"]
+    jobs = session.jobs
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     job_data = {
@@ -395,20 +1001,21 @@ def add_job_to_history(
         "timestamp": timestamp,
         "actor_id": actor_id,
         "voice_id": voice_id,
+        **(extra or {}),
+        "owner": session.owner,
     }
     
     jobs.insert(0, job_data)
+    if not replaying():
+        store_jobs([job_data], replace=True)
     
-    # Update stats
-    st.session_state["total_videos"] += 1
-    if status.lower() in {"completed", "finished", "done", "success", "complete"}:
-        st.session_state["successful_videos"] += 1
-    elif status.lower() in {"failed", "error"}:
-        st.session_state["failed_videos"] += 1
+    # Update stats; drafts are previews, not videos
+    if not job_data.get("draft"):
+        session.count_job(status)
     
-    # Cap history at 50
-    if len(jobs) > 50:
-        del jobs[50:]
+    # Cap in-session history; the job store keeps everything
+    if len(jobs) > HISTORY_LIMIT:
+        del jobs[HISTORY_LIMIT:]
 
 
 def script_templates() -> Dict[str, str]:
@@ -448,31 +1055,3778 @@ def script_templates() -> Dict[str, str]:
     }
 
 
-def job_status_badge(status: str) -> str:
-    """Generate status badge with emoji."""
-    s = status.lower()
-    if s in {"completed", "finished", "done", "success", "complete"}:
-        return "✅ COMPLETED"
-    if s in {"queued", "pending", "submitted"}:
-        return "🕒 QUEUED"
-    if s in {"processing", "running", "in_progress"}:
-        return "⚙️ PROCESSING"
-    if s in {"failed", "error"}:
-        return "❌ FAILED"
-    return f"ℹ️ {status.upper() if status else 'UNKNOWN'}"
+def campaign_templates() -> Dict[str, str]:
+    """Templates with per-recipient ``{placeholders}``, only offered for template campaigns."""
+    return {
+        "Personalized Outreach":
+            "Hi {first_name}! I recorded this quick video just for the team at {company}. "
+            "I'd love to show you how we can help {company} save hours every week.",
+        
+        "Customer Thank You":
+            "Thank you, {first_name}, for choosing us! Everyone here at our team is grateful to work with {company}, "
+            "and we can't wait to help you get even more out of the platform.",
+    }
+
+
+def job_status_badge(status: str) -> str:
+    """Generate status badge with emoji."""
+    s = status.lower()
+    if s in {"completed", "finished", "done", "success", "complete"}:
+        return "✅ COMPLETED"
+    if s in {"queued", "pending", "submitted"}:
+        return "🕒 QUEUED"
+    if s in {"processing", "running", "in_progress"}:
+        return "⚙️ PROCESSING"
+    if s in {"failed", "error"}:
+        return "❌ FAILED"
+    return f"ℹ️ {status.upper() if status else 'UNKNOWN'}"
+
+
+def filter_jobs(
+    jobs: List[Dict[str, Any]],
+    statuses: Optional[List[str]] = None,
+    search_term: str = "",
+) -> List[Dict[str, Any]]:
+    """Filter jobs by status and script text."""
+    filtered = jobs
+    if statuses:
+        filtered = [j for j in filtered if j.get("status", "").lower() in statuses]
+    if search_term:
+        filtered = [j for j in filtered if search_term.lower() in j.get("script", "").lower()]
+    return filtered
+
+
+def export_history_json():
+    """Export job history as JSON."""
+    jobs = session.jobs
+    return json.dumps(jobs, indent=2)
+
+
+# ----------------- Upstream Health -----------------
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"{endpoint} endpoint unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class EndpointHealth:
+    """Sliding window of recent call outcomes and latencies for one endpoint."""
+
+    def __init__(self, window_seconds: float = HEALTH_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.samples: Deque[Tuple[float, bool, float]] = deque()
+        self.failures = 0
+        self.last_error = ""
+
+    def record(self, ok: bool, latency: float, error: str = "", now: Optional[float] = None) -> None:
+        now = now or time.time()
+        self.samples.append((now, ok, latency))
+        if not ok:
+            self.failures += 1
+            self.last_error = error
+        self._trim(now)
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.failures = 0
+
+    def _trim(self, now: float) -> None:
+        while self.samples and now - self.samples[0][0] > self.window_seconds:
+            if not self.samples.popleft()[1]:
+                self.failures -= 1
+
+    def error_rate(self, now: Optional[float] = None) -> float:
+        self._trim(now or time.time())
+        return self.failures / len(self.samples) if self.samples else 0.0
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        self._trim(now or time.time())
+        latencies = sorted(latency for _, _, latency in self.samples)
+        return {
+            "requests": len(self.samples),
+            "error_rate": self.error_rate(now),
+            "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+class CircuitBreaker:
+    """Closed → open when the window's error rate trips; open → half-open after a cool-down."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.health = EndpointHealth()
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def retry_in(self, now: Optional[float] = None) -> float:
+        return max(0.0, self.opened_at + BREAKER_OPEN_SECONDS - (now or time.time()))
+
+    def acquire(self) -> Optional[float]:
+        """Admit a call; returns the seconds until a retry if the breaker refuses it."""
+        now = time.time()
+        with self._lock:
+            if self.state == "open":
+                if self.retry_in(now) > 0:
+                    return self.retry_in(now)
+                self.state = "half-open"
+                self._probes = 0
+            if self.state == "half-open":
+                if self._probes >= BREAKER_HALF_OPEN_PROBES:
+                    return float(BREAKER_OPEN_SECONDS)
+                self._probes += 1
+        return None
+
+    def record(self, ok: bool, latency: float, error: str = "") -> None:
+        """Feed a call outcome back into the window and update the state."""
+        if ok and latency > BREAKER_SLOW_SECONDS:
+            ok, error = False, f"slow response ({latency:.1f}s)"
+        now = time.time()
+        with self._lock:
+            self.health.record(ok, latency, error, now)
+            if self.state == "half-open":
+                self._probes = max(0, self._probes - 1)
+                if ok:
+                    self.state = "closed"
+                    self.health.reset()
+                else:
+                    self.state, self.opened_at = "open", now
+            elif (
+                self.state == "closed"
+                and len(self.health.samples) >= HEALTH_MIN_REQUESTS
+                and self.health.error_rate(now) >= BREAKER_ERROR_RATE
+            ):
+                self.state, self.opened_at = "open", now
+
+    def release(self) -> None:
+        """Give back an admitted call's probe slot without recording an outcome."""
+        with self._lock:
+            if self.state == "half-open":
+                self._probes = max(0, self._probes - 1)
+
+    def is_open(self) -> bool:
+        return self.state == "open" and self.retry_in() > 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State and window stats, read under the lock that worker threads record under."""
+        with self._lock:
+            return {"endpoint": self.endpoint, "state": self.state, "retry_in": self.retry_in(), **self.health.snapshot()}
+
+
+class HealthRegistry:
+    """One circuit breaker per endpoint kind (generate, status, download, catalog)."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(endpoint)
+            return self._breakers[endpoint]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [b.snapshot() for b in breakers]
+
+
+@st.cache_resource
+def endpoint_health() -> HealthRegistry:
+    """Process-wide endpoint health shared by every session."""
+    return HealthRegistry()
+
+
+def health_registry(http: Optional[requests.Session] = None) -> HealthRegistry:
+    """The registry for a transport; replay sessions keep their own."""
+    return getattr(http, "health", None) or endpoint_health()
+
+
+def send_request(http: Optional[requests.Session], method: str, url: str, **kwargs: Any) -> requests.Response:
+    """Issue an API call through its endpoint's circuit breaker; raises CircuitOpenError while it is open."""
+    endpoint = classify_request(method, url)
+    breaker = health_registry(http).breaker(endpoint)
+    retry_in = breaker.acquire()
+    if retry_in is not None:
+        raise CircuitOpenError(endpoint, retry_in)
+    started = time.perf_counter()
+    outcome: Optional[Tuple[bool, str]] = None
+    try:
+        response = (http or requests).request(method, url, **kwargs)
+        failed = response.status_code == 429 or response.status_code >= 500
+        outcome = (not failed, f"HTTP {response.status_code}" if failed else "")
+    except requests.RequestException as e:
+        outcome = (False, type(e).__name__)
+        raise
+    finally:
+        # Anything else (a bad argument, an interrupt) says nothing about the endpoint,
+        # but must not keep a half-open probe slot forever
+        if outcome is None:
+            breaker.release()
+        else:
+            breaker.record(outcome[0], time.perf_counter() - started, outcome[1])
+    return response
+
+
+def circuit_retry_time(endpoint: str, http: Optional[requests.Session] = None) -> datetime:
+    """When a job held back by an open breaker should be retried."""
+    retry_in = health_registry(http).breaker(endpoint).retry_in()
+    return datetime.now() + timedelta(seconds=max(retry_in, BREAKER_OPEN_SECONDS / 2))
+
+
+def render_health_status() -> None:
+    """Per-endpoint health summary (sidebar)."""
+    rows = endpoint_health().snapshot()
+    if not rows:
+        st.caption("No API calls yet")
+        return
+    icons = {"closed": "🟢", "half-open": "🟡", "open": "🔴"}
+    for row in rows:
+        line = (
+            f"{icons[row['state']]} **{row['endpoint']}** · {row['requests']} req · "
+            f"{row['error_rate']:.0%} err · p95 {row['p95']:.1f}s"
+        )
+        if row["state"] == "open":
+            line += f" · retry in {row['retry_in']:.0f}s"
+        st.markdown(line)
+        if row["error_rate"] and row["last_error"]:
+            st.caption(f"Last error: {row['last_error']}")
+
+
+# ----------------- API Key Registry -----------------
+
+def mask_api_key(api_key: str) -> str:
+    """Display label for a key that never reveals it."""
+    return f"…{api_key[-4:]}" if len(api_key) > 8 else "…" + "*" * 4
+
+
+def shared_keys_unlocked(token: str) -> bool:
+    """Whether ``token`` is the operator token that opts a session into the server's keys."""
+    return bool(SHARED_KEYS_TOKEN) and hmac.compare_digest(token.encode("utf-8"), SHARED_KEYS_TOKEN.encode("utf-8"))
+
+
+def configured_api_keys(primary: str, extra: str = "", shared: bool = False) -> List[str]:
+    """The session's key, extra keys (one per line) and, when ``shared``, the server's keys, de-duplicated."""
+    candidates = [primary, *extra.splitlines()]
+    if shared:
+        candidates += os.environ.get("PIPIO_API_KEYS", "").split(",")
+    keys: List[str] = []
+    for key in (c.strip() for c in candidates):
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.granted = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, capacity: float) -> None:
+        with self._lock:
+            self.rate, self.capacity = rate, capacity
+            self.tokens = min(self.tokens, capacity)
+
+    def acquire(self) -> None:
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.granted += 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+            time.sleep(delay)
+
+
+class KeySession(requests.Session):
+    """Pooled keep-alive session for one API key; every request waits for a rate-limit token."""
+
+    def __init__(self, limiter: TokenBucket, pool_size: int = KEY_POOL_SIZE):
+        super().__init__()
+        self.limiter = limiter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        self.limiter.acquire()
+        return super().request(method, url, *args, **kwargs)
+
+
+class ApiKeyState:
+    """Connection pool, limits and usage counters for one Pipio API key."""
+
+    def __init__(self, api_key: str, max_concurrency: int, rate_per_minute: float):
+        self.api_key = api_key
+        self.label = mask_api_key(api_key)
+        self.max_concurrency = max_concurrency
+        self.limiter = TokenBucket(rate_per_minute / 60.0, max(1, max_concurrency))
+        self.session = KeySession(self.limiter)
+        self.in_flight = 0
+        self.jobs = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_used = time.monotonic()
+
+    def load(self) -> float:
+        return self.in_flight / self.max_concurrency
+
+
+class ApiKeyRegistry:
+    """Process-wide per-key state shared by every session; idle keys are dropped with their pools."""
+
+    def __init__(self, idle_ttl: float = KEY_IDLE_TTL_SECONDS):
+        self._keys: Dict[str, ApiKeyState] = {}
+        self._cond = threading.Condition()
+        self._cursor = 0
+        self.idle_ttl = idle_ttl
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        for api_key, state in list(self._keys.items()):
+            if state.in_flight == 0 and state.last_used < cutoff:
+                del self._keys[api_key]
+                state.session.close()
+
+    def register(
+        self, api_key: str, max_concurrency: int = KEY_MAX_CONCURRENCY, rate_per_minute: float = KEY_RATE_PER_MINUTE
+    ) -> ApiKeyState:
+        """Get or create a key's state, applying the current limits."""
+        with self._cond:
+            self._prune()
+            state = self._keys.get(api_key)
+            if state is None:
+                state = self._keys[api_key] = ApiKeyState(api_key, max_concurrency, rate_per_minute)
+            else:
+                state.max_concurrency = max_concurrency
+                state.limiter.configure(rate_per_minute / 60.0, max(1, max_concurrency))
+            state.last_used = time.monotonic()
+            self._cond.notify_all()
+            return state
+
+    def acquire(self, keys: List[str], policy: str = "least-loaded") -> ApiKeyState:
+        """Reserve a slot on one of ``keys`` according to ``policy``."""
+        with self._cond:
+            while True:
+                states = [self._keys[k] for k in keys if k in self._keys]
+                free = [s for s in states if s.in_flight < s.max_concurrency]
+                if free:
+                    break
+                if not states:
+                    raise KeyError("no registered API keys")
+                self._cond.wait()
+
+            if policy == "round-robin":
+                ordered = states[self._cursor % len(states):] + states[:self._cursor % len(states)]
+                state = next(s for s in ordered if s in free)
+                self._cursor = states.index(state) + 1
+            else:
+                state = min(free, key=lambda s: (s.load(), s.limiter.granted))
+            state.in_flight += 1
+            state.jobs += 1
+            state.last_used = time.monotonic()
+            return state
+
+    def release(self, state: ApiKeyState, ok: bool) -> None:
+        with self._cond:
+            state.in_flight -= 1
+            state.last_used = time.monotonic()
+            if ok:
+                state.completed += 1
+            else:
+                state.failed += 1
+            self._cond.notify_all()
+
+    def ensure(self, api_key: str) -> ApiKeyState:
+        """The key's state, registering it with the default limits if it is not known yet."""
+        with self._cond:
+            state = self._keys.get(api_key)
+        return state or self.register(api_key)
+
+    def snapshot(self, keys: List[str]) -> List[Dict[str, Any]]:
+        with self._cond:
+            states = [self._keys[k] for k in keys if k in self._keys]
+            return [
+                {
+                    "key": s.label,
+                    "in flight": f"{s.in_flight}/{s.max_concurrency}",
+                    "jobs": s.jobs,
+                    "completed": s.completed,
+                    "failed": s.failed,
+                    "requests": s.limiter.granted,
+                    "throttled s": round(s.limiter.waited, 1),
+                }
+                for s in states
+            ]
+
+
+@st.cache_resource
+def api_key_registry() -> ApiKeyRegistry:
+    return ApiKeyRegistry()
+
+
+@dataclass
+class KeyPool:
+    """The keys a batch may spread its jobs over and how to pick between them."""
+
+    keys: List[str]
+    registry: ApiKeyRegistry
+    policy: str = "least-loaded"
+
+    def run(self, http: Optional[requests.Session] = None, **job: Any) -> Dict[str, Any]:
+        """run_generation_job on the next key with a free slot, through that key's rate-limited session."""
+        state = self.registry.acquire(self.keys, self.policy)
+        ok = False
+        try:
+            result = run_generation_job(state.api_key, http=http or state.session, **job)
+            ok = bool(result.get("video_url"))
+        finally:
+            self.registry.release(state, ok)
+        return {**result, "api_key": state.label}
+
+
+# ----------------- Media Pipeline -----------------
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+
+def cached_video_path(video_url: str) -> str:
+    """Local cache path for a remote video."""
+    return os.path.join(VIDEO_CACHE_DIR, f"{_url_key(video_url)}.mp4")
+
+
+def cache_video(video_url: str, timeout: int = 120, http: Optional[requests.Session] = None) -> str:
+    """Stream a remote video into the local cache and return its path."""
+    path = cached_video_path(video_url)
+    if touch_cached_media(path):
+        return path
+
+    os.makedirs(VIDEO_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=VIDEO_CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as fh, profile_section("network.download"):
+            with send_request(http, "GET", video_url, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    fh.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    prune_media_cache()
+    return path
+
+
+def prune_media_cache(max_bytes: int = MEDIA_CACHE_MAX_BYTES) -> int:
+    """Delete cached files beyond ``max_bytes``, source videos first, then least recently used; returns files removed."""
+    files: List[Tuple[int, float, int, str]] = []
+    for tier, root in enumerate((VIDEO_CACHE_DIR, MEDIA_DIR)):
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                if ".part" in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((tier, stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, _, size, _ in files)
+    removed = 0
+    for _, _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def touch_cached_media(path: str) -> bool:
+    """Whether a cached media file exists; marks it recently used so prune_media_cache keeps it."""
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+def media_artifact_paths(video_url: str) -> Dict[str, str]:
+    """Thumbnail and preview proxy paths for a video."""
+    key = _url_key(video_url)
+    return {
+        "thumbnail": os.path.join(MEDIA_DIR, f"{key}_thumb.jpg"),
+        "preview": os.path.join(MEDIA_DIR, f"{key}_preview.mp4"),
+    }
+
+
+def _run_ffmpeg(args: List[str], dst: str, timeout: int = 600) -> None:
+    """Run ffmpeg writing to a temp file, then move it into place."""
+    root, ext = os.path.splitext(dst)
+    tmp_path = f"{root}.{threading.get_ident()}.part{ext}"
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y", *args, tmp_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, timeout=timeout)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_thumbnail(src: str, dst: str) -> None:
+    """Extract a representative poster frame as a small JPEG."""
+    _run_ffmpeg(
+        ["-i", src, "-vf", f"thumbnail,scale={THUMBNAIL_WIDTH}:-2", "-frames:v", "1", "-q:v", "4"],
+        dst,
+    )
+
+
+def generate_preview_proxy(src: str, dst: str) -> None:
+    """Encode a low-bitrate, fast-start preview of the video."""
+    _run_ffmpeg(
+        [
+            "-i", src,
+            "-vf", f"scale=-2:{PREVIEW_HEIGHT}",
+            "-c:v", "libx264", "-preset", "veryfast",
+            "-b:v", PREVIEW_VIDEO_BITRATE, "-maxrate", PREVIEW_VIDEO_BITRATE, "-bufsize", "500k",
+            "-c:a", "aac", "-b:a", "48k", "-ac", "1",
+            "-movflags", "+faststart",
+        ],
+        dst,
+    )
+
+
+def build_media_artifacts(video_url: str) -> Dict[str, str]:
+    """Produce the thumbnail and preview proxy for a completed video."""
+    paths = media_artifact_paths(video_url)
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    src = cache_video(video_url)
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    if not os.path.exists(paths["thumbnail"]):
+        generate_thumbnail(src, paths["thumbnail"])
+    if not os.path.exists(paths["preview"]):
+        generate_preview_proxy(src, paths["preview"])
+    prune_media_cache()
+    return paths
+
+
+@st.cache_resource
+def get_media_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for media jobs; each job runs ffmpeg in its own process."""
+    return ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="pipio-media")
+
+
+@st.cache_resource
+def _media_jobs() -> Tuple[threading.Lock, Dict[str, Future]]:
+    """Media jobs by key, shared by every session and worker thread; hold the lock to use the dict."""
+    return threading.Lock(), {}
+
+
+def _submit_media_job(key: str, outputs: Iterable[str], fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+    """Run ``fn`` in the media pool unless its outputs exist or it is already running."""
+    lock, jobs = _media_jobs()
+    with lock:
+        for done in [k for k, f in jobs.items() if f.done() and f.exception() is None]:
+            del jobs[done]
+
+        future = jobs.get(key)
+        if future is not None and not future.done():
+            return future
+        if all(os.path.exists(p) for p in outputs):
+            return None
+
+        future = get_media_executor().submit(fn, *args)
+        jobs[key] = future
+        return future
+
+
+def _media_job_status(key: str, outputs: Iterable[str]) -> str:
+    if all(os.path.exists(p) for p in outputs):
+        return "ready"
+    lock, jobs = _media_jobs()
+    with lock:
+        future = jobs.get(key)
+    if future is None:
+        return "missing"
+    if not future.done():
+        return "pending"
+    # Finished but the outputs are gone (pruned from the media cache): missing again
+    return "failed" if future.exception() is not None else "missing"
+
+
+def schedule_media_artifacts(video_url: Optional[str]) -> Optional[Future]:
+    """Queue thumbnail/preview generation for a completed video."""
+    if not FFMPEG_BIN or not video_url or is_replay_url(video_url):
+        return None
+    return _submit_media_job(video_url, media_artifact_paths(video_url).values(), build_media_artifacts, video_url)
+
+
+def media_artifact_status(video_url: str) -> str:
+    """Return 'ready', 'pending', 'failed' or 'missing' for a video's artifacts."""
+    return _media_job_status(video_url, media_artifact_paths(video_url).values())
+
+
+def read_file_bytes(path: str) -> bytes:
+    """A local file's contents; bind with functools.partial for a download button that reads on click."""
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def read_video_bytes(video_url: str, http: Optional[requests.Session] = None) -> bytes:
+    """Video bytes for a download button, served from the local cache (replayed videos are never cached)."""
+    if is_replay_url(video_url):
+        return send_request(http, "GET", video_url, timeout=60).content
+    with open(cache_video(video_url, http=http), "rb") as fh:
+        return fh.read()
+
+
+# ----------------- Branding Post-Processing -----------------
+
+def _branding_dir(owner: str) -> str:
+    """Directory holding ``owner``'s branding assets."""
+    return os.path.join(BRANDING_DIR, re.sub(r"[^A-Za-z0-9_-]", "_", owner) or "_")
+
+
+def branding_asset(owner: str, step: str) -> Optional[str]:
+    """``owner``'s uploaded asset for a branding step, if there is one."""
+    directory = _branding_dir(owner)
+    if not os.path.isdir(directory):
+        return None
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if stem.rsplit("_", 1)[0] == step and ext.lstrip(".") in BRANDING_ASSET_TYPES[step]:
+            return os.path.join(directory, name)
+    return None
+
+
+def branding_assets(owner: str, steps: Iterable[str]) -> Dict[str, str]:
+    """Asset paths for the requested steps that ``owner`` has assets for, in ``BRANDING_STEPS`` order."""
+    assets = {step: branding_asset(owner, step) for step in BRANDING_STEPS if step in steps}
+    return {step: path for step, path in assets.items() if path}
+
+
+def save_branding_asset(owner: str, step: str, filename: str, data: bytes) -> str:
+    """Replace ``owner``'s asset for a branding step, named after a hash of its content; returns its path."""
+    ext = os.path.splitext(filename)[1].lstrip(".").lower()
+    if ext not in BRANDING_ASSET_TYPES[step]:
+        raise ValueError(f"{step} asset must be one of: {', '.join(BRANDING_ASSET_TYPES[step])}")
+    directory = _branding_dir(owner)
+    os.makedirs(directory, exist_ok=True)
+    previous = branding_asset(owner, step)
+    if previous:
+        os.remove(previous)
+    path = os.path.join(directory, f"{step}_{hashlib.sha256(data).hexdigest()[:16]}.{ext}")
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return path
+
+
+def store_branding_upload(step: str) -> None:
+    """Uploader callback: persist a newly chosen branding asset for this session's owner."""
+    upload = st.session_state.get(f"branding_upload_{step}")
+    if upload is not None:
+        save_branding_asset(session.owner, step, upload.name, upload.getvalue())
+
+
+def branding_available() -> bool:
+    return bool(FFMPEG_BIN and FFPROBE_BIN)
+
+
+def branded_video_path(video_url: str, assets: Dict[str, str]) -> str:
+    """Output path for a video branded with ``assets``."""
+    digest = hashlib.sha256(
+        "|".join(f"{step}:{os.path.basename(path)}" for step, path in assets.items()).encode()
+    ).hexdigest()[:12]
+    return os.path.join(MEDIA_DIR, f"{_url_key(video_url)}_branded_{digest}.mp4")
+
+
+def probe_media(path: str) -> Dict[str, Any]:
+    """Duration and the stream parameters that decide whether clips can be joined without re-encoding."""
+    out = subprocess.run(
+        [FFPROBE_BIN, "-v", "error", "-show_streams", "-show_format", "-of", "json", path],
+        check=True, capture_output=True, timeout=60,
+    ).stdout
+    info = json.loads(out)
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    return {
+        "duration": float(info.get("format", {}).get("duration") or 0),
+        "video": video and {
+            k: video.get(k) for k in ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate", "time_base")
+        },
+        "audio": audio and {
+            "codec_name": audio.get("codec_name"),
+            "sample_rate": int(audio.get("sample_rate") or 0),
+            "channels": audio.get("channels"),
+        },
+    }
+
+
+def conform_clip(src: str, target: Dict[str, Any]) -> str:
+    """Encode an intro/outro to match the target video, cached per asset, resolution and frame rate."""
+    video = target["video"]
+    audio = target["audio"] or {"sample_rate": 48000, "channels": 2}
+    width, height, fps = video["width"], video["height"], video["r_frame_rate"]
+    stat = os.stat(src)
+    key = hashlib.sha256(
+        f"{src}:{stat.st_size}:{stat.st_mtime_ns}:{width}x{height}@{fps}:"
+        f"{video['pix_fmt']}:{video['time_base']}:{audio['sample_rate']}/{audio['channels']}".encode()
+    ).hexdigest()[:16]
+    dst = os.path.join(MEDIA_DIR, "conformed", f"{key}.mp4")
+    if os.path.exists(dst):
+        return dst
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    args = ["-i", src]
+    if probe_media(src)["audio"] is None:
+        layout = "mono" if audio["channels"] == 1 else "stereo"
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={audio['sample_rate']}:cl={layout}", "-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+    else:
+        args += ["-map", "0:v:0", "-map", "0:a:0"]
+    _run_ffmpeg(
+        args + [
+            "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                   f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps}",
+            "-pix_fmt", video["pix_fmt"] or "yuv420p",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(BRANDING_CRF),
+            "-c:a", "aac", "-ar", str(audio["sample_rate"]), "-ac", str(audio["channels"]),
+            "-video_track_timescale", (video["time_base"] or "1/15360").split("/")[-1],
+            "-movflags", "+faststart",
+        ],
+        dst,
+    )
+    return dst
+
+
+def concat_copy(clips: List[str], dst: str) -> None:
+    """Join clips with identical stream parameters without re-encoding."""
+    fd, list_path = tempfile.mkstemp(dir=MEDIA_DIR, suffix=".txt")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            for clip in clips:
+                escaped = os.path.abspath(clip).replace("'", "'\\''")
+                fh.write(f"file '{escaped}'\n")
+        _run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", "-movflags", "+faststart"], dst)
+    finally:
+        os.remove(list_path)
+
+
+def render_branding(
+    clips: List[str],
+    probes: List[Dict[str, Any]],
+    video: Dict[str, Any],
+    assets: Dict[str, str],
+    dst: str,
+) -> None:
+    """Join clips and apply the watermark and music in one filter graph and a single encode."""
+    args: List[str] = []
+    for clip in clips:
+        args += ["-i", clip]
+    graph: List[str] = []
+    segments = ""
+    for i, probe in enumerate(probes):
+        graph.append(f"[{i}:v]setsar=1[v{i}]")
+        if probe["audio"] is not None:
+            segments += f"[v{i}][{i}:a]"
+        else:
+            segments += f"[v{i}][{_input_count(args)}:a]"
+            args += ["-f", "lavfi", "-t", str(probe["duration"]), "-i", "anullsrc=r=48000:cl=stereo"]
+    graph.append(f"{segments}concat=n={len(clips)}:v=1:a=1[cv][ca]")
+    video_out, audio_out = "[cv]", "[ca]"
+
+    if "watermark" in assets:
+        index = _input_count(args)
+        args += ["-i", assets["watermark"]]
+        graph.append(
+            f"[{index}:v]scale={int(video['width'] * WATERMARK_WIDTH_RATIO)}:-1,format=rgba,"
+            f"colorchannelmixer=aa={WATERMARK_OPACITY}[wm]"
+        )
+        graph.append(f"[cv][wm]overlay=W-w-{WATERMARK_MARGIN}:H-h-{WATERMARK_MARGIN}[vout]")
+        video_out = "[vout]"
+    if "bgm" in assets:
+        index = _input_count(args)
+        args += ["-stream_loop", "-1", "-i", assets["bgm"]]
+        graph.append(f"[{index}:a]volume={BGM_VOLUME}[bgm]")
+        graph.append("[ca][bgm]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]")
+        audio_out = "[aout]"
+
+    _run_ffmpeg(
+        args + [
+            "-filter_complex", ";".join(graph),
+            "-map", video_out, "-map", audio_out,
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(BRANDING_CRF),
+            "-pix_fmt", video["pix_fmt"] or "yuv420p", "-r", video["r_frame_rate"],
+            "-c:a", "aac", "-movflags", "+faststart",
+        ],
+        dst,
+    )
+
+
+def _input_count(args: List[str]) -> int:
+    return args.count("-i")
+
+
+def brand_video(video_url: str, assets: Dict[str, str]) -> str:
+    """Apply branding assets to a completed video; returns the branded file's path."""
+    dst = branded_video_path(video_url, assets)
+    if os.path.exists(dst):
+        return dst
+
+    src = cache_video(video_url)
+    main = probe_media(src)
+    if main["video"] is None:
+        raise ValueError("video has no video stream")
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+
+    clips = [src]
+    if "intro" in assets:
+        clips.insert(0, conform_clip(assets["intro"], main))
+    if "outro" in assets:
+        clips.append(conform_clip(assets["outro"], main))
+    probes = [main if clip == src else probe_media(clip) for clip in clips]
+
+    signatures = {(json.dumps(p["video"], sort_keys=True), json.dumps(p["audio"], sort_keys=True)) for p in probes}
+    if "watermark" not in assets and "bgm" not in assets and len(signatures) == 1 and main["audio"] is not None:
+        concat_copy(clips, dst)
+    else:
+        render_branding(clips, probes, main["video"], assets, dst)
+    return dst
+
+
+def schedule_branding(video_url: Optional[str], steps: Iterable[str], owner: str) -> Optional[Future]:
+    """Queue local branding of a completed video with the steps ``owner`` has assets for."""
+    assets = branding_assets(owner, steps)
+    if not assets or not branding_available() or not video_url or is_replay_url(video_url):
+        return None
+    dst = branded_video_path(video_url, assets)
+    return _submit_media_job(dst, [dst], brand_video, video_url, assets)
+
+
+def branding_status(video_url: str, steps: Iterable[str], owner: str) -> Tuple[str, Optional[str]]:
+    """Status ('ready', 'pending', 'failed', 'missing') and path of a video's branded version."""
+    assets = branding_assets(owner, steps)
+    if not assets:
+        return "missing", None
+    dst = branded_video_path(video_url, assets)
+    return _media_job_status(dst, [dst]), dst
+
+
+# ----------------- Renditions -----------------
+
+def _aspect_parts(aspect_ratio: str) -> Tuple[int, int]:
+    w, h = aspect_ratio.split(":")
+    return int(w), int(h)
+
+
+def frame_size(aspect_ratio: str, resolution: str) -> Tuple[int, int]:
+    """Pixel size of a rendition; the resolution names the short side."""
+    w, h = _aspect_parts(aspect_ratio)
+    short = RESOLUTION_HEIGHTS[resolution]
+    long = int(round(short * max(w, h) / min(w, h) / 2)) * 2
+    return (long, short) if w >= h else (short, long)
+
+
+def can_derive(master: Tuple[str, str], target: Tuple[str, str]) -> bool:
+    """Whether ``target`` is a centre crop of ``master`` scaled down (never up)."""
+    mw, mh = frame_size(*master)
+    w, h = _aspect_parts(target[0])
+    crop = (min(mw, mh * w // h), min(mh, mw * h // w))
+    tw, th = frame_size(*target)
+    return crop[0] >= tw and crop[1] >= th
+
+
+def plan_renditions(targets: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Choose the fewest, then cheapest, API renders that cover every (aspect ratio, resolution) target."""
+    targets = list(dict.fromkeys(targets))
+    candidates = [(ar, res) for ar in ASPECT_RATIOS for res in RESOLUTIONS]
+    covers = {c: {t for t in targets if can_derive(c, t)} for c in candidates}
+    best: Optional[Tuple[Any, ...]] = None
+    for size in range(1, len(targets) + 1):
+        for masters in itertools.combinations(candidates, size):
+            if set().union(*(covers[m] for m in masters)) != set(targets):
+                continue
+            rank = (sum(RESOLUTION_COST_FACTORS[res] for _, res in masters), -len(set(masters) & set(targets)))
+            if best is None or rank < best[0]:
+                best = (rank, masters)
+        if best is not None:
+            break
+    if best is None:
+        return []
+
+    plan = [{"aspect_ratio": ar, "resolution": res, "derived": []} for ar, res in best[1]]
+    for target in targets:
+        if target in best[1]:
+            continue
+        # Prefer a master with the same shape so less of the frame is cropped away
+        master = min(
+            (m for m in plan if target in covers[(m["aspect_ratio"], m["resolution"])]),
+            key=lambda m: m["aspect_ratio"] != target[0],
+        )
+        master["derived"].append(target)
+    return plan
+
+
+def rendition_path(video_url: str, aspect_ratio: str, resolution: str) -> str:
+    return os.path.join(MEDIA_DIR, f"{_url_key(video_url)}_{aspect_ratio.replace(':', 'x')}_{resolution}.mp4")
+
+
+def derive_rendition(video_url: str, aspect_ratio: str, resolution: str) -> str:
+    """Centre-crop and scale a master render into another format; audio is copied."""
+    dst = rendition_path(video_url, aspect_ratio, resolution)
+    if os.path.exists(dst):
+        return dst
+    src = cache_video(video_url)
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    w, h = _aspect_parts(aspect_ratio)
+    width, height = frame_size(aspect_ratio, resolution)
+    _run_ffmpeg(
+        [
+            "-i", src,
+            "-vf", f"crop='min(iw,ih*{w}/{h})':'min(ih,iw*{h}/{w})',scale={width}:{height},setsar=1",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(RENDITION_CRF),
+            "-c:a", "copy", "-movflags", "+faststart",
+        ],
+        dst,
+    )
+    return dst
+
+
+def schedule_rendition(video_url: str, aspect_ratio: str, resolution: str) -> Optional[Future]:
+    """Queue a derived rendition in the media pool; None when it already exists."""
+    dst = rendition_path(video_url, aspect_ratio, resolution)
+    return _submit_media_job(dst, [dst], derive_rendition, video_url, aspect_ratio, resolution)
+
+
+def run_rendition_plan(
+    api_key: str,
+    script: str,
+    plan: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    key_pool: Optional[KeyPool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Render the plan's masters concurrently and fan each out to its derived formats."""
+    with ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="pipio-rendition") as pool:
+        pending: Dict[Future, Dict[str, Any]] = {}
+        for master in plan:
+            job = {**config, "aspect_ratio": master["aspect_ratio"], "resolution": master["resolution"]}
+            if key_pool is not None:
+                future = pool.submit(key_pool.run, script=script, **job)
+            else:
+                future = pool.submit(run_generation_job, api_key, script=script, **job)
+            pending[future] = {**master, "script": script}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                info = pending.pop(future)
+                if "parent_job_id" in info:
+                    try:
+                        yield {**info, "status": "completed", "path": future.result()}
+                    except Exception as e:
+                        yield {**info, "status": "failed", "error": str(e)}
+                    continue
+                result = {**info, **_future_result(future)}
+                yield result
+
+                video_url = result.get("video_url")
+                for aspect_ratio, resolution in info["derived"]:
+                    child = {
+                        "aspect_ratio": aspect_ratio,
+                        "resolution": resolution,
+                        "script": script,
+                        "parent_job_id": result.get("job_id"),
+                        "video_url": video_url,
+                    }
+                    if not video_url or is_replay_url(video_url) or not FFMPEG_BIN:
+                        reason = "master render failed" if not video_url else "local rendering unavailable"
+                        yield {**child, "status": "SKIPPED", "error": reason}
+                        continue
+                    derived = schedule_rendition(video_url, aspect_ratio, resolution)
+                    if derived is None:
+                        yield {**child, "status": "completed", "path": rendition_path(video_url, aspect_ratio, resolution)}
+                    else:
+                        pending[derived] = child
+
+
+
+# ----------------- Bulk Export -----------------
+
+def _archive_member_name(index: int, job: Dict[str, Any]) -> str:
+    job_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(job.get("job_id") or "video"))
+    return f"videos/{index:04d}_{job_id}.mp4"
+
+
+def _archive_add_file(archive: Any, path: str, name: str) -> None:
+    if isinstance(archive, zipfile.ZipFile):
+        archive.write(path, name)
+    else:
+        archive.add(path, arcname=name)
+
+
+def _archive_add_bytes(archive: Any, name: str, data: bytes) -> None:
+    if isinstance(archive, zipfile.ZipFile):
+        archive.writestr(name, data)
+    else:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        archive.addfile(info, io.BytesIO(data))
+
+
+def _manifest_csv(manifest: List[Dict[str, Any]]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_MANIFEST_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(manifest)
+    return buf.getvalue().encode("utf-8")
+
+
+def export_path(prefix: str, ext: str) -> str:
+    """A unique file name in the export directory, pruning exports older than ``EXPORT_TTL_SECONDS``."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:  # another session's export, removed or still being written
+            pass
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(EXPORT_DIR, f"{prefix}_{stamp}_{uuid.uuid4().hex[:8]}.{ext}")
+
+
+def render_export_download(label: str, path: str, mime: str, key: str) -> None:
+    """Download button for an export file, read only when clicked; large files are left on disk."""
+    if not os.path.exists(path):
+        st.caption("Export expired - build it again")
+        return
+    size = os.path.getsize(path)
+    if size > EXPORT_BROWSER_MAX_BYTES:
+        st.info(
+            f"📁 {size / 1e6:.0f} MB is too large to download through the browser - "
+            f"collect `{os.path.abspath(path)}` from the server"
+        )
+        return
+    st.download_button(
+        label,
+        data=functools.partial(read_file_bytes, path),
+        file_name=os.path.basename(path),
+        mime=mime,
+        key=key,
+    )
+
+
+def export_video_archive(
+    jobs: List[Dict[str, Any]],
+    archive_format: str = "zip",
+    max_workers: int = EXPORT_DOWNLOAD_WORKERS,
+) -> Dict[str, Any]:
+    """Download job videos concurrently and stream them into a ZIP or tar archive with a JSON/CSV manifest."""
+    archive_path = export_path("pipio_videos", "zip" if archive_format == "zip" else "tar")
+
+    manifest: List[Dict[str, Any]] = []
+    if archive_format == "zip":
+        archive: Any = zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+    else:
+        archive = tarfile.open(archive_path, "w")
+
+    with archive, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipio-export") as pool:
+        futures: Dict[Future, Any] = {}
+        for index, job in enumerate(jobs):
+            entry = {field: job.get(field) for field in EXPORT_MANIFEST_FIELDS}
+            if job.get("video_url"):
+                futures[pool.submit(cache_video, job["video_url"])] = (index, job, entry)
+            else:
+                entry["error"] = "no video URL"
+                manifest.append(entry)
+
+        for future in as_completed(futures):
+            index, job, entry = futures[future]
+            try:
+                name = _archive_member_name(index, job)
+                _archive_add_file(archive, future.result(), name)
+                entry["file"] = name
+            except Exception as e:
+                entry["error"] = str(e)
+            manifest.append(entry)
+
+        _archive_add_bytes(archive, "manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+        _archive_add_bytes(archive, "manifest.csv", _manifest_csv(manifest))
+
+    exported = sum(1 for entry in manifest if entry.get("file"))
+    return {
+        "path": archive_path,
+        "exported": exported,
+        "failed": len(manifest) - exported,
+        "manifest": manifest,
+    }
+
+
+# ----------------- Job Store -----------------
+
+JOB_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    fingerprint TEXT NOT NULL,
+    job_id TEXT,
+    status TEXT,
+    timestamp TEXT,
+    actor_id TEXT,
+    voice_id TEXT,
+    record TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    PRIMARY KEY (owner, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS jobs_timestamp ON jobs (timestamp);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    user TEXT NOT NULL,
+    job_id TEXT,
+    projected REAL NOT NULL,
+    actual REAL
+);
+CREATE INDEX IF NOT EXISTS usage_day ON usage (day, user);
+CREATE TABLE IF NOT EXISTS drafts (
+    cache_key TEXT PRIMARY KEY,
+    job_id TEXT,
+    video_url TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    projected REAL NOT NULL,
+    request TEXT NOT NULL,
+    not_before TEXT NOT NULL,
+    reason TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS voice_durations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    voice_id TEXT NOT NULL,
+    spoken_words INTEGER NOT NULL,
+    pause_seconds REAL NOT NULL,
+    speaking_rate REAL NOT NULL,
+    duration REAL NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS voice_durations_voice ON voice_durations (voice_id, id);
+CREATE TABLE IF NOT EXISTS presets (
+    owner TEXT NOT NULL,
+    preset_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (owner, preset_id)
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    owner TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (owner, fingerprint)
+);
+CREATE TABLE IF NOT EXISTS renders (
+    owner TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    job_id TEXT,
+    video_url TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (owner, payload_hash)
+);
+CREATE TABLE IF NOT EXISTS session_blobs (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (session_id, key)
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    cron TEXT,
+    request TEXT NOT NULL,
+    options TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    key_label TEXT NOT NULL,
+    next_run TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    last_run TEXT,
+    last_status TEXT,
+    last_job_id TEXT,
+    last_error TEXT,
+    runs INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schedules_due ON schedules (enabled, next_run);
+"""
+
+
+@st.cache_resource
+def _init_job_store(path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(JOB_STORE_SCHEMA)
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(renders)")}:
+            conn.execute("DROP TABLE renders")  # an unscoped reuse cache from before renders had owners
+            conn.executescript(JOB_STORE_SCHEMA)
+        job_columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if not job_columns.get("owner"):
+            # Stores from before per-owner history keyed jobs by fingerprint alone
+            owner = "COALESCE(owner, '')" if "owner" in job_columns else "''"
+            conn.execute("ALTER TABLE jobs RENAME TO jobs_unscoped")
+            conn.executescript(JOB_STORE_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs SELECT fingerprint, job_id, status, timestamp, actor_id, voice_id, "
+                f"record, {owner} FROM jobs_unscoped"
+            )
+            conn.execute("DROP TABLE jobs_unscoped")
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(favorites)")}:
+            conn.execute("ALTER TABLE favorites RENAME TO favorites_unscoped")
+            conn.executescript(JOB_STORE_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO favorites SELECT jobs.owner, fingerprint, favorites_unscoped.created_at "
+                "FROM favorites_unscoped JOIN jobs USING (fingerprint)"
+            )
+            conn.execute("DROP TABLE favorites_unscoped")
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(presets)")}:
+            # Presets from before they had owners were shared; nobody can claim them now
+            conn.execute("ALTER TABLE presets RENAME TO presets_unscoped")
+            conn.executescript(JOB_STORE_SCHEMA)
+            conn.execute("INSERT INTO presets SELECT '', * FROM presets_unscoped")
+            conn.execute("DROP TABLE presets_unscoped")
+        conn.executescript(JOB_STORE_SCHEMA)  # indexes dropped along with a migrated table
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, timestamp)")
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+@contextmanager
+def job_store() -> Iterator[sqlite3.Connection]:
+    """Open a short-lived connection to the shared job store (one transaction)."""
+    conn = sqlite3.connect(_init_job_store(JOB_STORE_PATH), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def job_fingerprint(job: Dict[str, Any]) -> str:
+    """Stable identity for a job record, used to deduplicate merged histories."""
+    job_id = str(job.get("job_id") or "")
+    if job_id and job_id != "N/A":
+        return f"id:{job_id}"
+    raw = "|".join(str(job.get(k, "")) for k in ("timestamp", "status", "actor_id", "voice_id", "script"))
+    return "sha1:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_job_record(raw: Any) -> Optional[Dict[str, Any]]:
+    """Coerce an imported record into the history job shape, or None if unusable."""
+    if not isinstance(raw, dict):
+        return None
+    if not any(k in raw for k in ("job_id", "status", "script", "video_url")):
+        return None
+
+    job = dict(raw)
+    job["job_id"] = str(raw.get("job_id") or "N/A")
+    job["status"] = str(raw.get("status") or "unknown")
+    job["script"] = str(raw.get("script") or "")
+    job["video_url"] = raw.get("video_url") if isinstance(raw.get("video_url"), str) else None
+    job["timestamp"] = str(raw.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    job["actor_id"] = str(raw.get("actor_id") or "")
+    job["voice_id"] = str(raw.get("voice_id") or "")
+    return job
+
+
+def _job_row(job: Dict[str, Any]) -> Tuple[str, ...]:
+    return (
+        job_fingerprint(job),
+        job.get("job_id"),
+        job.get("status"),
+        job.get("timestamp"),
+        job.get("actor_id"),
+        job.get("voice_id"),
+        json.dumps(job, separators=(",", ":")),
+        job.get("owner"),
+    )
+
+
+def store_jobs(
+    jobs: Iterable[Dict[str, Any]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    replace: bool = False,
+) -> int:
+    """Bulk-insert jobs in batches, skipping ones their owner already has unless ``replace``; returns rows written."""
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    sql = f"{verb} INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    batch: List[Tuple[str, ...]] = []
+    with job_store() as conn:
+        before = conn.total_changes
+        for job in jobs:
+            batch.append(_job_row(job))
+            if len(batch) >= batch_size:
+                conn.executemany(sql, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(sql, batch)
+        return conn.total_changes - before
+
+
+def history_owner(api_key: str) -> str:
+    """Whose stored history a session sees: its key's identity, or just the session without a key."""
+    return usage_user(api_key) if api_key else "session:" + _session_id()
+
+
+def load_recent_jobs(owner: str, limit: int = HISTORY_LIMIT) -> List[Dict[str, Any]]:
+    """``owner``'s most recent jobs from the store, newest first."""
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT record FROM jobs WHERE owner = ? ORDER BY timestamp DESC LIMIT ?", (owner, limit)
+        ).fetchall()
+    return [json.loads(row["record"]) for row in rows]
+
+
+def iter_stored_jobs(
+    owner: str,
+    statuses: Optional[List[str]] = None,
+    search_term: str = "",
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Stream ``owner``'s jobs from the store, newest first, fetching ``batch_size`` rows at a time."""
+    sql = "SELECT record FROM jobs"
+    clauses: List[str] = ["owner = ?"]
+    params: List[Any] = [owner]
+    if statuses:
+        clauses.append(f"lower(status) IN ({', '.join('?' for _ in statuses)})")
+        params.extend(s.lower() for s in statuses)
+    if search_term:
+        clauses.append("instr(lower(json_extract(record, '$.script')), ?) > 0")
+        params.append(search_term.lower())
+    sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY timestamp DESC"
+
+    with job_store() as conn:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield json.loads(row["record"])
+
+
+def count_stored_jobs(owner: str) -> int:
+    with job_store() as conn:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE owner = ?", (owner,)).fetchone()[0]
+
+
+# ----------------- History Import -----------------
+
+_WHITESPACE = re.compile(r"\s*")
+_ARRAY_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def iter_json_records(fh: IO[bytes], chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[Any]:
+    """Incrementally yield records from a JSON array, JSON Lines, or a single JSON value."""
+    reader = io.TextIOWrapper(fh, encoding="utf-8-sig")
+    try:
+        yield from _iter_decoded_records(reader, chunk_size)
+    finally:
+        reader.detach()
+
+
+def _iter_decoded_records(reader: IO[str], chunk_size: int) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    in_array: Optional[bool] = None
+
+    while True:
+        # Skip whitespace and array separators, refilling the window as needed
+        while True:
+            pos = (_ARRAY_SEPARATOR if in_array else _WHITESPACE).match(buf, pos).end()
+            if pos < len(buf) or eof:
+                break
+            buf, pos = reader.read(chunk_size), 0
+            eof = not buf
+
+        if pos >= len(buf):
+            return
+        if in_array is None:
+            in_array = buf[pos] == "["
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        pos = end
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+        if not in_array and isinstance(obj, dict) and isinstance(obj.get("jobs"), list):
+            yield from obj["jobs"]
+        else:
+            yield obj
+
+
+def import_history_file(fh: IO[bytes], owner: str, batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Stream jobs and configuration from a JSON/JSONL file into ``owner``'s history in the job store."""
+    stats: Dict[str, Any] = {"jobs": 0, "imported": 0, "duplicates": 0, "invalid": 0, "config": {}, "presets": 0}
+    presets: List[Any] = []  # saved once store_jobs has released its write lock
+
+    def jobs() -> Iterator[Dict[str, Any]]:
+        for record in iter_json_records(fh):
+            if isinstance(record, dict) and isinstance(record.get("presets"), list):
+                presets.extend(record.pop("presets"))
+                if "job_id" not in record and not CONFIG_KEYS & record.keys():
+                    continue
+            if isinstance(record, dict) and CONFIG_KEYS & record.keys() and "job_id" not in record:
+                for key in CONFIG_KEYS & record.keys():
+                    try:
+                        stats["config"][key] = int(record[key])
+                    except (TypeError, ValueError, OverflowError):
+                        stats["invalid"] += 1
+                continue
+            job = normalize_job_record(record)
+            if job is None:
+                stats["invalid"] += 1
+                continue
+            stats["jobs"] += 1
+            yield {**job, "owner": owner}
+
+    stats["imported"] = store_jobs(jobs(), batch_size)
+    stats["duplicates"] = stats["jobs"] - stats["imported"]
+    for preset in presets:
+        try:
+            save_preset(owner, preset["name"], build_preset_settings(**preset["settings"]))
+            stats["presets"] += 1
+        except (KeyError, TypeError, ValueError):
+            stats["invalid"] += 1
+    return stats
+
+
+# ----------------- History Export -----------------
+
+def _flat_export_value(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"))
+
+
+def iter_jsonl_export(jobs: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    """Yield one compact JSON line per job."""
+    for job in jobs:
+        yield json.dumps({f: job.get(f) for f in fields}, separators=(",", ":")) + "\n"
+
+
+def iter_csv_export(jobs: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    """Yield a CSV header followed by one row per job."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fields)
+    for job in jobs:
+        writer.writerow([_flat_export_value(job.get(f)) for f in fields])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def write_parquet_export(
+    jobs: Iterable[Dict[str, Any]],
+    fields: List[str],
+    path: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Write jobs to a Parquet file one row group per batch; returns the row count."""
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    schema = pa.schema([(f, pa.string()) for f in fields])
+    rows = 0
+    columns: Dict[str, List[Optional[str]]] = {f: [] for f in fields}
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for job in jobs:
+            for f in fields:
+                columns[f].append(_flat_export_value(job.get(f)))
+            rows += 1
+            if rows % batch_size == 0:
+                writer.write_table(pa.table(columns, schema=schema))
+                columns = {f: [] for f in fields}
+        if columns[fields[0]]:
+            writer.write_table(pa.table(columns, schema=schema))
+    return rows
+
+
+def export_history_file(
+    owner: str,
+    fmt: str,
+    fields: List[str],
+    statuses: Optional[List[str]] = None,
+    search_term: str = "",
+) -> Dict[str, Any]:
+    """Stream ``owner``'s filtered jobs into an export file and return its path and row count."""
+    path = export_path("pipio_history", fmt)
+    fields = fields or HISTORY_EXPORT_FIELDS
+    rows = 0
+
+    def counted(jobs: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal rows
+        for job in jobs:
+            rows += 1
+            yield job
+
+    jobs = iter_stored_jobs(owner, statuses, search_term)
+    if fmt == "parquet":
+        rows = write_parquet_export(jobs, fields, path)
+    else:
+        lines = iter_jsonl_export if fmt == "jsonl" else iter_csv_export
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            fh.writelines(lines(counted(jobs), fields))
+    return {"path": path, "rows": rows}
+
+
+# ----------------- Template Campaigns -----------------
+
+@dataclass(frozen=True)
+class ScriptTemplate:
+    """A script template parsed once into literal text and ``{placeholder}`` slots."""
+
+    source: str
+    segments: Tuple[Tuple[str, Optional[str]], ...]
+
+    @property
+    def fields(self) -> List[str]:
+        """Placeholder names in order of first appearance."""
+        return list(dict.fromkeys(name for _, name in self.segments if name))
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """Fill the placeholders; raises KeyError naming the first missing value."""
+        parts: List[str] = []
+        for literal, name in self.segments:
+            parts.append(literal)
+            if name is not None:
+                value = values.get(name)
+                if value is None or str(value).strip() == "":
+                    raise KeyError(name)
+                parts.append(str(value).strip())
+        return "".join(parts)
+
+
+def compile_script_template(source: str) -> ScriptTemplate:
+    """Parse a template with ``{name}`` placeholders (``{{`` / ``}}`` escape braces)."""
+    segments: List[Tuple[str, Optional[str]]] = []
+    for literal, name, format_spec, conversion in string.Formatter().parse(source):
+        if name is not None and not name.isidentifier():
+            raise ValueError(f"Invalid placeholder {{{name}}}: use simple names like {{first_name}}")
+        if format_spec or conversion:
+            raise ValueError(f"Placeholder {{{name}}} cannot use format specs or conversions")
+        segments.append((literal, name))
+    return ScriptTemplate(source=source, segments=tuple(segments))
+
+
+def iter_csv_rows(fh: IO[bytes]) -> Iterator[Dict[str, str]]:
+    """Stream recipient rows from an uploaded CSV file."""
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            yield {(k or "").strip(): (v or "") for k, v in row.items()}
+    finally:
+        text.detach()
+
+
+def csv_header(fh: IO[bytes]) -> List[str]:
+    """Column names of an uploaded CSV file; rewinds the file afterwards."""
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    try:
+        return [c.strip() for c in next(csv.reader(text), [])]
+    finally:
+        text.detach()
+        fh.seek(0)
+
+
+def missing_template_columns(template: ScriptTemplate, columns: Iterable[str]) -> List[str]:
+    """Placeholders the CSV header does not provide."""
+    available = {c.strip() for c in columns}
+    return [name for name in template.fields if name not in available]
+
+
+def run_generation_job(
+    api_key: str,
+    actor_id: str,
+    voice_id: str,
+    script: str,
+    aspect_ratio: Optional[str] = None,
+    resolution: Optional[str] = None,
+    extras: Optional[Dict[str, Any]] = None,
+    max_seconds: int = MAX_POLL_SECONDS,
+    interval: int = POLL_INTERVAL_SECONDS,
+    fps: Optional[Any] = None,
+    http: Optional[requests.Session] = None,
+    reuse_renders: bool = False,
+) -> Dict[str, Any]:
+    """Submit a job and poll it to completion without touching the UI (safe in worker threads)."""
+    result: Dict[str, Any] = {"job_id": None, "status": "UNKNOWN", "video_url": None, "error": None}
+    try:
+        request = GenerationRequest.build(actor_id, voice_id, script, aspect_ratio, resolution, fps, extras)
+    except PayloadValidationError as e:
+        result.update(status="INVALID", error=str(e))
+        return result
+
+    result["payload_hash"] = request.fingerprint()
+    cached = load_render(usage_user(api_key), result["payload_hash"], http) if reuse_renders else None
+    if cached:
+        result.update(
+            job_id=reused_job_id(), status="completed", video_url=cached["video_url"], payload={},
+            reused=True, reused_from=cached["job_id"],
+        )
+        return result
+
+    try:
+        resp = submit_generation_request(api_key, request, http)
+    except CircuitOpenError as e:
+        result.update(status="CIRCUIT OPEN", error=str(e))
+        return result
+    except requests.RequestException as e:
+        result.update(status="failed", error=f"Network error: {e}")
+        return result
+
+    if resp.status_code not in (200, 201, 202):
+        result.update(status=f"HTTP {resp.status_code}", error=resp.text[:500])
+        return result
+
+    try:
+        initial_json = resp.json()
+    except Exception:
+        initial_json = {"raw_text": resp.text}
+
+    result["job_id"] = extract_job_id(initial_json)
+    result["video_url"] = extract_video_url(initial_json)
+    result["payload"] = initial_json
+    if result["video_url"]:
+        result["status"] = "completed"
+    elif result["job_id"]:
+        job_payload = wait_for_job(api_key, result["job_id"], max_seconds, interval, http=http)
+        result["status"] = job_payload_status(job_payload, "unknown")
+        result["video_url"] = extract_video_url(job_payload)
+        result["payload"] = job_payload
+    else:
+        result["error"] = "Could not detect job ID or video URL"
+    if result["video_url"] and not is_replay_url(result["video_url"]):
+        if result["status"].lower() in COMPLETED_STATUSES:
+            save_render(usage_user(api_key), result["payload_hash"], result["job_id"], result["video_url"])
+        record_duration_sample(
+            voice_id, script, (extras or {}).get("speakingRate"), extract_video_duration(result["payload"])
+        )
+    return result
+
+
+def run_template_campaign(
+    api_key: str,
+    template: ScriptTemplate,
+    rows: Iterable[Dict[str, str]],
+    config: Dict[str, Any],
+    max_in_flight: int = CAMPAIGN_MAX_IN_FLIGHT,
+    admit: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Optional[str]]] = None,
+    check_ids: Optional[Callable[[str, str], Tuple[str, str, List[str]]]] = None,
+    key_pool: Optional[KeyPool] = None,
+    presets: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Render one script per recipient row and pipeline the jobs, yielding results as they finish."""
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pipio-campaign") as pool:
+        pending: Dict[Future, Dict[str, Any]] = {}
+        for row_number, row in enumerate(rows, start=1):
+            job_config = dict(config)
+            preset_name = row.get(CAMPAIGN_PRESET_COLUMN, "").strip()
+            preset = (presets or {}).get(preset_id_for(preset_name)) if preset_name else None
+            if preset is not None:
+                job_config.update(preset["settings"])
+            for column in CAMPAIGN_OVERRIDE_COLUMNS:
+                if row.get(column, "").strip():
+                    job_config[column] = row[column].strip()
+            info = {
+                "row": row_number,
+                "actor_id": job_config["actor_id"],
+                "voice_id": job_config["voice_id"],
+                "settings": {k: job_config.get(k) for k in PRESET_SETTINGS},
+            }
+            if preset_name and preset is None:
+                yield {**info, "script": "", "status": "SKIPPED", "error": f"unknown preset '{preset_name}'"}
+                continue
+
+            try:
+                info["script"] = template.render(row)
+            except KeyError as e:
+                yield {**info, "script": "", "status": "SKIPPED", "error": f"missing value for {{{e.args[0]}}}"}
+                continue
+
+            request_fields = {k: v for k, v in job_config.items() if k not in ("max_seconds", "interval", "http", "reuse_renders")}
+            try:
+                GenerationRequest.build(script=info["script"], **request_fields)
+            except PayloadValidationError as e:
+                yield {**info, "status": "SKIPPED", "error": str(e)}
+                continue
+            if check_ids:
+                actor_id, voice_id, id_problems = check_ids(info["actor_id"], info["voice_id"])
+                if id_problems:
+                    yield {**info, "status": "SKIPPED", "error": "; ".join(id_problems)}
+                    continue
+                info["actor_id"] = job_config["actor_id"] = actor_id
+                info["voice_id"] = job_config["voice_id"] = voice_id
+
+            reason = admit(info, job_config) if admit else None
+            if reason:
+                yield {**info, "status": "DEFERRED", "error": reason}
+                continue
+
+            while len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield {**pending.pop(future), **_future_result(future)}
+
+            if key_pool is not None:
+                future = pool.submit(key_pool.run, script=info["script"], **job_config)
+            else:
+                future = pool.submit(run_generation_job, api_key, script=info["script"], **job_config)
+            pending[future] = info
+
+        for future in as_completed(pending):
+            yield {**pending[future], **_future_result(future)}
+
+
+def _future_result(future: Future) -> Dict[str, Any]:
+    try:
+        return future.result()
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+
+class CampaignRun:
+    """A template campaign driven by a background thread, so reruns cannot abort it."""
+
+    def __init__(
+        self,
+        results: Iterator[Dict[str, Any]],
+        finish: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        owner: str,
+    ):
+        self.owner = owner
+        self.counts = {"completed": 0, "failed": 0, "skipped": 0}
+        self.last_row = ""
+        self.error: Optional[str] = None
+        self.done = False
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(results, finish), name="pipio-campaign", daemon=True)
+        self._thread.start()
+
+    def _run(self, results: Iterator[Dict[str, Any]], finish: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]) -> None:
+        try:
+            for result in results:
+                record = finish(result)
+                with self._lock:
+                    if record is None:
+                        self.counts["skipped"] += 1
+                    else:
+                        self.counts["completed" if record.get("video_url") else "failed"] += 1
+                        self._records.append(record)
+                    self.last_row = f"Row {result['row']}: {job_status_badge(result['status'])}"
+        except Exception as e:  # report instead of dying silently with the thread
+            self.error = str(e)
+        finally:
+            self.done = True
+
+    def take_records(self) -> List[Dict[str, Any]]:
+        """History records finished since the last call, oldest first."""
+        with self._lock:
+            records, self._records = self._records, []
+        return records
+
+
+# ----------------- Script Analysis -----------------
+
+_ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand"), (100, "hundred")]
+_ORDINALS = {"one": "first", "two": "second", "three": "third", "five": "fifth", "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+_CURRENCIES = {"$": "dollars", "€": "euros", "£": "pounds"}
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "inc", "ltd", "jr", "sr", "no"}
+
+_NUMBER_TOKEN = re.compile(
+    r"(?P<currency>[$€£])?(?P<number>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<decimal>\d+))?(?P<suffix>%|st\b|nd\b|rd\b|th\b)?"
+)
+_SENTENCE_END = re.compile(r"([.!?…]+)[\"')\]]*(?=\s+|$)")
+_MINOR_PAUSE = re.compile(r"[,;:](?!\d)|\s[—–-]\s|—")
+
+
+def number_to_words(n: int) -> str:
+    """Spell out a non-negative integer ("1205" -> "one thousand two hundred five")."""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        return _TENS[n // 10] + (f"-{_ONES[n % 10]}" if n % 10 else "")
+    for scale, name in _SCALES:
+        if n >= scale:
+            head, rest = divmod(n, scale)
+            return f"{number_to_words(head)} {name}" + (f" {number_to_words(rest)}" if rest else "")
+    return str(n)
+
+
+def _ordinal(words: str) -> str:
+    head, _, last = words.rpartition(" ")
+    prefix, sep, unit = last.rpartition("-")
+    if unit in _ORDINALS:
+        unit = _ORDINALS[unit]
+    elif unit.endswith("y"):
+        unit = unit[:-1] + "ieth"
+    else:
+        unit += "th"
+    return f"{head} {prefix}{sep}{unit}".strip()
+
+
+def _spell_number(match: re.Match) -> str:
+    digits = match.group("number").replace(",", "")
+    value = int(digits)
+    if len(digits) == 4 and "," not in match.group("number") and not match.group("currency") and (
+        1100 <= value < 2000 or 2010 <= value < 2100
+    ):
+        # Read as a year: "nineteen ninety-nine", "twenty twenty-four"
+        century, rest = divmod(value, 100)
+        words = f"{number_to_words(century)} " + (
+            f"oh {_ONES[rest]}" if 0 < rest < 10 else number_to_words(rest) if rest else "hundred"
+        )
+    else:
+        words = number_to_words(value)
+
+    currency = match.group("currency")
+    decimal = match.group("decimal")
+    if currency:
+        words += f" {_CURRENCIES[currency]}"
+        if decimal and len(decimal) == 2 and int(decimal):
+            return f" {words} {number_to_words(int(decimal))} "
+    if decimal:
+        words += " point " + " ".join(_ONES[int(d)] for d in decimal)
+    suffix = match.group("suffix")
+    if suffix == "%":
+        words += " percent"
+    elif suffix:
+        words = _ordinal(words)
+    return f" {words} "
+
+
+def expand_numbers(text: str) -> str:
+    """Replace digits, currency, percentages and ordinals with the words a voice would say."""
+    return _NUMBER_TOKEN.sub(_spell_number, text)
+
+
+def split_sentences(script: str) -> List[str]:
+    """Split a script into sentences, keeping common abbreviations and decimals intact."""
+    sentences: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", script):
+        start = 0
+        for match in _SENTENCE_END.finditer(paragraph):
+            words = paragraph[start:match.start()].split()
+            if match.group(1) == "." and words and words[-1].lower().rstrip(".") in _ABBREVIATIONS:
+                continue
+            sentence = paragraph[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        tail = paragraph[start:].strip()
+        if tail:
+            sentences.append(tail)
+    return sentences
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def analyze_script(script: str) -> Dict[str, Any]:
+    """Segment a script and count what will actually be spoken (memoized per script)."""
+    sentences = split_sentences(script)
+    sentence_words = [len(expand_numbers(s).split()) for s in sentences]
+    pauses = max(len(sentences) - 1, 0) * SENTENCE_PAUSE_SECONDS
+    pauses += len(_MINOR_PAUSE.findall(script)) * CLAUSE_PAUSE_SECONDS
+    pauses += len(re.findall(r"\n\s*\n", script.strip())) * PARAGRAPH_PAUSE_SECONDS
+    return {
+        "characters": len(script),
+        "words": len(script.split()),
+        "spoken_words": sum(sentence_words),
+        "sentences": len(sentences),
+        "longest_sentence_words": max(sentence_words, default=0),
+        "pause_seconds": round(pauses, 2),
+    }
+
+
+def record_duration_sample(
+    voice_id: str, script: str, speaking_rate: Optional[float], duration: Optional[float]
+) -> None:
+    """Store a completed job's real duration for calibrating its voice's rate."""
+    if not voice_id or not duration or duration <= 0:
+        return
+    analysis = analyze_script(script)
+    if not analysis["spoken_words"]:
+        return
+    with job_store() as conn:
+        conn.execute(
+            "INSERT INTO voice_durations (voice_id, spoken_words, pause_seconds, speaking_rate, duration, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                voice_id,
+                analysis["spoken_words"],
+                analysis["pause_seconds"],
+                float(speaking_rate or 1.0),
+                float(duration),
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+    voice_speaking_rates.clear()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def voice_speaking_rates() -> Dict[str, Dict[str, float]]:
+    """Calibrated words per second per voice (and ``"*"`` across all voices)."""
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT voice_id, spoken_words, pause_seconds, speaking_rate, duration FROM ("
+            " SELECT *, ROW_NUMBER() OVER (PARTITION BY voice_id ORDER BY id DESC) AS n FROM voice_durations"
+            ") WHERE n <= ?",
+            (CALIBRATION_MAX_SAMPLES,),
+        ).fetchall()
+
+    totals: Dict[str, List[float]] = {}
+    for row in rows:
+        speaking_seconds = row["duration"] * row["speaking_rate"] - row["pause_seconds"]
+        if speaking_seconds <= 0:
+            continue
+        for key in (row["voice_id"], "*"):
+            words, seconds, samples = totals.get(key, [0.0, 0.0, 0])
+            totals[key] = [words + row["spoken_words"], seconds + speaking_seconds, samples + 1]
+    return {
+        key: {"words_per_second": words / seconds, "samples": samples}
+        for key, (words, seconds, samples) in totals.items()
+        if samples >= CALIBRATION_MIN_SAMPLES
+    }
+
+
+def speaking_rate_for(voice_id: Optional[str]) -> Tuple[float, str]:
+    """Words per second for a voice and where it came from ("voice", "global" or "default")."""
+    rates = voice_speaking_rates()
+    if voice_id and voice_id in rates:
+        return rates[voice_id]["words_per_second"], "voice"
+    if "*" in rates:
+        return rates["*"]["words_per_second"], "global"
+    return DEFAULT_WORDS_PER_SECOND, "default"
+
+
+def estimate_script_duration(script: str, voice_id: Optional[str] = None, speaking_rate: Optional[float] = None) -> float:
+    """Estimated spoken duration in seconds from the script analysis and the voice's calibrated rate."""
+    analysis = analyze_script(script)
+    words_per_second, _ = speaking_rate_for(voice_id)
+    return (analysis["spoken_words"] / words_per_second + analysis["pause_seconds"]) / float(speaking_rate or 1.0)
+
+
+# ----------------- Cost & Quota Scheduler -----------------
+
+def render_cost_for_duration(seconds: float, resolution: Optional[str], fps: Optional[str]) -> float:
+    """Credits for a render of the given length, resolution and frame rate."""
+    return (
+        seconds
+        * CREDITS_PER_RENDER_SECOND
+        * RESOLUTION_COST_FACTORS.get(resolution or "1080p", 1.0)
+        * FPS_COST_FACTORS.get(str(fps or "30"), 1.0)
+    )
+
+
+def estimate_render_cost(
+    script: str,
+    resolution: Optional[str],
+    fps: Optional[str],
+    voice_id: Optional[str] = None,
+    speaking_rate: Optional[float] = None,
+) -> float:
+    """Projected credits for rendering a script at a resolution and frame rate."""
+    duration = estimate_script_duration(script, voice_id, speaking_rate)
+    return round(render_cost_for_duration(duration, resolution, fps), 2)
+
+
+def extract_video_duration(payload: Dict[str, Any]) -> Optional[float]:
+    """Extract the rendered video duration (seconds) from an API response."""
+    candidates = ["duration", "videoDuration", "durationSeconds", "length"]
+
+    for source in [payload] + [payload.get(f) for f in ("data", "result", "output", "video")]:
+        if not isinstance(source, dict):
+            continue
+        for key in candidates:
+            val = source.get(key)
+            if isinstance(val, (int, float)) and not isinstance(val, bool) and val > 0:
+                return float(val)
+    return None
+
+
+def actual_render_cost(
+    payload: Dict[str, Any],
+    status: str,
+    projected: float,
+    resolution: Optional[str],
+    fps: Optional[str],
+) -> float:
+    """Measured cost of a finished job: failures are free, unknown durations use the projection."""
+    if status.lower() not in COMPLETED_STATUSES:
+        return 0.0
+    duration = extract_video_duration(payload)
+    if duration is None:
+        return projected
+    return round(render_cost_for_duration(duration, resolution, fps), 2)
+
+
+def usage_user(api_key: str) -> str:
+    """Budget identity for an API key (never stores the key itself)."""
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def usage_totals(day: Optional[str] = None, user: Optional[str] = None) -> Dict[str, float]:
+    """Projected and actual credits for a day (actual falls back to projected while running)."""
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    sql = "SELECT COALESCE(SUM(projected), 0), COALESCE(SUM(COALESCE(actual, projected)), 0) FROM usage WHERE day = ?"
+    params: List[Any] = [day]
+    if user:
+        sql += " AND user = ?"
+        params.append(user)
+    with job_store() as conn:
+        projected, actual = conn.execute(sql, params).fetchone()
+    return {"projected": projected, "actual": actual}
+
+
+def usage_history(days: int = 7) -> List[Dict[str, Any]]:
+    """Per-day projected vs. actual credits, oldest first."""
+    since = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT day, SUM(projected), SUM(COALESCE(actual, projected)), COUNT(*) "
+            "FROM usage WHERE day >= ? GROUP BY day ORDER BY day",
+            (since,),
+        ).fetchall()
+    return [{"day": r[0], "projected": r[1], "actual": r[2], "jobs": r[3]} for r in rows]
+
+
+def record_usage(user: str, projected: float, job_id: Optional[str] = None) -> int:
+    """Reserve projected credits for a job; returns the ledger entry id (0 while replaying a trace)."""
+    if replaying():
+        return 0
+    with job_store() as conn:
+        cur = conn.execute(
+            "INSERT INTO usage (day, user, job_id, projected) VALUES (?, ?, ?, ?)",
+            (datetime.now().strftime("%Y-%m-%d"), user, job_id, projected),
+        )
+        return cur.lastrowid
+
+
+def record_actual_usage(usage_id: int, actual: float, job_id: Optional[str] = None) -> None:
+    if not usage_id:
+        return
+    with job_store() as conn:
+        conn.execute(
+            "UPDATE usage SET actual = ?, job_id = COALESCE(?, job_id) WHERE id = ?",
+            (actual, job_id, usage_id),
+        )
+
+
+def is_off_peak(now: datetime) -> bool:
+    return now.hour >= OFF_PEAK_START_HOUR or now.hour < OFF_PEAK_END_HOUR
+
+
+def next_off_peak(now: datetime) -> datetime:
+    """Start of the next off-peak window (or now if already off-peak)."""
+    if is_off_peak(now):
+        return now
+    return now.replace(hour=OFF_PEAK_START_HOUR, minute=0, second=0, microsecond=0)
+
+
+def schedule_decision(
+    cost: float,
+    priority: str,
+    user: str,
+    daily_budget: float,
+    user_budget: float,
+    now: Optional[datetime] = None,
+) -> Tuple[Optional[datetime], str]:
+    """When a job may run: ``(None, "")`` for now, else the earliest dispatch time and why it waits."""
+    if replaying():
+        return None, ""
+    now = now or datetime.now()
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    daily_budget = min(daily_budget, MAX_DAILY_BUDGET)
+    user_budget = min(user_budget, MAX_USER_BUDGET)
+
+    if cost > min(daily_budget, user_budget):
+        raise BudgetExceededError(cost, min(daily_budget, user_budget))
+    if usage_totals()["actual"] + cost > daily_budget:
+        return tomorrow, "daily budget exhausted"
+    if usage_totals(user=user)["actual"] + cost > user_budget:
+        return tomorrow, "per-user budget exhausted"
+    if JOB_PRIORITIES.get(priority, 1) == JOB_PRIORITIES["Low"] and not is_off_peak(now):
+        return next_off_peak(now), "low priority - deferred to off-peak window"
+    return None, ""
+
+
+def enqueue_job(
+    user: str,
+    priority: str,
+    projected: float,
+    request: Dict[str, Any],
+    not_before: datetime,
+    reason: str,
+) -> int:
+    """Persist a deferred generation request; returns its queue id (0 while replaying a trace)."""
+    if replaying():
+        return 0
+    with job_store() as conn:
+        cur = conn.execute(
+            "INSERT INTO job_queue (user, priority, projected, request, not_before, reason, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                user,
+                JOB_PRIORITIES.get(priority, 1),
+                projected,
+                json.dumps(request),
+                not_before.strftime("%Y-%m-%d %H:%M:%S"),
+                reason,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+        return cur.lastrowid
+
+
+def queued_jobs(user: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Deferred jobs, highest priority and oldest first."""
+    sql = "SELECT * FROM job_queue"
+    params: List[Any] = []
+    if user:
+        sql += " WHERE user = ?"
+        params.append(user)
+    sql += " ORDER BY priority, created_at"
+    with job_store() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [{**dict(row), "request": json.loads(row["request"])} for row in rows]
+
+
+def claim_queued_jobs(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Take queue items off the queue; returns only those no other dispatcher took first."""
+    with job_store() as conn:
+        return [
+            item for item in items
+            if conn.execute("DELETE FROM job_queue WHERE id = ?", (item["id"],)).rowcount == 1
+        ]
+
+
+def pack_jobs(queue: List[Dict[str, Any]], remaining: float) -> List[Dict[str, Any]]:
+    """Pick queued jobs that fit in the remaining budget, first-fit in priority order."""
+    packed: List[Dict[str, Any]] = []
+    for item in sorted(queue, key=lambda q: (q["priority"], q["created_at"])):
+        if item["projected"] <= remaining:
+            packed.append(item)
+            remaining -= item["projected"]
+    return packed
+
+
+def dispatchable_jobs(
+    user: str,
+    daily_budget: float,
+    user_budget: float,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Queued jobs for ``user`` that are due and fit the remaining budgets."""
+    now_text = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    due = [q for q in queued_jobs(user) if q["not_before"] <= now_text]
+    remaining = min(
+        min(daily_budget, MAX_DAILY_BUDGET) - usage_totals()["actual"],
+        min(user_budget, MAX_USER_BUDGET) - usage_totals(user=user)["actual"],
+    )
+    return pack_jobs(due, max(remaining, 0.0))
+
+
+def dispatch_queued_jobs(
+    api_key: str,
+    items: List[Dict[str, Any]],
+    max_seconds: int = MAX_POLL_SECONDS,
+    interval: int = POLL_INTERVAL_SECONDS,
+    max_in_flight: int = CAMPAIGN_MAX_IN_FLIGHT,
+    http: Optional[requests.Session] = None,
+    key_pool: Optional[KeyPool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Run packed queue items concurrently, yielding results as they finish; usage is booked to ``api_key``."""
+    user = usage_user(api_key)
+    items = claim_queued_jobs(items)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pipio-dispatch") as pool:
+        futures: Dict[Future, Any] = {}
+        for item in items:
+            request = item["request"]
+            usage_id = record_usage(user, item["projected"])
+            if key_pool is not None:
+                future = pool.submit(key_pool.run, max_seconds=max_seconds, interval=interval, http=http, **request)
+            else:
+                future = pool.submit(
+                    run_generation_job, api_key, max_seconds=max_seconds, interval=interval, http=http, **request
+                )
+            futures[future] = (item, usage_id)
+
+        for future in as_completed(futures):
+            item, usage_id = futures[future]
+            request = item["request"]
+            result = _future_result(future)
+            if result["status"] == "CIRCUIT OPEN":
+                priority = {v: k for k, v in JOB_PRIORITIES.items()}.get(item["priority"], "Normal")
+                enqueue_job(
+                    user, priority, item["projected"], request, circuit_retry_time("generate", http), result["error"]
+                )
+            actual = 0.0 if result.get("reused") else actual_render_cost(
+                result.get("payload", {}), result["status"], item["projected"],
+                request.get("resolution"), request.get("fps"),
+            )
+            record_actual_usage(usage_id, actual, result.get("job_id"))
+            yield {**request, **result}
+
+
+# ----------------- Actor & Voice Catalog -----------------
+
+class CatalogIndex:
+    """In-memory lookup over catalog items: exact ID, prefix and fuzzy search."""
+
+    def __init__(self, items: List[Dict[str, str]]):
+        self.items = {item["id"]: item for item in items}
+        self._lower_ids = {item_id.lower(): item_id for item_id in self.items}
+        terms: Dict[str, set] = {}
+        for item in items:
+            for term in {item["id"].lower(), item["name"].lower(), *item["name"].lower().split()}:
+                terms.setdefault(term, set()).add(item["id"])
+        self._terms = sorted(terms)
+        self._term_ids = terms
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, item_id: str) -> Optional[Dict[str, str]]:
+        """Exact (case-insensitive) ID lookup."""
+        key = self._lower_ids.get(item_id.strip().lower())
+        return self.items.get(key) if key else None
+
+    def search(self, query: str, limit: int = CATALOG_SUGGESTIONS) -> List[Dict[str, str]]:
+        """Prefix matches on IDs, names and name words, topped up with fuzzy matches."""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        found: List[str] = []
+
+        def add(term: str) -> None:
+            for item_id in sorted(self._term_ids[term]):
+                if item_id not in found:
+                    found.append(item_id)
+
+        start = bisect.bisect_left(self._terms, query)
+        for term in self._terms[start:]:
+            if not term.startswith(query) or len(found) >= limit:
+                break
+            add(term)
+
+        if len(found) < limit:
+            for term in difflib.get_close_matches(query, self._terms, n=limit, cutoff=0.6):
+                add(term)
+
+        return [self.items[item_id] for item_id in found[:limit]]
+
+
+def parse_catalog_items(payload: Any) -> List[Dict[str, str]]:
+    """Normalize an actors/voices response into ``[{"id", "name"}]``."""
+    records = payload
+    if isinstance(payload, dict):
+        for key in ("data", "items", "results", "actors", "voices"):
+            if isinstance(payload.get(key), list):
+                records = payload[key]
+                break
+    if not isinstance(records, list):
+        return []
+
+    items: List[Dict[str, str]] = []
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        item_id = next(
+            (str(record[k]) for k in ("id", "actorId", "voiceId", "uuid") if isinstance(record.get(k), (str, int))),
+            None,
+        )
+        if not item_id:
+            continue
+        name = next(
+            (str(record[k]) for k in ("name", "displayName", "title", "label") if isinstance(record.get(k), str)),
+            item_id,
+        )
+        items.append({"id": item_id, "name": name})
+    return items
+
+
+def _catalog_path(kind: str, api_key: str) -> str:
+    return os.path.join(CATALOG_DIR, f"{kind}_{usage_user(api_key)[4:]}.json")
+
+
+def _save_catalog(path: str, catalog: Dict[str, Any]) -> None:
+    os.makedirs(CATALOG_DIR, exist_ok=True)
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(catalog, fh)
+    os.replace(tmp_path, path)
+
+
+@st.cache_resource
+def _catalog_memory() -> Dict[str, Dict[str, Any]]:
+    return {}
+
+
+def cached_catalog(api_key: str, kind: str) -> Optional[Dict[str, Any]]:
+    """The catalog as last fetched (memory, then disk), without touching the network."""
+    path = _catalog_path(kind, api_key)
+    memory = _catalog_memory()
+    catalog = memory.get(path)
+    if catalog is None and os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            catalog = json.load(fh)
+        memory[path] = catalog
+    return catalog
+
+
+def fetch_catalog(
+    api_key: str, kind: str, force: bool = False, http: Optional[requests.Session] = None
+) -> Optional[Dict[str, Any]]:
+    """Cached actor or voice catalog, revalidated with a conditional GET once its TTL expires."""
+    path = _catalog_path(kind, api_key)
+    memory = _catalog_memory()
+    catalog = cached_catalog(api_key, kind)
+
+    now = time.time()
+    if catalog and not force:
+        if now - catalog.get("fetched_at", 0) < CATALOG_TTL_SECONDS:
+            return catalog
+        if now - catalog.get("failed_at", 0) < CATALOG_RETRY_SECONDS:
+            return catalog
+
+    headers = _headers(api_key)
+    if catalog and catalog.get("etag"):
+        headers["If-None-Match"] = catalog["etag"]
+    if catalog and catalog.get("last_modified"):
+        headers["If-Modified-Since"] = catalog["last_modified"]
+
+    try:
+        with profile_section("network.catalog"):
+            r = send_request(http, "GET", PIPIO_CATALOG_URLS[kind], headers=headers, timeout=15)
+        if r.status_code == 304 and catalog:
+            catalog = {**catalog, "fetched_at": now, "failed_at": 0}
+        elif r.status_code == 200:
+            catalog = {
+                "items": parse_catalog_items(r.json()),
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "fetched_at": now,
+                "failed_at": 0,
+            }
+        else:
+            raise requests.HTTPError(f"HTTP {r.status_code}")
+    except (requests.RequestException, ValueError):
+        catalog = {**(catalog or {"items": [], "fetched_at": 0}), "failed_at": now}
+        memory[path] = catalog
+        return catalog if catalog["items"] else None
+
+    memory[path] = catalog
+    _save_catalog(path, catalog)
+    return catalog
+
+
+@st.cache_resource(max_entries=8)
+def _build_catalog_index(path: str, fetched_at: float, count: int) -> CatalogIndex:
+    return CatalogIndex(_catalog_memory()[path]["items"])
+
+
+def catalog_index(
+    api_key: str, kind: str, http: Optional[requests.Session] = None, refresh: bool = True
+) -> Optional[CatalogIndex]:
+    """Search index for a catalog; without ``refresh`` only an already fetched catalog is used."""
+    catalog = fetch_catalog(api_key, kind, http=http) if refresh else cached_catalog(api_key, kind)
+    if not catalog or not catalog.get("items"):
+        return None
+    return _build_catalog_index(_catalog_path(kind, api_key), catalog["fetched_at"], len(catalog["items"]))
+
+
+def resolve_catalog_ids(
+    api_key: str, actor_id: str, voice_id: str, http: Optional[requests.Session] = None
+) -> Tuple[str, str, List[str]]:
+    """Catalog spellings of the actor and voice IDs, plus a problem for each unknown one."""
+    resolved: List[str] = []
+    problems: List[str] = []
+    for kind, label, value in (("actors", "Actor", actor_id), ("voices", "Voice", voice_id)):
+        index = catalog_index(api_key, kind, http)
+        match = index.get(value) if index is not None else None
+        resolved.append(match["id"] if match else value)
+        if index is None or match:
+            continue
+        suggestions = ", ".join(f"`{item['id']}`" for item in index.search(value))
+        problems.append(f"Unknown {label} ID '{value}'" + (f" - did you mean {suggestions}?" if suggestions else ""))
+    return resolved[0], resolved[1], problems
+
+
+def _set_session_value(key: str, value: Any) -> None:
+    st.session_state[key] = value
+
+
+def render_catalog_hint(api_key: str, kind: str, key: str, http: Optional[requests.Session] = None) -> None:
+    """Show the matched catalog entry or clickable suggestions under an ID input."""
+    value = st.session_state.get(key, "")
+    index = catalog_index(api_key, kind, http) if api_key and value else None
+    if index is None:
+        return
+    match = index.get(value)
+    if match:
+        st.caption(f"✅ {match['name']}")
+        return
+    for item in index.search(value):
+        st.button(
+            f"{item['name']} · {item['id']}",
+            key=f"suggest_{key}_{item['id']}",
+            on_click=_set_session_value,
+            args=(key, item["id"]),
+        )
+
+
+# ----------------- Draft Previews -----------------
+
+def draft_cache_key(owner: str, actor_id: str, voice_id: str, aspect_ratio: Optional[str], script: str) -> str:
+    """Hash of ``owner`` and everything a draft depends on; resolution and extras do not matter."""
+    raw = json.dumps([owner, actor_id.strip(), voice_id.strip(), aspect_ratio, script.strip()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def draft_script(script: str, max_chars: int = DRAFT_MAX_CHARS) -> str:
+    """Leading sentences of a script, cut at a word boundary within ``max_chars``."""
+    sentences = re.split(r"(?<=[.!?])\s+", script.strip())
+    draft = ""
+    for sentence in sentences:
+        candidate = f"{draft} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        draft = candidate
+    if not draft:
+        draft = script.strip()[:max_chars].rsplit(" ", 1)[0]
+    return draft
+
+
+def make_draft_request(request: GenerationRequest) -> GenerationRequest:
+    """Short, low-resolution, no-extras version of a request."""
+    return replace(
+        request,
+        script=draft_script(request.script),
+        resolution=DRAFT_RESOLUTION,
+        fps=None,
+        extras={},
+    )
+
+
+def load_draft(cache_key: str) -> Optional[Dict[str, Any]]:
+    """A cached draft younger than ``DRAFT_TTL_SECONDS``; older ones are deleted."""
+    if replaying():
+        return None
+    cutoff = (datetime.now() - timedelta(seconds=DRAFT_TTL_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+    with job_store() as conn:
+        conn.execute("DELETE FROM drafts WHERE created_at < ?", (cutoff,))
+        row = conn.execute("SELECT * FROM drafts WHERE cache_key = ?", (cache_key,)).fetchone()
+    return dict(row) if row else None
+
+
+def save_draft(cache_key: str, job_id: Optional[str], video_url: str) -> Dict[str, Any]:
+    draft = {
+        "cache_key": cache_key,
+        "job_id": job_id,
+        "video_url": video_url,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if replaying():
+        return draft
+    with job_store() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO drafts VALUES (:cache_key, :job_id, :video_url, :created_at)", draft
+        )
+    return draft
+
+
+# ----------------- Presets, Favorites & Reuse -----------------
+
+def extras_from_widgets(values: Dict[str, Any]) -> Dict[str, Any]:
+    """API extras for the GENERATE tab's visual/audio widget values (defaults are omitted)."""
+    extras: Dict[str, Any] = {}
+    if values["bg_color"] != "#000000":
+        extras["backgroundColor"] = values["bg_color"]
+    if values["speaking_rate"] != 1.0:
+        extras["speakingRate"] = values["speaking_rate"]
+    if values["enable_captions"]:
+        extras["captions"] = True
+    if values["pitch"] != 1.0:
+        extras["pitch"] = values["pitch"]
+    if values["volume"] != 100:
+        extras["volume"] = values["volume"] / 100
+    if values["bg_blur"] > 0:
+        extras["backgroundBlur"] = values["bg_blur"]
+    if values["brightness"] != 100:
+        extras["brightness"] = values["brightness"] / 100
+    if values["contrast"] != 100:
+        extras["contrast"] = values["contrast"] / 100
+    return extras
+
+
+def widgets_from_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Session-state values that make the GENERATE widgets show a preset's settings."""
+    extras = settings.get("extras") or {}
+    return {
+        **SETTING_WIDGET_DEFAULTS,
+        "actor_id": settings.get("actor_id", ""),
+        "voice_id": settings.get("voice_id", ""),
+        "aspect_ratio": settings.get("aspect_ratio") or SETTING_WIDGET_DEFAULTS["aspect_ratio"],
+        "resolution": settings.get("resolution") or SETTING_WIDGET_DEFAULTS["resolution"],
+        "fps": str(settings.get("fps") or SETTING_WIDGET_DEFAULTS["fps"]),
+        "bg_color": extras.get("backgroundColor", "#000000"),
+        "bg_blur": int(extras.get("backgroundBlur", 0)),
+        "brightness": int(round(extras.get("brightness", 1.0) * 100)),
+        "contrast": int(round(extras.get("contrast", 1.0) * 100)),
+        "speaking_rate": float(extras.get("speakingRate", 1.0)),
+        "pitch": float(extras.get("pitch", 1.0)),
+        "volume": int(round(extras.get("volume", 1.0) * 100)),
+        "enable_captions": bool(extras.get("captions", False)),
+    }
+
+
+def preset_id_for(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.strip().lower()).strip("-")
+
+
+def build_preset_settings(
+    actor_id: str,
+    voice_id: str,
+    aspect_ratio: Optional[str] = None,
+    resolution: Optional[str] = None,
+    fps: Optional[Any] = None,
+    extras: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Validated, normalized preset settings; raises PayloadValidationError."""
+    request = GenerationRequest.build(actor_id, voice_id, "preset", aspect_ratio, resolution, fps, extras)
+    return {k: v for k, v in request.as_kwargs().items() if k in PRESET_SETTINGS}
+
+
+@st.cache_data(show_spinner=False)
+def load_presets(owner: str) -> Dict[str, Dict[str, Any]]:
+    """``owner``'s saved presets keyed by ID; cleared whenever a preset changes."""
+    with job_store() as conn:
+        rows = conn.execute("SELECT * FROM presets WHERE owner = ? ORDER BY name", (owner,)).fetchall()
+    return {row["preset_id"]: {**dict(row), "settings": json.loads(row["settings"])} for row in rows}
+
+
+def save_preset(owner: str, name: str, settings: Dict[str, Any]) -> str:
+    """Create or overwrite one of ``owner``'s presets; returns its ID."""
+    preset_id = preset_id_for(name)
+    if not preset_id:
+        raise ValueError("preset name needs at least one letter or digit")
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with job_store() as conn:
+        conn.execute(
+            "INSERT INTO presets (owner, preset_id, name, settings, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(owner, preset_id) DO UPDATE SET name = excluded.name, settings = excluded.settings, "
+            "updated_at = excluded.updated_at",
+            (owner, preset_id, name.strip(), json.dumps(settings, sort_keys=True), now, now),
+        )
+    load_presets.clear()
+    return preset_id
+
+
+def delete_preset(owner: str, preset_id: str) -> None:
+    with job_store() as conn:
+        conn.execute("DELETE FROM presets WHERE owner = ? AND preset_id = ?", (owner, preset_id))
+    load_presets.clear()
+
+
+def apply_preset(preset_id: str) -> None:
+    """Load a preset into the GENERATE widgets (on_click callback, so before they render)."""
+    preset = load_presets(session.owner).get(preset_id)
+    if preset is not None:
+        st.session_state.update(widgets_from_settings(preset["settings"]))
+
+
+def load_favorites(owner: str) -> Dict[str, str]:
+    """``owner``'s favorited job fingerprints and when they were starred."""
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT favorites.* FROM favorites JOIN jobs USING (owner, fingerprint) WHERE owner = ?", (owner,)
+        )
+        return {row["fingerprint"]: row["created_at"] for row in rows}
+
+
+def toggle_favorite(job: Dict[str, Any]) -> bool:
+    """Star or unstar a job in the session and the job store; returns whether it is now a favorite."""
+    favorites = session.favorites
+    fingerprint = job_fingerprint(job)
+    with job_store() as conn:
+        if fingerprint in favorites:
+            conn.execute("DELETE FROM favorites WHERE owner = ? AND fingerprint = ?", (session.owner, fingerprint))
+            del favorites[fingerprint]
+            return False
+        favorites[fingerprint] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute(
+            "INSERT OR REPLACE INTO favorites VALUES (?, ?, ?)", (session.owner, fingerprint, favorites[fingerprint])
+        )
+        return True
+
+
+def load_favorite_jobs(owner: str) -> List[Dict[str, Any]]:
+    """All of ``owner``'s favorited jobs from the job store, newest first."""
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT jobs.record FROM jobs JOIN favorites USING (owner, fingerprint) "
+            "WHERE owner = ? ORDER BY jobs.timestamp DESC",
+            (owner,),
+        ).fetchall()
+    return [json.loads(row["record"]) for row in rows]
+
+
+def load_render(owner: str, payload_hash: str, http: Optional[requests.Session] = None) -> Optional[Dict[str, Any]]:
+    """``owner``'s recent render of an identical request, if its video still loads."""
+    if replaying():
+        return None
+    cutoff = (datetime.now() - timedelta(seconds=RENDER_REUSE_TTL_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+    with job_store() as conn:
+        conn.execute("DELETE FROM renders WHERE created_at < ?", (cutoff,))
+        row = conn.execute(
+            "SELECT * FROM renders WHERE owner = ? AND payload_hash = ?", (owner, payload_hash)
+        ).fetchone()
+    if row is None:
+        return None
+    try:
+        with send_request(
+            http, "GET", row["video_url"], stream=True, timeout=RENDER_CHECK_TIMEOUT, allow_redirects=True
+        ) as r:
+            reachable = r.status_code < 400
+    except CircuitOpenError:
+        return None
+    except requests.RequestException:
+        reachable = False
+    if not reachable:
+        with job_store() as conn:
+            conn.execute("DELETE FROM renders WHERE owner = ? AND payload_hash = ?", (owner, payload_hash))
+        return None
+    return dict(row)
+
+
+def save_render(owner: str, payload_hash: str, job_id: Optional[str], video_url: str) -> None:
+    if replaying():
+        return
+    with job_store() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?, ?)",
+            (owner, payload_hash, job_id, video_url, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+
+
+def reused_job_id() -> str:
+    """A history identity of its own for a reused render, so it never replaces the original's row."""
+    return f"reuse-{uuid.uuid4().hex[:12]}"
+
+
+# ----------------- Scheduled Jobs -----------------
+
+_CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_cron_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    """Expand one cron field (``*``, ``5``, ``1-5``, ``*/15``, ``0,30``) to its values."""
+    values = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        try:
+            step = int(step_text) if step_text else 1
+            if base == "*":
+                start, end = low, high
+            elif "-" in base:
+                start, end = (int(x) for x in base.split("-", 1))
+            else:
+                start = int(base)
+                end = high if step_text else start
+        except ValueError:
+            raise ValueError(f"Invalid {name} field '{text}'") from None
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid {name} field '{text}' (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """A five-field cron expression: minute, hour, day of month, month, day of week (0/7 = Sunday)."""
+
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSchedule":
+        """Parse an expression or ``@daily``-style macro; raises ValueError."""
+        text = expression.strip()
+        fields = CRON_MACROS.get(text.lower(), text).split()
+        if len(fields) != 5:
+            raise ValueError("Cron expressions have 5 fields: minute hour day month weekday")
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(field, *spec) for field, spec in zip(fields, _CRON_FIELDS)
+        )
+        return cls(
+            text, minutes, hours, days, months, frozenset(d % 7 for d in weekdays),
+            fields[2].startswith("*"), fields[4].startswith("*"),
+        )
+
+    def _day_matches(self, when: datetime) -> bool:
+        in_days = when.day in self.days
+        in_weekdays = (when.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """The first matching minute strictly after ``after``; raises ValueError if it never fires."""
+        when = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = when + timedelta(days=366 * 28)
+        while when < limit:
+            if when.month not in self.months:
+                when = (when.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(when):
+                when = (when + timedelta(days=1)).replace(hour=0, minute=0)
+            elif when.hour not in self.hours:
+                when = (when + timedelta(hours=1)).replace(minute=0)
+            elif when.minute not in self.minutes:
+                when += timedelta(minutes=1)
+            else:
+                return when
+        raise ValueError(f"'{self.expression}' never fires")
+
+    def upcoming(self, after: datetime, count: int = SCHEDULE_PREVIEW_RUNS) -> List[datetime]:
+        runs: List[datetime] = []
+        for _ in range(count):
+            after = self.next_after(after)
+            runs.append(after)
+        return runs
+
+
+def render_schedule_script(source: str, fired_at: datetime, run: int) -> str:
+    """Fill a scheduled script's ``{date}``, ``{weekday}``, ``{month}``, ``{time}`` and ``{run}`` placeholders."""
+    template = compile_script_template(source)
+    unknown = [name for name in template.fields if name not in SCHEDULE_SCRIPT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown placeholders: {', '.join('{' + name + '}' for name in unknown)}")
+    return template.render({
+        "date": fired_at.strftime("%Y-%m-%d"),
+        "weekday": fired_at.strftime("%A"),
+        "month": fired_at.strftime("%B"),
+        "time": fired_at.strftime("%H:%M"),
+        "run": run,
+    })
+
+
+def _schedule_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {**dict(row), "request": json.loads(row["request"]), "options": json.loads(row["options"])}
+
+
+def create_schedule(
+    name: str,
+    api_key: str,
+    request: Dict[str, Any],
+    cron: Optional[str] = None,
+    run_at: Optional[datetime] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Store a recurring (``cron``) or one-off (``run_at``) generation; returns its id."""
+    next_run = CronSchedule.parse(cron).next_after(datetime.now()) if cron else run_at
+    if next_run is None:
+        raise ValueError("A schedule needs a cron expression or a run time")
+    with job_store() as conn:
+        cur = conn.execute(
+            "INSERT INTO schedules (name, cron, request, options, key_id, key_label, next_run, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                name,
+                cron.strip() if cron else None,
+                json.dumps(request),
+                json.dumps(options or {}),
+                usage_user(api_key),
+                mask_api_key(api_key),
+                next_run.strftime("%Y-%m-%d %H:%M:%S"),
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+        return cur.lastrowid
+
+
+def list_schedules(key_id: str) -> List[Dict[str, Any]]:
+    """The schedules owned by one key identity, soonest next run first (finished and paused ones last)."""
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT * FROM schedules WHERE key_id = ? ORDER BY enabled DESC, next_run IS NULL, next_run, id",
+            (key_id,),
+        ).fetchall()
+    return [_schedule_row(row) for row in rows]
+
+
+def delete_schedule(schedule_id: int, key_id: str) -> None:
+    with job_store() as conn:
+        conn.execute("DELETE FROM schedules WHERE id = ? AND key_id = ?", (schedule_id, key_id))
+
+
+def set_schedule_enabled(schedule_id: int, key_id: str, enabled: bool) -> None:
+    """Pause or resume one of ``key_id``'s schedules; resuming a recurring one skips the runs it missed."""
+    with job_store() as conn:
+        row = conn.execute(
+            "SELECT cron FROM schedules WHERE id = ? AND key_id = ?", (schedule_id, key_id)
+        ).fetchone()
+        if row is None:
+            return
+        if enabled and row["cron"]:
+            next_run = CronSchedule.parse(row["cron"]).next_after(datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+            conn.execute("UPDATE schedules SET enabled = 1, next_run = ? WHERE id = ?", (next_run, schedule_id))
+        else:
+            conn.execute("UPDATE schedules SET enabled = ? WHERE id = ?", (int(enabled), schedule_id))
+
+
+def run_schedule_now(schedule_id: int, key_id: str) -> None:
+    """Make one of ``key_id``'s schedules due on the dispatcher's next tick without changing its cadence."""
+    with job_store() as conn:
+        conn.execute(
+            "UPDATE schedules SET enabled = 1, next_run = ? WHERE id = ? AND key_id = ?",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), schedule_id, key_id),
+        )
+
+
+def due_schedules(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    now_text = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    with job_store() as conn:
+        rows = conn.execute(
+            "SELECT * FROM schedules WHERE enabled = 1 AND next_run IS NOT NULL AND next_run <= ? ORDER BY next_run",
+            (now_text,),
+        ).fetchall()
+    return [_schedule_row(row) for row in rows]
+
+
+def claim_schedule(schedule: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+    """Advance a due schedule's next run if nobody else has; True when this caller owns the run."""
+    now = now or datetime.now()
+    next_run = CronSchedule.parse(schedule["cron"]).next_after(now) if schedule["cron"] else None
+    with job_store() as conn:
+        cur = conn.execute(
+            "UPDATE schedules SET next_run = ?, last_run = ? WHERE id = ? AND enabled = 1 AND next_run = ?",
+            (
+                next_run.strftime("%Y-%m-%d %H:%M:%S") if next_run else None,
+                now.strftime("%Y-%m-%d %H:%M:%S"),
+                schedule["id"],
+                schedule["next_run"],
+            ),
+        )
+        return cur.rowcount == 1
+
+
+def finish_schedule_run(schedule_id: int, result: Dict[str, Any]) -> None:
+    with job_store() as conn:
+        conn.execute(
+            "UPDATE schedules SET last_status = ?, last_job_id = ?, last_error = ?, runs = runs + 1 WHERE id = ?",
+            (result.get("status"), result.get("job_id"), result.get("error"), schedule_id),
+        )
+
+
+def run_schedule(
+    schedule: Dict[str, Any], registry: ApiKeyRegistry, fired_at: datetime, api_key: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Fire one claimed schedule on its owner's ``api_key``; returns the history record of a finished job."""
+    options = schedule["options"]
+    script = render_schedule_script(schedule["request"]["script"], fired_at, schedule["runs"] + 1)
+    job = {**schedule["request"], "script": script}
+    state = registry.ensure(api_key) if api_key else None
+    if state is None:
+        result = {"status": "NO API KEY", "error": f"key {schedule['key_label']} is not known to this server"}
+    else:
+        user = usage_user(state.api_key)
+        cost = estimate_render_cost(
+            job["script"], job.get("resolution"), job.get("fps"), job.get("voice_id"),
+            (job.get("extras") or {}).get("speakingRate"),
+        )
+        try:
+            not_before, reason = schedule_decision(
+                cost, "Normal", user,
+                options.get("daily_budget", DEFAULT_DAILY_BUDGET), options.get("user_budget", DEFAULT_USER_BUDGET),
+            )
+            rejection = ""
+        except BudgetExceededError as e:
+            not_before, reason, rejection = None, "", str(e)
+        if rejection:
+            result = {"status": "REJECTED", "error": rejection}
+        elif not_before is not None:
+            enqueue_job(user, "Normal", cost, job, not_before, reason)
+            result = {"status": "DEFERRED", "error": reason}
+        else:
+            usage_id = record_usage(user, cost)
+            result = KeyPool([state.api_key], registry).run(**job)
+            if result["status"] == "CIRCUIT OPEN":
+                enqueue_job(user, "Normal", cost, job, circuit_retry_time("generate", state.session), result["error"])
+            record_actual_usage(
+                usage_id,
+                actual_render_cost(result.get("payload", {}), result["status"], cost, job.get("resolution"), job.get("fps")),
+                result.get("job_id"),
+            )
+    finish_schedule_run(schedule["id"], result)
+    if result["status"] in {"NO API KEY", "REJECTED", "DEFERRED", "CIRCUIT OPEN"}:
+        return None
+
+    record = {
+        "job_id": result.get("job_id") or "N/A",
+        "status": result["status"],
+        "script": job["script"][:120],
+        "video_url": result.get("video_url"),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "actor_id": job["actor_id"],
+        "voice_id": job["voice_id"],
+        "payload_hash": result.get("payload_hash"),
+        "branding": options.get("branding", []),
+        "schedule": schedule["name"],
+        "owner": schedule["key_id"],
+    }
+    store_jobs([record], replace=True)
+    schedule_media_artifacts(result.get("video_url"))
+    schedule_branding(result.get("video_url"), record["branding"], record["owner"])
+    return record
+
+
+class ScheduleDispatcher:
+    """Background thread that fires due schedules for the whole process."""
+
+    def __init__(
+        self,
+        registry: ApiKeyRegistry,
+        tick: float = SCHEDULER_TICK_SECONDS,
+        jitter: float = SCHEDULE_JITTER_SECONDS,
+        max_in_flight: int = SCHEDULER_MAX_IN_FLIGHT,
+    ):
+        self.registry = registry
+        self.tick = tick
+        self.jitter = jitter
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pipio-schedule")
+        self.waiting: List[Tuple[float, int, Dict[str, Any]]] = []
+        self.running = 0
+        self.completed = 0
+        self.finished: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=HISTORY_LIMIT)
+        self._queued: set = set()
+        self._keys: Dict[str, str] = {}
+        self.last_tick: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="pipio-scheduler", daemon=True)
+        self._thread.start()
+
+    def authorize(self, api_key: str) -> None:
+        """Let this key's schedules run on it; called by sessions that entered the key."""
+        with self._lock:
+            self._keys[usage_user(api_key)] = api_key
+
+    def key_for(self, key_id: str) -> Optional[str]:
+        with self._lock:
+            api_key = self._keys.get(key_id)
+        if api_key is None:
+            api_key = next(
+                (k for k in configured_api_keys("", shared=True) if usage_user(k) == key_id), None
+            )
+        return api_key
+
+    def _loop(self) -> None:
+        next_check = 0.0
+        while True:
+            now = time.time()
+            try:
+                if now >= next_check:
+                    next_check = now + self.tick
+                    for schedule in due_schedules():
+                        if schedule["id"] not in self._queued:
+                            self._queued.add(schedule["id"])
+                            submit_at = now + random.uniform(0, self.jitter)
+                            heapq.heappush(self.waiting, (submit_at, schedule["id"], schedule))
+                    self.last_tick, self.last_error = datetime.now(), None
+                while self.waiting and self.waiting[0][0] <= now:
+                    _, schedule_id, schedule = heapq.heappop(self.waiting)
+                    self._queued.discard(schedule_id)
+                    fired_at = datetime.now()
+                    if claim_schedule(schedule, fired_at):
+                        with self._lock:
+                            self.running += 1
+                        self.pool.submit(self._run, schedule, fired_at)
+            except Exception as e:  # keep the thread alive through store or parse errors
+                self.last_error = str(e)
+            time.sleep(1.0)
+
+    def _run(self, schedule: Dict[str, Any], fired_at: datetime) -> None:
+        record = None
+        try:
+            record = run_schedule(schedule, self.registry, fired_at, self.key_for(schedule["key_id"]))
+        except Exception as e:
+            finish_schedule_run(schedule["id"], {"status": "failed", "error": str(e)})
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                if record is not None:
+                    self.finished.append((self.completed, schedule["key_id"], record))
+
+    def runs_since(self, seen: int, key_id: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """The completion count and ``key_id``'s history records finished after ``seen``, oldest first."""
+        with self._lock:
+            records = [record for number, owner, record in self.finished if number > seen and owner == key_id]
+            return self.completed, records
+
+
+@st.cache_resource
+def schedule_dispatcher() -> ScheduleDispatcher:
+    return ScheduleDispatcher(api_key_registry())
+
+
+# ----------------- Profiling -----------------
+
+@contextmanager
+def profile_section(name: str) -> Iterator[None]:
+    """Time a block into the current rerun's profile (no-op unless profiling is on)."""
+    run = st.session_state.get("_profile_run") if get_script_run_ctx(suppress_warning=True) is not None else None
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sections = run["sections"]
+        sections[name] = sections.get(name, 0.0) + time.perf_counter() - start
+
+
+def approx_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate deep size of a container in bytes."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, seen) for item in obj)
+    return size
+
+
+def session_state_sizes() -> Dict[str, int]:
+    """Approximate bytes held per session-state key, largest first."""
+    sizes = {str(k): approx_size(v) for k, v in st.session_state.items() if not str(k).startswith("_profile")}
+    return dict(sorted(sizes.items(), key=lambda kv: kv[1], reverse=True))
+
+
+class MemoryTracing:
+    """Reference count over sessions for the process-wide tracemalloc."""
+
+    def __init__(self, idle_ttl: float = MEMORY_TRACE_IDLE_SECONDS):
+        self.idle_ttl = idle_ttl
+        self._holders: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hold(self, session_id: str, wanted: bool) -> None:
+        now = time.time()
+        with self._lock:
+            if wanted:
+                self._holders[session_id] = now
+            else:
+                self._holders.pop(session_id, None)
+            for holder, seen in list(self._holders.items()):
+                if now - seen > self.idle_ttl:
+                    del self._holders[holder]
+            if self._holders and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif not self._holders and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+@st.cache_resource
+def memory_tracing() -> MemoryTracing:
+    return MemoryTracing()
+
+
+def begin_profile_run() -> bool:
+    """Start timing this rerun if profiling is enabled; returns whether it is."""
+    memory_tracing().hold(
+        _session_id(), bool(st.session_state.get("profiling_enabled") and st.session_state.get("profiling_memory"))
+    )
+    if not st.session_state.get("profiling_enabled"):
+        st.session_state.pop("_profile_run", None)
+        return False
+
+    capture = st.session_state.get("profiling_capture", "off")
+    profiler: Any = None
+    if capture == "cProfile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif capture == "pyinstrument" and InstrumentProfiler is not None:
+        profiler = InstrumentProfiler()
+        profiler.start()
+
+    st.session_state["_profile_run"] = {
+        "started": time.perf_counter(),
+        "sections": {},
+        "capture": capture,
+        "profiler": profiler,
+    }
+    return True
+
+
+def end_profile_run() -> None:
+    """Stop timers and profilers and append the rerun summary to the history."""
+    run = st.session_state.pop("_profile_run", None)
+    if run is None:
+        return
+
+    summary: Dict[str, Any] = {
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+        "total": time.perf_counter() - run["started"],
+        "sections": run["sections"],
+    }
+
+    profiler = run["profiler"]
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        summary["report"] = buf.getvalue()
+    elif profiler is not None:
+        profiler.stop()
+        summary["report"] = profiler.output_text(unicode=True, color=False)
+
+    if st.session_state.get("profiling_memory") and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        summary["memory"] = {
+            "traced_current": current,
+            "traced_peak": peak,
+            "top_allocations": [f"{stat.size / 1024:.1f} KiB  {stat.traceback}" for stat in top],
+        }
+    summary["session_state"] = session_state_sizes()
+
+    # Capped by count and size so the history stays in memory and is never offloaded
+    runs = session.get_large("profile_runs", [])
+    for previous in runs:
+        previous.pop("report", None)
+    runs.append(summary)
+    del runs[:-PROFILE_HISTORY_RUNS]
+    while len(runs) > 1 and approx_size(runs) > PROFILE_HISTORY_BYTES:
+        del runs[0]
+    st.session_state["profile_runs"] = runs
+
+
+def slowest_sections(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-section timing stats over recent reruns, slowest average first."""
+    stats: Dict[str, List[float]] = {}
+    for run in runs:
+        for name, seconds in run["sections"].items():
+            stats.setdefault(name, []).append(seconds)
+    avg_total = sum(run["total"] for run in runs) / len(runs) if runs else 0.0
+    rows = [
+        {
+            "section": name,
+            "avg ms": round(sum(times) / len(runs) * 1000, 1),
+            "max ms": round(max(times) * 1000, 1),
+            "last ms": round(runs[-1]["sections"].get(name, 0.0) * 1000, 1),
+            "share %": round(sum(times) / len(runs) / avg_total * 100, 1) if avg_total else 0.0,
+        }
+        for name, times in stats.items()
+    ]
+    return sorted(rows, key=lambda row: row["avg ms"], reverse=True)
+
+
+def render_profiling_panel() -> None:
+    """Profiling controls and the rerun-cost report (ADVANCED tab)."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.toggle("Enable profiling", key="profiling_enabled")
+    with col2:
+        st.selectbox("Per-rerun capture", PROFILE_CAPTURE_MODES, key="profiling_capture")
+    with col3:
+        st.checkbox(
+            "Track memory (tracemalloc)", key="profiling_memory",
+            help="tracemalloc is process-wide: it stays on while any session tracks memory",
+        )
+
+    compaction = st.session_state.get("session_compaction") or {}
+    st.caption(
+        f"Session state ≈ {session.size() / 1024:.1f} KiB · last compaction dropped "
+        f"{compaction.get('flags', 0)} stale flags and {compaction.get('duplicates', 0)} duplicate jobs, "
+        f"offloaded {compaction.get('offloaded', 0)} large values"
+    )
+
+    runs = session.get_large("profile_runs", [])
+    if not runs:
+        st.caption("Enable profiling and interact with the app to collect rerun timings")
+        return
+
+    avg_total = sum(run["total"] for run in runs) / len(runs)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Reruns profiled", len(runs))
+    with col2:
+        st.metric("Avg rerun", f"{avg_total * 1000:.0f} ms")
+    with col3:
+        st.metric("Last rerun", f"{runs[-1]['total'] * 1000:.0f} ms")
+
+    st.dataframe(slowest_sections(runs), use_container_width=True, hide_index=True)
+
+    last = runs[-1]
+    if last.get("report"):
+        with st.expander(f"🔬 {st.session_state.get('profiling_capture')} report (last rerun)", expanded=False):
+            st.code(last["report"])
+    with st.expander("🧠 Session state size (last rerun)", expanded=False):
+        sizes = last["session_state"]
+        st.caption(f"Total ≈ {sum(sizes.values()) / 1024:.1f} KiB across {len(sizes)} keys")
+        st.dataframe(
+            [{"key": k, "KiB": round(v / 1024, 1)} for k, v in list(sizes.items())[:15]],
+            use_container_width=True,
+            hide_index=True,
+        )
+        memory = last.get("memory")
+        if memory:
+            st.caption(
+                f"tracemalloc: current {memory['traced_current'] / 1e6:.1f} MB · "
+                f"peak {memory['traced_peak'] / 1e6:.1f} MB"
+            )
+            st.code("\n".join(memory["top_allocations"]))
+    if st.button("🧹 Clear profile history"):
+        st.session_state["profile_runs"] = []
+        st.rerun()
+
+
+# ----------------- Trace Record & Replay -----------------
+
+_STATUS_URL_PATTERN = re.compile(
+    re.escape(PIPIO_JOB_STATUS_URL).replace(re.escape("{job_id}"), "(?P<job_id>[^/?#]+)") + r"(?:[?#].*)?$"
+)
+
+
+def classify_request(method: str, url: str) -> str:
+    """Trace kind of an HTTP call: generate, status, catalog or download."""
+    base = url.split("?", 1)[0]
+    if method == "POST" and base == PIPIO_GENERATE_URL:
+        return "generate"
+    if method == "GET" and _STATUS_URL_PATTERN.match(url):
+        return "status"
+    if base in PIPIO_CATALOG_URLS.values():
+        return "catalog"
+    return "download"
+
+
+def is_replay_url(url: str) -> bool:
+    """Whether a video URL was synthesized by a replay session."""
+    return urlsplit(url).hostname == REPLAY_HOST
+
+
+def replaying() -> bool:
+    """Whether this script run replays a trace, so nothing it does is booked or stored."""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return False
+    return st.session_state.get("transport_mode") == "Replay"
+
+
+_URL_QUERY = re.compile(r"(https?://[^\s\"'?#]+)\?[^\s\"'#]*")
+
+
+def redact_trace_text(text: str) -> str:
+    """Strip URL query strings (presigned tokens) and blank auth-bearing JSON fields."""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        payload = None
+    if isinstance(payload, (dict, list)):
+        text = json.dumps(_redact_fields(payload), ensure_ascii=False)
+    return _URL_QUERY.sub(r"\1?redacted", text)
+
+
+def _redact_fields(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: "redacted" if str(k).lower() in TRACE_REDACTED_FIELDS else _redact_fields(v) for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_fields(v) for v in value]
+    return value
+
+
+def new_trace_path() -> str:
+    return os.path.join(TRACE_DIR, f"trace_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+
+
+def list_traces() -> List[str]:
+    """Recorded trace files, newest first."""
+    if not os.path.isdir(TRACE_DIR):
+        return []
+    names = [n for n in os.listdir(TRACE_DIR) if n.endswith(".jsonl")]
+    return [os.path.join(TRACE_DIR, n) for n in sorted(names, reverse=True)]
+
+
+class TraceRecorder(HTTPAdapter):
+    """Transport adapter that sends requests live and appends each exchange, redacted, to a JSONL trace."""
+
+    def __init__(self, trace_path: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        sent = time.time()
+        response = super().send(request, **kwargs)
+        kind = classify_request(request.method or "", request.url or "")
+        record: Dict[str, Any] = {
+            "t": round(sent - self._started, 3),
+            "kind": kind,
+            "method": request.method,
+            "url": redact_trace_text(request.url or ""),
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in TRACE_HEADERS if k in response.headers},
+        }
+        if request.body:
+            body = request.body
+            record["request_body"] = redact_trace_text(
+                body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+            )
+        if kind == "download":
+            record["size"] = int(response.headers.get("Content-Length") or 0)
+        else:
+            record["body"] = redact_trace_text(response.text)
+        record["elapsed"] = round(time.time() - sent, 3)
+
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+            with open(self.trace_path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        return response
+
+
+@dataclass
+class TraceScenario:
+    """One recorded job: its generate response, status polls and download size."""
+
+    generate: Dict[str, Any]
+    job_id: Optional[str] = None
+    statuses: List[Dict[str, Any]] = field(default_factory=list)
+    video_urls: List[str] = field(default_factory=list)
+    download_size: Optional[int] = None
+
+
+def _record_json(record: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        payload = json.loads(record.get("body") or "")
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def load_trace_scenarios(trace_path: str) -> List[TraceScenario]:
+    """Group a trace's records into per-job scenarios, in recording order."""
+    scenarios: List[TraceScenario] = []
+    by_job: Dict[str, TraceScenario] = {}
+    by_url: Dict[str, TraceScenario] = {}
+    with open(trace_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.get("kind")
+            if kind == "generate":
+                scenario = TraceScenario(generate=record, job_id=extract_job_id(_record_json(record)))
+                scenarios.append(scenario)
+                if scenario.job_id:
+                    by_job[scenario.job_id] = scenario
+            elif kind == "status":
+                match = _STATUS_URL_PATTERN.match(record.get("url", ""))
+                scenario = by_job.get(match.group("job_id")) if match else None
+                if scenario is None:
+                    continue
+                scenario.statuses.append(record)
+            else:
+                scenario = by_url.get(record.get("url", "")) if kind == "download" else None
+                if scenario is not None and scenario.download_size is None:
+                    scenario.download_size = int(record.get("size") or 0)
+                continue
+
+            video_url = extract_video_url(_record_json(record))
+            if video_url and video_url not in scenario.video_urls:
+                scenario.video_urls.append(video_url)
+                by_url[video_url] = scenario
+    return scenarios
+
+
+def load_trace_catalogs(trace_path: str) -> Dict[str, Dict[str, Any]]:
+    """The last successful catalog response recorded for each catalog URL."""
+    catalogs: Dict[str, Dict[str, Any]] = {}
+    with open(trace_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("kind") == "catalog" and record.get("status") == 200:
+                catalogs[record.get("url", "").split("?", 1)[0]] = record
+    return catalogs
+
+
+class TraceReplayer(BaseAdapter):
+    """Transport adapter that answers API calls from recorded scenarios."""
+
+    def __init__(
+        self,
+        scenarios: List[TraceScenario],
+        compression: float = REPLAY_DEFAULT_COMPRESSION,
+        catalogs: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        super().__init__()
+        if not scenarios:
+            raise ValueError("trace contains no generate calls")
+        self.scenarios = scenarios
+        self.catalogs = catalogs or {}
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._jobs: Dict[str, List[int]] = {}
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout: Any = None,
+             verify: Any = True, cert: Any = None, proxies: Any = None) -> requests.Response:
+        url = request.url or ""
+        kind = classify_request(request.method or "", url)
+
+        if kind == "generate":
+            with self._lock:
+                index = self._submitted % len(self.scenarios)
+                self._submitted += 1
+                job_id = f"replay-{self._submitted:06d}"
+                self._jobs[job_id] = [index, 0]
+            record = self.scenarios[index].generate
+        elif kind == "status":
+            job_id = _STATUS_URL_PATTERN.match(url).group("job_id")
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or not self.scenarios[job[0]].statuses:
+                    return self._respond(request, 404, b'{"error": "job not in trace"}')
+                index, cursor = job
+                job[1] += 1
+            statuses = self.scenarios[index].statuses
+            record = statuses[min(cursor, len(statuses) - 1)]
+        elif kind == "catalog":
+            record = self.catalogs.get(url.split("?", 1)[0])
+            if record is None:
+                return self._respond(request, 404, b'{"error": "catalog not in trace"}')
+            return self._respond(
+                request, record.get("status", 200), (record.get("body") or "").encode("utf-8"),
+                record.get("headers"), record.get("elapsed", 0.0),
+            )
+        elif is_replay_url(url):
+            index = int(urlsplit(url).path.split("/")[1])
+            size = self.scenarios[index].download_size or REPLAY_MAX_DOWNLOAD_BYTES
+            return self._respond(request, 200, bytes(min(size, REPLAY_MAX_DOWNLOAD_BYTES)), {"Content-Type": "video/mp4"})
+        else:
+            return self._respond(request, 404, b'{"error": "request not in trace"}')
+
+        body = self._rewrite(record.get("body") or "", index, job_id)
+        return self._respond(
+            request, record.get("status", 200), body.encode("utf-8"), record.get("headers"), record.get("elapsed", 0.0)
+        )
+
+    def _rewrite(self, body: str, index: int, job_id: str) -> str:
+        """Swap the recorded job ID and video URLs for the synthetic ones."""
+        scenario = self.scenarios[index]
+        if scenario.job_id:
+            body = re.sub(
+                r'([:\[,]\s*)"?' + re.escape(scenario.job_id) + r'"?(\s*[,}\]])',
+                lambda m: m.group(1) + json.dumps(job_id) + m.group(2),
+                body,
+            )
+        for n, video_url in enumerate(scenario.video_urls):
+            body = body.replace(video_url, f"http://{REPLAY_HOST}/{index}/{job_id}-{n}.mp4")
+        return body
+
+    def _respond(self, request: requests.PreparedRequest, status: int, body: bytes,
+                 headers: Optional[Dict[str, str]] = None, elapsed: float = 0.0) -> requests.Response:
+        if elapsed:
+            time.sleep(elapsed / self.compression)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTP_REASONS.get(status, "")
+        response.headers = CaseInsensitiveDict(headers or {})
+        response.headers["Content-Length"] = str(len(body))
+        response.raw = io.BytesIO(body)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class ReplaySession(requests.Session):
+    """Session whose requests are all answered by a TraceReplayer (nothing leaves the machine)."""
+
+    def __init__(self, trace_path: str, compression: float = REPLAY_DEFAULT_COMPRESSION):
+        super().__init__()
+        self.trust_env = False
+        self.health = HealthRegistry()
+        self.compression = max(float(compression), 1.0)
+        self.trace_path = trace_path
+        self.replayer = TraceReplayer(
+            load_trace_scenarios(trace_path), self.compression, load_trace_catalogs(trace_path)
+        )
+        self.mount("http://", self.replayer)
+        self.mount("https://", self.replayer)
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds / self.compression)
+
+
+def recording_session(trace_path: str) -> requests.Session:
+    """This browser session's live session that records every exchange to ``trace_path``."""
+    http = st.session_state.get("recording_session")
+    if http is None or http.trace_path != trace_path:
+        if http is not None:
+            http.close()
+        http = requests.Session()
+        http.trace_path = trace_path
+        recorder = TraceRecorder(trace_path)
+        http.mount("http://", recorder)
+        http.mount("https://", recorder)
+        st.session_state["recording_session"] = http
+    return http
+
+
+@st.cache_resource
+def replay_session(trace_path: str, compression: float, trace_mtime: float) -> ReplaySession:
+    """Shared replay session; ``trace_mtime`` reloads it when the trace grows."""
+    return ReplaySession(trace_path, compression)
+
+
+def _drain_download(http: requests.Session, video_url: str) -> int:
+    size = 0
+    with http.get(video_url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=1 << 16):
+            size += len(chunk)
+    return size
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def run_replay_soak(
+    trace_path: str,
+    jobs: int,
+    concurrency: int,
+    compression: float = REPLAY_DEFAULT_COMPRESSION,
+    max_seconds: int = MAX_POLL_SECONDS,
+    interval: int = POLL_INTERVAL_SECONDS,
+) -> Dict[str, Any]:
+    """Push ``jobs`` replayed jobs through submit, poll, extraction and download."""
+    http = ReplaySession(trace_path, compression)
+
+    def one_job() -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = run_generation_job(
+            "replay", "replay_actor", "replay_voice", "Replay soak test.",
+            max_seconds=max_seconds, interval=interval, http=http,
+        )
+        if result["video_url"]:
+            try:
+                result["downloaded"] = _drain_download(http, result["video_url"])
+            except requests.RequestException as e:
+                result["error"] = f"Download failed: {e}"
+        result["latency"] = time.perf_counter() - started
+        return result
+
+    report: Dict[str, Any] = {
+        "jobs": jobs,
+        "scenarios": len(http.replayer.scenarios),
+        "statuses": {},
+        "completed": 0,
+        "missing_job_id": 0,
+        "missing_video_url": 0,
+        "download_errors": 0,
+        "downloaded_bytes": 0,
+    }
+    latencies: List[float] = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pipio-soak") as pool:
+        for future in as_completed([pool.submit(one_job) for _ in range(jobs)]):
+            result = _future_result(future)
+            status = str(result.get("status", "unknown")).lower()
+            report["statuses"][status] = report["statuses"].get(status, 0) + 1
+            if "latency" in result:
+                latencies.append(result["latency"])
+            if result.get("error") == "Could not detect job ID or video URL":
+                report["missing_job_id"] += 1
+            elif status in COMPLETED_STATUSES and not result.get("video_url"):
+                report["missing_video_url"] += 1
+            if "downloaded" in result:
+                report["completed"] += 1
+                report["downloaded_bytes"] += result["downloaded"]
+            elif result.get("video_url"):
+                report["download_errors"] += 1
+
+    wall = time.perf_counter() - started
+    report.update(
+        wall_seconds=wall,
+        throughput=jobs / wall if wall else 0.0,
+        p50_latency=_percentile(latencies, 50),
+        p95_latency=_percentile(latencies, 95),
+        simulated_p50=_percentile(latencies, 50) * http.compression,
+    )
+    return report
+
 
+def render_soak_panel() -> None:
+    """Replay soak-test controls and report (ADVANCED tab)."""
+    traces = list_traces()
+    if not traces:
+        st.caption("Record a session (sidebar → NETWORK MODE → Record) to create a trace")
+        return
 
-def export_history_json():
-    """Export job history as JSON."""
-    jobs = st.session_state.get("pipio_jobs", [])
-    return json.dumps(jobs, indent=2)
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        trace_path = st.selectbox("Trace file", traces, format_func=os.path.basename, key="soak_trace")
+    with col2:
+        jobs = st.number_input("Jobs", 1, 20000, 500, 100, key="soak_jobs")
+    with col3:
+        concurrency = st.number_input("Concurrency", 1, 128, 16, key="soak_concurrency")
+    with col4:
+        compression = st.number_input("Time compression", 1, 10000, 200, key="soak_compression")
+
+    if st.button("🧪 Run Soak Test"):
+        try:
+            with st.spinner(f"Replaying {jobs} jobs..."):
+                st.session_state["soak_report"] = run_replay_soak(
+                    trace_path, int(jobs), int(concurrency), float(compression),
+                    st.session_state["max_poll_seconds"], st.session_state["poll_interval"],
+                )
+        except (OSError, ValueError) as e:
+            st.error(f"⚠️ TRACE UNUSABLE: {e}")
+
+    report = session.get_large("soak_report")
+    if not report:
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Completed", f"{report['completed']}/{report['jobs']}")
+    with col2:
+        st.metric("Throughput", f"{report['throughput']:.1f} jobs/s")
+    with col3:
+        st.metric("p50 / p95", f"{report['p50_latency']:.2f}s / {report['p95_latency']:.2f}s")
+    with col4:
+        st.metric("Extraction failures", report["missing_job_id"] + report["missing_video_url"])
+    st.caption(
+        f"{report['scenarios']} recorded scenarios · {report['wall_seconds']:.1f}s wall · "
+        f"≈{report['simulated_p50']:.0f}s simulated p50 · {report['downloaded_bytes'] / 1e6:.1f} MB downloaded · "
+        f"{report['download_errors']} download errors"
+    )
+    st.dataframe(
+        [{"status": k, "jobs": v} for k, v in sorted(report["statuses"].items(), key=lambda kv: -kv[1])],
+        use_container_width=True,
+        hide_index=True,
+    )
 
 
 # ----------------- Main UI -----------------
 
 def main():
-    init_session_state()
-    apply_matrix_theme()
+    profiling = begin_profile_run()
+    try:
+        render_app()
+    finally:
+        if profiling:
+            end_profile_run()
+        if "pipio_jobs" in st.session_state:
+            st.session_state["session_compaction"] = session.compact()
+
+
+def render_app():
+    with profile_section("init_session_state"):
+        init_session_state()
+    with profile_section("theme.css"):
+        apply_matrix_theme()
     
     st.set_page_config(
         page_title="PIPIO MATRIX STUDIO",
@@ -491,19 +4845,49 @@ def main():
     )
     
     # Sidebar Configuration
-    with st.sidebar:
+    with st.sidebar, profile_section("sidebar"):
         st.markdown("### 🔐 SYSTEM ACCESS")
         api_key = st.text_input(
             "API KEY",
             type="password",
             help="Enter your Pipio API key (Authorization: Key <API_KEY>)",
         )
+        with st.expander("🔑 Additional API keys", expanded=False):
+            extra_keys = st.text_area(
+                "One key per line",
+                key="extra_api_keys",
+                help="Batch jobs are spread across all keys",
+            )
+            shared_keys = False
+            if SHARED_KEYS_TOKEN:
+                operator_token = st.text_input(
+                    "Operator token",
+                    type="password",
+                    key="operator_token",
+                    help="Adds the server's PIPIO_API_KEYS to this session's batch keys",
+                )
+                shared_keys = shared_keys_unlocked(operator_token)
+                if operator_token and not shared_keys:
+                    st.warning("⚠️ Wrong operator token")
+            key_concurrency = st.number_input("Concurrent jobs per key", 1, 32, KEY_MAX_CONCURRENCY, key="key_max_concurrency")
+            key_rate = st.number_input("Requests per minute per key", 1, 6000, KEY_RATE_PER_MINUTE, key="key_rate_per_minute")
+            key_policy = st.selectbox("Key selection for batches", KEY_SELECTION_POLICIES, key="key_policy")
+            api_keys = configured_api_keys(api_key, extra_keys, shared_keys)
+            registry = api_key_registry()
+            for key in api_keys:
+                registry.register(key, int(key_concurrency), float(key_rate))
+            if api_keys:
+                st.dataframe(registry.snapshot(api_keys), use_container_width=True, hide_index=True)
+        key_pool = KeyPool(api_keys, registry, key_policy) if api_keys else None
+        batch_in_flight = max(CAMPAIGN_MAX_IN_FLIGHT, int(key_concurrency) * len(api_keys))
+        if len(api_keys) > 1:
+            st.caption(f"🔑 {len(api_keys)} keys · {key_policy} · up to {batch_in_flight} batch jobs in flight")
         
         st.markdown("---")
         st.markdown("### ⚙️ SYSTEM CONFIGURATION")
         
-        max_poll = st.slider("Max polling time (seconds)", 60, 600, MAX_POLL_SECONDS, 30)
-        poll_interval = st.slider("Poll interval (seconds)", 2, 10, POLL_INTERVAL_SECONDS, 1)
+        max_poll = st.slider("Max polling time (seconds)", 60, 600, step=30, key="max_poll_seconds")
+        poll_interval = st.slider("Poll interval (seconds)", 2, 10, step=1, key="poll_interval")
         
         st.markdown("---")
         st.markdown("### 🎨 DISPLAY OPTIONS")
@@ -511,13 +4895,68 @@ def main():
         show_stats = st.checkbox("Show statistics dashboard", value=True)
         dry_run = st.checkbox("Dry run mode (no API calls)", value=False)
         
+        st.markdown("---")
+        st.markdown("### 📼 NETWORK MODE")
+        transport_mode = st.radio(
+            "API transport",
+            TRANSPORT_MODES,
+            horizontal=True,
+            key="transport_mode",
+            help="Record writes every API exchange to a trace file; Replay answers from a trace offline",
+        )
+        http: Optional[requests.Session] = None
+        if transport_mode == "Record":
+            trace_path = st.session_state.setdefault("record_trace_path", new_trace_path())
+            http = recording_session(trace_path)
+            st.caption(f"Recording to `{trace_path}`")
+        elif transport_mode == "Replay":
+            traces = list_traces()
+            if traces:
+                replay_trace = st.selectbox("Trace", traces, format_func=os.path.basename, key="replay_trace")
+                compression = st.slider("Time compression", 1, 1000, REPLAY_DEFAULT_COMPRESSION, key="replay_compression")
+                try:
+                    http = replay_session(replay_trace, float(compression), os.path.getmtime(replay_trace))
+                except (OSError, ValueError) as e:
+                    st.error(f"⚠️ TRACE UNUSABLE: {e}")
+            else:
+                st.warning("⚠️ No traces recorded yet - switch to Record first")
+            if http is None:
+                st.caption("Falling back to dry run mode")
+                dry_run = True
+            else:
+                st.caption("Replayed jobs need no API key and are not booked or stored")
+        replay = transport_mode == "Replay" and http is not None
+        # Catalogs come from the trace while replaying, cached per trace rather than per key
+        catalog_key = f"replay:{st.session_state['replay_trace']}" if replay else api_key
+        # Single jobs use the primary key's pooled, rate-limited session unless a trace transport is active
+        job_http = http or (registry.register(api_key, int(key_concurrency), float(key_rate)).session if api_key else None)
+        
         st.markdown("---")
         st.markdown("### 📊 SESSION STATS")
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Total", st.session_state.get("total_videos", 0))
+            st.metric("Total", session.count("total_videos"))
         with col2:
-            st.metric("Success", st.session_state.get("successful_videos", 0))
+            st.metric("Success", session.count("successful_videos"))
+        
+        st.markdown("---")
+        st.markdown("### 🩺 UPSTREAM HEALTH")
+        render_health_status()
+        
+        st.markdown("---")
+        st.markdown("### 💰 RENDER BUDGET")
+        daily_budget = st.number_input(
+            "Daily budget (credits)", 0.0, MAX_DAILY_BUDGET, min(DEFAULT_DAILY_BUDGET, MAX_DAILY_BUDGET), 50.0
+        )
+        user_budget = st.number_input(
+            "Per-user daily budget", 0.0, MAX_USER_BUDGET, min(DEFAULT_USER_BUDGET, MAX_USER_BUDGET), 50.0
+        )
+        if api_key:
+            used = usage_totals(user=usage_user(api_key))["actual"]
+            st.progress(
+                min(used / user_budget, 1.0) if user_budget else 1.0,
+                text=f"Used today: {used:.0f} / {user_budget:.0f}",
+            )
         
         st.markdown("---")
         st.markdown("### 💡 PRO TIPS")
@@ -529,17 +4968,38 @@ def main():
         )
         
         if st.button("🗑️ Clear History"):
-            st.session_state["pipio_jobs"] = []
-            st.session_state["total_videos"] = 0
-            st.session_state["successful_videos"] = 0
-            st.session_state["failed_videos"] = 0
+            session.reset_history()
             st.rerun()
     
+    session.set_owner(history_owner(api_key))
+    if api_key:
+        with profile_section("scheduler"):
+            session.merge_scheduled_runs(schedule_dispatcher(), usage_user(api_key))
+    if st.session_state.get("campaign_run") is not None:
+        session.merge_campaign_run(st.session_state["campaign_run"])
+    
     # Main content tabs
     tab1, tab2, tab3, tab4 = st.tabs(["🎬 GENERATE", "📜 HISTORY", "📊 ANALYTICS", "⚙️ ADVANCED"])
     
     # TAB 1: Generate Video
-    with tab1:
+    with tab1, profile_section("tab.generate"):
+        presets = load_presets(session.owner)
+        if presets:
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                preset_choice = st.selectbox(
+                    "⭐ Preset",
+                    list(presets),
+                    format_func=lambda preset_id: presets[preset_id]["name"],
+                    key="preset_choice",
+                )
+            with col2:
+                st.button("⚡ Apply", on_click=apply_preset, args=(preset_choice,), use_container_width=True)
+            with col3:
+                if st.button("🗑️ Delete", use_container_width=True):
+                    delete_preset(session.owner, preset_choice)
+                    st.rerun()
+        
         st.markdown("### STEP 1: AVATAR CONFIGURATION")
         
         col1, col2 = st.columns(2)
@@ -547,14 +5007,18 @@ def main():
             actor_id = st.text_input(
                 "🎭 Actor ID",
                 placeholder="e.g., actor_xyz123",
-                help="Unique identifier for the avatar actor"
+                help="Unique identifier for the avatar actor (type a name to search the catalog)",
+                key="actor_id",
             )
+            render_catalog_hint(catalog_key, "actors", "actor_id", http)
         with col2:
             voice_id = st.text_input(
                 "🎤 Voice ID",
                 placeholder="e.g., voice_abc456",
-                help="Unique identifier for the voice profile"
+                help="Unique identifier for the voice profile (type a name to search the catalog)",
+                key="voice_id",
             )
+            render_catalog_hint(catalog_key, "voices", "voice_id", http)
         
         st.markdown("### STEP 2: SCRIPT CREATION")
         
@@ -580,18 +5044,26 @@ def main():
             script_text = script_templates()[template_choice]
             st.success(f"✅ Template '{template_choice}' loaded")
         
-        # Character counter
-        char_count = len(script_text)
-        word_count = len(script_text.split())
-        estimated_duration = word_count / 2.5  # Rough estimate: 150 words per minute
+        # Script analysis (memoized per script, so keystroke reruns stay cheap)
+        analysis = analyze_script(script_text)
+        speaking_speed = st.session_state.get("speaking_rate", 1.0)
+        estimated_duration = estimate_script_duration(script_text, voice_id, speaking_speed)
+        words_per_second, rate_source = speaking_rate_for(voice_id)
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Characters", char_count)
+            st.metric("Characters", analysis["characters"])
         with col2:
-            st.metric("Words", word_count)
+            st.metric("Words", analysis["words"])
         with col3:
+            st.metric("Sentences", analysis["sentences"])
+        with col4:
             st.metric("Est. Duration", f"{estimated_duration:.0f}s")
+        if analysis["words"]:
+            st.caption(
+                f"{analysis['spoken_words']} spoken words · {analysis['pause_seconds']:.1f}s of pauses · "
+                f"{words_per_second:.2f} words/s ({rate_source} rate) at {speaking_speed:.2f}x speed"
+            )
         
         st.markdown("### STEP 3: VIDEO SETTINGS")
         
@@ -599,23 +5071,23 @@ def main():
         with col1:
             aspect_ratio = st.selectbox(
                 "📐 Aspect Ratio",
-                ["16:9", "9:16", "1:1", "4:3"],
-                index=0,
-                help="Video dimensions ratio"
+                ASPECT_RATIOS,
+                help="Video dimensions ratio",
+                key="aspect_ratio",
             )
         with col2:
             resolution = st.selectbox(
                 "🎥 Resolution",
-                ["1080p", "720p", "480p"],
-                index=0,
-                help="Video quality"
+                RESOLUTIONS,
+                help="Video quality",
+                key="resolution",
             )
         with col3:
             fps = st.selectbox(
                 "🎞️ Frame Rate",
-                ["24", "30", "60"],
-                index=1,
-                help="Frames per second"
+                FRAME_RATES,
+                help="Frames per second",
+                key="fps",
             )
         
         st.markdown("### STEP 4: ADVANCED OPTIONS")
@@ -623,62 +5095,114 @@ def main():
         with st.expander("🎨 Visual Settings", expanded=False):
             col1, col2 = st.columns(2)
             with col1:
-                bg_color = st.color_picker(
-                    "Background Color",
-                    "#000000",
-                    help="Choose background color"
-                )
-                bg_blur = st.slider("Background Blur", 0, 100, 0, 5)
+                st.color_picker("Background Color", help="Choose background color", key="bg_color")
+                st.slider("Background Blur", 0, 100, step=5, key="bg_blur")
             with col2:
-                brightness = st.slider("Brightness", 0, 200, 100, 5)
-                contrast = st.slider("Contrast", 0, 200, 100, 5)
+                st.slider("Brightness", 0, 200, step=5, key="brightness")
+                st.slider("Contrast", 0, 200, step=5, key="contrast")
         
         with st.expander("🗣️ Audio Settings", expanded=False):
             col1, col2 = st.columns(2)
             with col1:
                 speaking_rate = st.slider(
                     "Speaking Speed",
-                    0.5, 2.0, 1.0, 0.05,
-                    help="Adjust voice speed (1.0 = normal)"
+                    0.5, 2.0, step=0.05,
+                    help="Adjust voice speed (1.0 = normal)",
+                    key="speaking_rate",
                 )
-                pitch = st.slider("Voice Pitch", 0.5, 2.0, 1.0, 0.05)
+                st.slider("Voice Pitch", 0.5, 2.0, step=0.05, key="pitch")
             with col2:
-                volume = st.slider("Volume", 0, 150, 100, 5)
-                enable_captions = st.checkbox("Enable Captions", value=False)
+                st.slider("Volume", 0, 150, step=5, key="volume")
+                st.checkbox("Enable Captions", key="enable_captions")
         
         with st.expander("🎬 Production Settings", expanded=False):
+            if not branding_available():
+                st.caption("Install ffmpeg (with ffprobe) to brand videos locally")
+            step_labels = {
+                "intro": "Intro clip", "outro": "Outro clip", "watermark": "Watermark image", "bgm": "Background music",
+            }
             col1, col2 = st.columns(2)
+            for column, step in zip([col1, col1, col2, col2], BRANDING_STEPS):
+                with column:
+                    st.file_uploader(
+                        step_labels[step],
+                        type=BRANDING_ASSET_TYPES[step],
+                        key=f"branding_upload_{step}",
+                        on_change=store_branding_upload,
+                        args=(step,),
+                    )
+            ready = {step: branding_available() and branding_asset(session.owner, step) is not None for step in BRANDING_STEPS}
             with col1:
-                add_intro = st.checkbox("Add Intro Sequence", value=False)
-                add_outro = st.checkbox("Add Outro Sequence", value=False)
+                add_intro = st.checkbox("Add Intro Sequence", value=False, disabled=not ready["intro"])
+                add_outro = st.checkbox("Add Outro Sequence", value=False, disabled=not ready["outro"])
             with col2:
-                add_watermark = st.checkbox("Add Watermark", value=False)
-                add_bgm = st.checkbox("Add Background Music", value=False)
+                add_watermark = st.checkbox("Add Watermark", value=False, disabled=not ready["watermark"])
+                add_bgm = st.checkbox("Add Background Music", value=False, disabled=not ready["bgm"])
+            st.caption("Applied locally to completed videos; intro/outro alone are joined without re-encoding")
+        branding_steps = [
+            step for step, enabled in zip(BRANDING_STEPS, [add_intro, add_outro, add_watermark, add_bgm]) if enabled
+        ]
         
         # Build extras dictionary
-        extras: Dict[str, Any] = {}
-        if bg_color != "#000000":
-            extras["backgroundColor"] = bg_color
-        if speaking_rate != 1.0:
-            extras["speakingRate"] = speaking_rate
-        if enable_captions:
-            extras["captions"] = True
-        if pitch != 1.0:
-            extras["pitch"] = pitch
-        if volume != 100:
-            extras["volume"] = volume / 100
-        if bg_blur > 0:
-            extras["backgroundBlur"] = bg_blur
-        if brightness != 100:
-            extras["brightness"] = brightness / 100
-        if contrast != 100:
-            extras["contrast"] = contrast / 100
+        extras = extras_from_widgets(st.session_state)
+        
+        with st.expander("💾 Save settings as preset", expanded=False):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                preset_name = st.text_input("Preset name", placeholder="e.g., Product demo - vertical")
+            with col2:
+                save_preset_btn = st.button("💾 Save", use_container_width=True, disabled=not preset_name.strip())
+            st.caption("Captures actor, voice, aspect ratio, resolution, frame rate and all visual/audio options")
+            if save_preset_btn:
+                try:
+                    settings = build_preset_settings(actor_id, voice_id, aspect_ratio, resolution, fps, extras)
+                    save_preset(session.owner, preset_name, settings)
+                except PayloadValidationError as e:
+                    st.error("⚠️ PRESET NOT SAVED")
+                    for problem in e.problems:
+                        st.markdown(f"• {problem}")
+                except ValueError as e:
+                    st.error(f"⚠️ PRESET NOT SAVED: {e}")
+                else:
+                    st.success(f"✅ Preset '{preset_name.strip()}' saved")
         
         st.markdown("### STEP 5: GENERATION")
         
+        projected_cost = estimate_render_cost(script_text, resolution, fps, voice_id, speaking_rate)
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            priority = st.selectbox(
+                "⏱️ Priority",
+                list(JOB_PRIORITIES.keys()),
+                index=1,
+                help="Low priority jobs wait for the off-peak window; over-budget jobs are queued",
+            )
+        with col2:
+            st.metric("💰 Projected Cost", f"{projected_cost:.1f} credits")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            draft_mode = st.checkbox(
+                "📝 Draft mode",
+                value=False,
+                help=f"Render a short {DRAFT_RESOLUTION} preview without extras first; "
+                     "promote it to the final render once the script looks right",
+            )
+        with col2:
+            reuse_renders = st.checkbox(
+                "♻️ Reuse identical renders",
+                value=False,
+                help="Skip the API when you already rendered an identical request (same script and settings) "
+                     "in the last day and its video still loads",
+            )
+        
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            generate_btn = st.button("🚀 GENERATE VIDEO", type="primary", use_container_width=True)
+            generate_btn = st.button(
+                "📝 RENDER DRAFT" if draft_mode else "🚀 GENERATE VIDEO",
+                type="primary",
+                use_container_width=True,
+            )
         with col2:
             preview_btn = st.button("👁️ PREVIEW CONFIG", use_container_width=True)
         with col3:
@@ -686,16 +5210,28 @@ def main():
         with col4:
             reset_btn = st.button("🔄 RESET", use_container_width=True)
         
+        # Draft preview awaiting confirmation (only while the script is unchanged)
+        promote_btn = False
+        current_draft_key = draft_cache_key(usage_user(api_key), actor_id, voice_id, aspect_ratio, script_text)
+        pending_draft = st.session_state.get("pending_draft")
+        if pending_draft and pending_draft["cache_key"] == current_draft_key:
+            st.markdown("#### 📝 DRAFT PREVIEW")
+            st.video(pending_draft["video_url"])
+            st.caption(f"{DRAFT_RESOLUTION} draft of the opening lines · job `{pending_draft.get('job_id') or 'cached'}`")
+            promote_btn = st.button(f"✅ PROMOTE TO FINAL ({resolution})", type="primary")
+        
         if preview_btn:
-            st.json({
-                "actorId": actor_id,
-                "voiceId": voice_id,
-                "script": script_text[:100] + "..." if len(script_text) > 100 else script_text,
-                "aspectRatio": aspect_ratio,
-                "resolution": resolution,
-                "fps": fps,
-                **extras
-            })
+            try:
+                preview_payload = GenerationRequest.build(
+                    actor_id, voice_id, script_text, aspect_ratio, resolution, fps, extras
+                ).to_payload()
+                if len(preview_payload["script"]) > 100:
+                    preview_payload["script"] = preview_payload["script"][:100] + "..."
+                st.json(preview_payload)
+            except PayloadValidationError as e:
+                st.error("⚠️ INVALID CONFIGURATION")
+                for problem in e.problems:
+                    st.markdown(f"• {problem}")
         
         if save_script_btn:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -714,9 +5250,9 @@ def main():
         status_container = st.container()
         video_container = st.container()
         
-        if generate_btn:
+        if generate_btn or promote_btn:
             with status_container:
-                if not api_key:
+                if not api_key and not replay:
                     st.error("⚠️ API KEY REQUIRED - Enter your key in the sidebar")
                     st.stop()
                 if not actor_id or not voice_id:
@@ -725,21 +5261,32 @@ def main():
                 if not script_text.strip():
                     st.error("⚠️ SCRIPT cannot be empty")
                     st.stop()
+                try:
+                    gen_request = GenerationRequest.build(
+                        actor_id, voice_id, script_text, aspect_ratio, resolution, fps, extras
+                    )
+                except PayloadValidationError as e:
+                    st.error("⚠️ INVALID REQUEST - nothing was sent")
+                    for problem in e.problems:
+                        st.markdown(f"• {problem}")
+                    st.stop()
+                catalog_actor, catalog_voice, id_problems = resolve_catalog_ids(
+                    catalog_key, gen_request.actor_id, gen_request.voice_id, http
+                )
+                if id_problems:
+                    st.error("⚠️ UNKNOWN ACTOR/VOICE - nothing was sent")
+                    for problem in id_problems:
+                        st.markdown(f"• {problem}")
+                    st.stop()
+                gen_request = replace(gen_request, actor_id=catalog_actor, voice_id=catalog_voice)
                 
                 preview = (script_text.strip()[:120] + "...") if len(script_text) > 120 else script_text.strip()
                 
+                use_draft = draft_mode and not promote_btn
+                
                 if dry_run:
                     st.info("🔧 DRY RUN MODE - No API calls will be made")
-                    payload_preview = {
-                        "actorId": actor_id,
-                        "voiceId": voice_id,
-                        "script": script_text.strip(),
-                        "aspectRatio": aspect_ratio,
-                        "resolution": resolution,
-                        "fps": fps,
-                        **extras,
-                    }
-                    st.json(payload_preview)
+                    st.json((make_draft_request(gen_request) if use_draft else gen_request).to_payload())
                     add_job_to_history(
                         job_id=None,
                         status="DRY RUN",
@@ -750,22 +5297,109 @@ def main():
                     )
                     st.stop()
                 
-                with st.spinner("📡 Connecting to Pipio Neural Network..."):
-                    try:
-                        resp = call_pipio_generate(
-                            api_key=api_key,
+                user = usage_user(api_key)
+                payload_hash = gen_request.fingerprint()
+                
+                reused = load_render(user, payload_hash, job_http) if reuse_renders and not use_draft else None
+                if reused:
+                    st.success("♻️ IDENTICAL REQUEST ALREADY RENDERED - reusing it, no credits used")
+                    with video_container:
+                        st.video(reused["video_url"])
+                    schedule_branding(reused["video_url"], branding_steps, session.owner)
+                    add_job_to_history(
+                        job_id=reused_job_id(),
+                        status="completed",
+                        script_preview=preview,
+                        video_url=reused["video_url"],
+                        actor_id=actor_id,
+                        voice_id=voice_id,
+                        extra={
+                            "reused": True, "reused_from": reused["job_id"], "payload_hash": payload_hash,
+                            "branding": branding_steps,
+                        },
+                    )
+                    st.stop()
+                
+                if use_draft:
+                    cached_draft = load_draft(current_draft_key)
+                    if cached_draft is None:
+                        draft_request = make_draft_request(gen_request)
+                        draft_cost = estimate_render_cost(
+                            draft_request.script, DRAFT_RESOLUTION, None, gen_request.voice_id, speaking_rate
+                        )
+                        try:
+                            not_before, defer_reason = schedule_decision(
+                                draft_cost, "High", user, daily_budget, user_budget
+                            )
+                        except BudgetExceededError as e:
+                            st.error(f"🔴 DRAFT REJECTED - {e}")
+                            st.stop()
+                        if not_before is not None:
+                            st.warning(f"⏳ DRAFT NOT RENDERED - {defer_reason}")
+                            st.stop()
+                        usage_id = record_usage(user, draft_cost)
+                        with st.spinner(f"📝 Rendering {DRAFT_RESOLUTION} draft..."):
+                            draft_result = run_generation_job(
+                                api_key, max_seconds=max_poll, interval=poll_interval, http=job_http,
+                                **draft_request.as_kwargs(),
+                            )
+                        record_actual_usage(
+                            usage_id,
+                            actual_render_cost(
+                                draft_result.get("payload", {}), draft_result["status"], draft_cost, DRAFT_RESOLUTION, None
+                            ),
+                            draft_result.get("job_id"),
+                        )
+                        add_job_to_history(
+                            job_id=draft_result.get("job_id"),
+                            status=draft_result["status"],
+                            script_preview=draft_request.script[:120],
+                            video_url=draft_result.get("video_url"),
                             actor_id=actor_id,
                             voice_id=voice_id,
-                            script=script_text,
-                            aspect_ratio=aspect_ratio,
-                            resolution=resolution,
-                            extras=extras or None,
+                            extra={"draft": True},
                         )
+                        if not draft_result.get("video_url"):
+                            st.error(f"🔴 DRAFT FAILED: {draft_result.get('error') or draft_result['status']}")
+                            st.stop()
+                        cached_draft = save_draft(current_draft_key, draft_result.get("job_id"), draft_result["video_url"])
+                    else:
+                        st.toast("♻️ Script unchanged - reusing cached draft")
+                    st.session_state["pending_draft"] = cached_draft
+                    st.rerun()
+                
+                st.session_state.pop("pending_draft", None)
+                try:
+                    not_before, defer_reason = schedule_decision(
+                        projected_cost, priority, user, daily_budget, user_budget
+                    )
+                except BudgetExceededError as e:
+                    st.error(f"🔴 JOB REJECTED - {e}")
+                    st.stop()
+                if not_before is not None:
+                    enqueue_job(user, priority, projected_cost, gen_request.as_kwargs(), not_before, defer_reason)
+                    st.warning(f"⏳ JOB DEFERRED until {not_before:%Y-%m-%d %H:%M} - {defer_reason}")
+                    st.caption("Dispatch queued jobs from the ANALYTICS tab")
+                    st.stop()
+                usage_id = record_usage(user, projected_cost)
+                
+                with st.spinner("📡 Connecting to Pipio Neural Network..."):
+                    try:
+                        resp = submit_generation_request(api_key, gen_request, job_http)
+                    except CircuitOpenError as e:
+                        record_actual_usage(usage_id, 0.0)
+                        retry_at = circuit_retry_time("generate", job_http)
+                        enqueue_job(user, priority, projected_cost, gen_request.as_kwargs(), retry_at, str(e))
+                        st.warning(f"⚡ PIPIO DEGRADED - job queued for {retry_at:%H:%M:%S}: {e}")
+                        st.caption("Dispatch queued jobs from the ANALYTICS tab")
+                        st.stop()
                     except requests.RequestException as e:
+                        record_actual_usage(usage_id, 0.0)
                         st.error(f"🔴 NETWORK ERROR: {e}")
                         st.stop()
                 
                 if resp.status_code not in (200, 201, 202):
+                    record_actual_usage(usage_id, 0.0)
                     st.error(f"🔴 API ERROR: HTTP {resp.status_code}")
                     if show_raw:
                         with st.expander("Error Response", expanded=True):
@@ -801,34 +5435,43 @@ def main():
                         st.video(immediate_url)
                         st.download_button(
                             "⬇️ Download Video",
-                            data=requests.get(immediate_url).content,
+                            data=read_video_bytes(immediate_url, job_http),
                             file_name=f"pipio_video_{job_id or 'instant'}.mp4",
                             mime="video/mp4"
                         )
+                    schedule_media_artifacts(immediate_url)
+                    schedule_branding(immediate_url, branding_steps, session.owner)
+                    if not is_replay_url(immediate_url):
+                        save_render(user, payload_hash, job_id, immediate_url)
+                        record_duration_sample(
+                            gen_request.voice_id, gen_request.script,
+                            gen_request.extras.get("speakingRate"), extract_video_duration(initial_json),
+                        )
+                    record_actual_usage(
+                        usage_id,
+                        actual_render_cost(initial_json, "completed", projected_cost, resolution, fps),
+                        job_id,
+                    )
                     add_job_to_history(
                         job_id=job_id,
                         status="completed",
                         script_preview=preview,
                         video_url=immediate_url,
                         actor_id=actor_id,
-                        voice_id=voice_id
+                        voice_id=voice_id,
+                        extra={"payload_hash": payload_hash, "branding": branding_steps},
                     )
                 
                 elif job_id:
                     st.info(f"⚙️ JOB CREATED: {job_id}")
                     st.markdown("---")
-                    job_payload = poll_job_status(api_key, job_id)
+                    job_payload = poll_job_status(api_key, job_id, max_poll, poll_interval, job_http)
                     
                     if show_raw:
                         with st.expander("Final Job Payload", expanded=False):
                             st.json(job_payload)
                     
-                    final_status = str(
-                        job_payload.get("status")
-                        or job_payload.get("state")
-                        or job_payload.get("jobStatus")
-                        or "unknown"
-                    )
+                    final_status = job_payload_status(job_payload, "unknown")
                     video_url = extract_video_url(job_payload)
                     
                     if video_url:
@@ -836,7 +5479,7 @@ def main():
                         with video_container:
                             st.video(video_url)
                             try:
-                                video_data = requests.get(video_url).content
+                                video_data = read_video_bytes(video_url, job_http)
                                 st.download_button(
                                     "⬇️ Download Video",
                                     data=video_data,
@@ -845,21 +5488,37 @@ def main():
                                 )
                             except:
                                 st.warning("Download unavailable")
+                        schedule_media_artifacts(video_url)
+                        schedule_branding(video_url, branding_steps, session.owner)
+                        if not is_replay_url(video_url):
+                            if final_status.lower() in COMPLETED_STATUSES:
+                                save_render(user, payload_hash, job_id, video_url)
+                            record_duration_sample(
+                                gen_request.voice_id, gen_request.script,
+                                gen_request.extras.get("speakingRate"), extract_video_duration(job_payload),
+                            )
                     else:
                         st.warning("⚠️ Job completed but no video URL detected")
                     
+                    record_actual_usage(
+                        usage_id,
+                        actual_render_cost(job_payload, final_status, projected_cost, resolution, fps),
+                        job_id,
+                    )
                     add_job_to_history(
                         job_id=job_id,
                         status=final_status,
                         script_preview=preview,
                         video_url=video_url,
                         actor_id=actor_id,
-                        voice_id=voice_id
+                        voice_id=voice_id,
+                        extra={"payload_hash": payload_hash, "branding": branding_steps},
                     )
                 
                 else:
                     st.warning("⚠️ Could not detect job ID or video URL")
                     st.info("Check the API response and adjust extraction functions")
+                    record_actual_usage(usage_id, 0.0)
                     add_job_to_history(
                         job_id=None,
                         status="UNKNOWN",
@@ -870,16 +5529,16 @@ def main():
                     )
     
     # TAB 2: History
-    with tab2:
+    with tab2, profile_section("tab.history"):
         st.markdown("### 📜 GENERATION HISTORY")
         
-        jobs = st.session_state.get("pipio_jobs", [])
+        jobs = session.jobs
         
         if not jobs:
             st.info("💫 No generation history yet. Create your first video in the GENERATE tab!")
         else:
             # Filter options
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
             with col1:
                 filter_status = st.multiselect(
                     "Filter by Status",
@@ -890,6 +5549,16 @@ def main():
                 search_term = st.text_input("🔍 Search scripts", "")
             with col3:
                 sort_order = st.selectbox("Sort by", ["Newest First", "Oldest First"])
+            with col4:
+                favorites_only = st.checkbox(
+                    "⭐ Favorites only",
+                    help=f"{len(session.favorites)} starred jobs, including ones older than this session",
+                )
+            
+            # Filter jobs
+            if favorites_only:
+                jobs = load_favorite_jobs(session.owner)
+            filtered_jobs = filter_jobs(jobs, filter_status, search_term)
             
             # Export button
             if st.button("📥 Export History as JSON"):
@@ -901,26 +5570,64 @@ def main():
                     mime="application/json"
                 )
             
+            with st.expander("📦 Bulk Video Export", expanded=False):
+                video_jobs = [j for j in filtered_jobs if j.get("video_url")]
+                st.caption(f"{len(video_jobs)} of {len(filtered_jobs)} filtered jobs have videos")
+                col1, col2 = st.columns(2)
+                with col1:
+                    archive_format = st.radio("Archive format", ["zip", "tar"], horizontal=True)
+                with col2:
+                    export_workers = st.slider("Parallel downloads", 1, 8, EXPORT_DOWNLOAD_WORKERS)
+                
+                if st.button("📦 Build Archive", disabled=not video_jobs):
+                    with st.spinner(f"Downloading {len(video_jobs)} videos..."):
+                        result = export_video_archive(filtered_jobs, archive_format, export_workers)
+                    st.session_state["video_archive"] = {key: result[key] for key in ("path", "exported", "failed")}
+                archive = st.session_state.get("video_archive")
+                if archive:
+                    st.success(f"✅ Archived {archive['exported']} videos ({archive['failed']} skipped)")
+                    st.caption(f"Saved to `{archive['path']}`")
+                    render_export_download(
+                        "⬇️ Download Archive",
+                        archive["path"],
+                        "application/zip" if archive["path"].endswith(".zip") else "application/x-tar",
+                        key="download_video_archive",
+                    )
+            
             st.markdown("---")
             
-            # Filter jobs
-            filtered_jobs = jobs
-            if filter_status:
-                filtered_jobs = [j for j in filtered_jobs if j.get("status", "").lower() in filter_status]
-            if search_term:
-                filtered_jobs = [j for j in filtered_jobs if search_term.lower() in j.get("script", "").lower()]
             if sort_order == "Oldest First":
                 filtered_jobs = list(reversed(filtered_jobs))
             
             # Display jobs
             for idx, job in enumerate(filtered_jobs):
-                with st.container():
+                with st.container(), profile_section("history.cards"):
                     st.markdown(f'<div class="job-card">', unsafe_allow_html=True)
                     
-                    col1, col2, col3 = st.columns([2, 1, 1])
+                    video_url = job.get('video_url')
+                    media = media_artifact_paths(video_url) if video_url else {}
+                    
+                    col0, col1, col2, col3 = st.columns([1, 2, 1, 1])
+                    with col0:
+                        artifacts = media_artifact_status(video_url) if video_url else "missing"
+                        if artifacts == "missing" and schedule_media_artifacts(video_url) is not None:
+                            # Loaded from the store or an import, or pruned from the media cache
+                            artifacts = "pending"
+                        if media and touch_cached_media(media["thumbnail"]):
+                            st.image(media["thumbnail"], use_container_width=True)
+                        elif artifacts == "pending":
+                            st.caption("🖼️ Generating preview...")
+                        else:
+                            st.caption("🎞️ No preview")
+                    is_favorite = job_fingerprint(job) in session.favorites
                     with col1:
-                        st.markdown(f"**Job ID:** `{job.get('job_id', 'N/A')}`")
-                        st.markdown(f"**Status:** {job_status_badge(job.get('status', 'unknown'))}")
+                        st.markdown(f"**Job ID:** `{job.get('job_id', 'N/A')}`" + (" ⭐" if is_favorite else ""))
+                        st.markdown(
+                            f"**Status:** {job_status_badge(job.get('status', 'unknown'))}"
+                            + (" · 📝 DRAFT" if job.get("draft") else "")
+                            + (" · ♻️ REUSED" if job.get("reused") else "")
+                            + (" · ⏰ SCHEDULED" if job.get("schedule") else "")
+                        )
                     with col2:
                         st.markdown(f"**Timestamp:**")
                         st.caption(job.get('timestamp', 'N/A'))
@@ -928,48 +5635,95 @@ def main():
                         st.markdown(f"**Actor:** `{job.get('actor_id', 'N/A')[:15]}...`")
                         st.markdown(f"**Voice:** `{job.get('voice_id', 'N/A')[:15]}...`")
                     
+                    if "parent_job_id" in job:
+                        st.caption(
+                            f"↳ {job.get('aspect_ratio')} · {job.get('resolution')} rendition of "
+                            + (f"`{job['parent_job_id']}`" if job["parent_job_id"] else "a master without a job ID")
+                            + (f" - {job['error']}" if job.get("error") else "")
+                        )
+                    
+                    if job.get("schedule"):
+                        st.caption(f"⏰ From schedule `{job['schedule']}`")
+                    
                     with st.expander("📄 View Script", expanded=False):
                         st.text(job.get('script', 'N/A'))
                     
-                    video_url = job.get('video_url')
+                    rendition = job.get("rendition")
+                    if rendition and os.path.exists(rendition):
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.button("▶️ Play", key=f"play_{idx}", on_click=session.open_video, args=(job,))
+                        with col2:
+                            st.download_button(
+                                "⬇️ Download",
+                                data=functools.partial(read_file_bytes, rendition),
+                                file_name=f"pipio_{re.sub(r'[^A-Za-z0-9_.-]', '_', str(job['job_id']))}.mp4",
+                                mime="video/mp4",
+                                key=f"download_{idx}",
+                            )
+                        if session.is_video_open(job):
+                            st.video(rendition)
+                    
                     if video_url:
                         col1, col2, col3 = st.columns(3)
                         with col1:
-                            if st.button(f"▶️ Play", key=f"play_{idx}"):
-                                st.session_state[f"show_video_{idx}"] = True
+                            st.button("▶️ Play", key=f"play_{idx}", on_click=session.open_video, args=(job,))
                         with col2:
-                            try:
-                                video_data = requests.get(video_url).content
+                            # Fetched when clicked, not for every card on every rerun
+                            st.download_button(
+                                "⬇️ Download",
+                                data=functools.partial(
+                                    read_video_bytes, video_url, http if is_replay_url(video_url) else None
+                                ),
+                                file_name=f"pipio_{job.get('job_id', 'video')}.mp4",
+                                mime="video/mp4",
+                                key=f"download_{idx}"
+                            )
+                        with col3:
+                            st.button(
+                                "★ Unfavorite" if is_favorite else "⭐ Favorite",
+                                key=f"fav_{idx}",
+                                on_click=toggle_favorite,
+                                args=(job,),
+                            )
+                        
+                        if job.get("branding"):
+                            branded, branded_path = branding_status(video_url, job["branding"], session.owner)
+                            if branded == "ready":
                                 st.download_button(
-                                    "⬇️ Download",
-                                    data=video_data,
-                                    file_name=f"pipio_{job.get('job_id', 'video')}.mp4",
+                                    f"🎬 Download branded ({', '.join(job['branding'])})",
+                                    data=functools.partial(read_file_bytes, branded_path),
+                                    file_name=f"pipio_{job.get('job_id', 'video')}_branded.mp4",
                                     mime="video/mp4",
-                                    key=f"download_{idx}"
+                                    key=f"branded_{idx}",
                                 )
-                            except:
-                                st.caption("Download unavailable")
-                        with col3:
-                            if st.button(f"⭐ Favorite", key=f"fav_{idx}"):
-                                if job not in st.session_state.get("favorites", []):
-                                    st.session_state.setdefault("favorites", []).append(job)
-                                    st.success("Added to favorites!")
+                            elif branded == "pending":
+                                st.caption("🎬 Applying branding...")
+                            elif branded_path and branding_available():
+                                label = "🎬 Retry branding" if branded == "failed" else "🎬 Apply branding"
+                                if st.button(label, key=f"brand_{idx}"):
+                                    schedule_branding(video_url, job["branding"], session.owner)
+                                    st.rerun()
                         
-                        if st.session_state.get(f"show_video_{idx}", False):
-                            st.video(video_url)
+                        if session.is_video_open(job):
+                            if touch_cached_media(media["preview"]):
+                                st.video(media["preview"])
+                                st.caption(f"Low-bitrate preview · [Full resolution]({video_url})")
+                            else:
+                                st.video(video_url)
                     
                     st.markdown('</div>', unsafe_allow_html=True)
                     st.markdown("---")
     
     # TAB 3: Analytics
-    with tab3:
+    with tab3, profile_section("tab.analytics"):
         st.markdown("### 📊 ANALYTICS DASHBOARD")
         
         if show_stats:
-            jobs = st.session_state.get("pipio_jobs", [])
-            total = st.session_state.get("total_videos", 0)
-            successful = st.session_state.get("successful_videos", 0)
-            failed = st.session_state.get("failed_videos", 0)
+            jobs = [job for job in session.jobs if not job.get("draft")]
+            total = session.count("total_videos")
+            successful = session.count("successful_videos")
+            failed = session.count("failed_videos")
             
             # Stats cards
             col1, col2, col3, col4 = st.columns(4)
@@ -1031,11 +5785,69 @@ def main():
                     timestamp = job.get('timestamp', 'N/A')
                     job_id = job.get('job_id', 'N/A')
                     st.markdown(f"• **{timestamp}** - {status} - Job: `{job_id}`")
+            
+            st.markdown("---")
+            st.markdown("### 💰 Render Usage & Budget")
+            
+            today = usage_totals()
+            queue = queued_jobs()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Projected Today", f"{today['projected']:.1f}")
+            with col2:
+                st.metric(
+                    "Actual Today",
+                    f"{today['actual']:.1f}",
+                    delta=f"{today['actual'] - today['projected']:+.1f} vs projected",
+                    delta_color="inverse",
+                )
+            with col3:
+                st.metric("Budget Remaining", f"{max(daily_budget - today['actual'], 0):.1f}")
+            with col4:
+                st.metric("Queued Jobs", len(queue))
+            
+            history = usage_history()
+            if history:
+                st.bar_chart(
+                    {
+                        "projected": {h["day"]: h["projected"] for h in history},
+                        "actual": {h["day"]: h["actual"] for h in history},
+                    },
+                    stack=False,
+                )
+            
+            if queue:
+                st.markdown("**⏳ Deferred Queue**")
+                priority_names = {v: k for k, v in JOB_PRIORITIES.items()}
+                for item in queue[:20]:
+                    st.markdown(
+                        f"• `{item['id']}` {priority_names.get(item['priority'], '?')} - "
+                        f"{item['projected']:.1f} credits - after {item['not_before']} - {item['reason']}"
+                    )
+                if api_key:
+                    due = dispatchable_jobs(usage_user(api_key), daily_budget, user_budget)
+                    if st.button(f"▶️ Dispatch {len(due)} due jobs", disabled=not due):
+                        with st.spinner(f"Dispatching {len(due)} jobs..."):
+                            for result in dispatch_queued_jobs(
+                                api_key, due, max_poll, poll_interval, batch_in_flight, http=http, key_pool=key_pool
+                            ):
+                                if result["status"] == "CIRCUIT OPEN":
+                                    continue
+                                add_job_to_history(
+                                    job_id=result.get("job_id"),
+                                    status=result["status"],
+                                    script_preview=result["script"][:120],
+                                    video_url=result.get("video_url"),
+                                    actor_id=result["actor_id"],
+                                    voice_id=result["voice_id"],
+                                )
+                                schedule_media_artifacts(result.get("video_url"))
+                        st.rerun()
         else:
             st.info("Enable 'Show statistics dashboard' in the sidebar to view analytics")
     
     # TAB 4: Advanced
-    with tab4:
+    with tab4, profile_section("tab.advanced"):
         st.markdown("### ⚙️ ADVANCED CONFIGURATION")
         
         st.markdown("#### 🔧 API Endpoints")
@@ -1045,6 +5857,38 @@ def main():
         with col2:
             st.text_input("Job Status URL", value=PIPIO_JOB_STATUS_URL, disabled=True)
         
+        st.markdown("---")
+        st.markdown("#### 📇 Actor & Voice Catalog")
+        if not catalog_key:
+            st.info("Enter your API key to load the actor and voice catalogs")
+        else:
+            col1, col2 = st.columns(2)
+            for column, kind in ((col1, "actors"), (col2, "voices")):
+                with column:
+                    catalog = cached_catalog(catalog_key, kind)
+                    if catalog and catalog.get("items"):
+                        age = int(time.time() - catalog["fetched_at"]) if catalog.get("fetched_at") else None
+                        st.metric(kind.title(), len(catalog["items"]))
+                        st.caption(f"Fetched {age // 60} min ago" if age is not None else "Stale copy")
+                        if catalog.get("failed_at"):
+                            st.caption("⚠️ Last refresh failed - serving cached copy")
+                    else:
+                        st.metric(kind.title(), "—")
+                        st.caption("Not loaded yet" if catalog is None else "Catalog unavailable")
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                catalog_query = st.text_input("🔍 Search catalog", "", key="catalog_query")
+            with col2:
+                if st.button("🔄 Load / Refresh Catalog"):
+                    for kind in PIPIO_CATALOG_URLS:
+                        fetch_catalog(catalog_key, kind, force=True, http=http)
+                    st.rerun()
+            if catalog_query:
+                for kind in PIPIO_CATALOG_URLS:
+                    index = catalog_index(catalog_key, kind, http, refresh=False)
+                    for item in index.search(catalog_query, limit=10) if index else []:
+                        st.markdown(f"• {kind[:-1].title()}: **{item['name']}** `{item['id']}`")
+        
         st.markdown("---")
         st.markdown("#### 📚 Documentation & Resources")
         
@@ -1070,6 +5914,14 @@ def main():
         - Save successful configurations for reuse
         """)
         
+        st.markdown("---")
+        st.markdown("#### ⏱️ Profiling")
+        render_profiling_panel()
+        
+        st.markdown("---")
+        st.markdown("#### 📼 Replay Soak Test")
+        render_soak_panel()
+        
         st.markdown("---")
         st.markdown("#### 🧪 Experimental Features")
         
@@ -1078,19 +5930,499 @@ def main():
             batch_mode = st.checkbox("Batch Generation Mode", value=False)
             if batch_mode:
                 st.info("Generate multiple videos from a list of scripts")
+            rendition_mode = st.checkbox("Rendition Mode", value=False)
+            if rendition_mode:
+                st.info("Render once and derive other aspect ratios and resolutions locally")
         
         with col2:
             auto_retry = st.checkbox("Auto-retry on Failure", value=False)
             if auto_retry:
                 retry_count = st.number_input("Max Retries", 1, 5, 3)
         
+        if rendition_mode:
+            st.markdown("#### 🖼️ Renditions")
+            st.caption(
+                "Uses the GENERATE tab's script and settings. Formats that are a centre crop and downscale "
+                "of another are derived locally instead of rendered."
+            )
+            rendition_options = [f"{ar} · {res}" for ar in ASPECT_RATIOS for res in RESOLUTIONS]
+            rendition_choice = st.multiselect(
+                "Formats",
+                rendition_options,
+                default=[f"{ar} · {resolution}" for ar in ("16:9", "9:16", "1:1")],
+            )
+            rendition_targets = [tuple(option.split(" · ")) for option in rendition_choice]
+            rendition_plan = plan_renditions(rendition_targets)
+            if rendition_plan:
+                st.caption(f"{len(rendition_plan)} paid render(s) for {len(rendition_targets)} formats")
+                for master in rendition_plan:
+                    derived = ", ".join(f"{ar} · {res}" for ar, res in master["derived"]) or "nothing else"
+                    st.markdown(f"• **{master['aspect_ratio']} · {master['resolution']}** → {derived}")
+                if not FFMPEG_BIN and any(master["derived"] for master in rendition_plan):
+                    st.warning("⚠️ ffmpeg is not installed - derived formats will be skipped")
+            
+            if st.button("🖼️ RENDER FORMATS", type="primary", disabled=not rendition_plan):
+                if not api_key and not dry_run and not replay:
+                    st.error("⚠️ API KEY REQUIRED - Enter your key in the sidebar")
+                    st.stop()
+                try:
+                    for master in rendition_plan:
+                        GenerationRequest.build(
+                            actor_id, voice_id, script_text, master["aspect_ratio"], master["resolution"], fps, extras
+                        )
+                except PayloadValidationError as e:
+                    st.error("⚠️ INVALID REQUEST - nothing was sent")
+                    for problem in e.problems:
+                        st.markdown(f"• {problem}")
+                    st.stop()
+                if dry_run:
+                    st.info(f"🔧 DRY RUN - {len(rendition_plan)} renders, {len(rendition_targets)} formats")
+                    st.stop()
+                
+                user = usage_user(api_key)
+                costs = {
+                    master["resolution"]: estimate_render_cost(
+                        script_text, master["resolution"], fps, voice_id, extras.get("speakingRate")
+                    )
+                    for master in rendition_plan
+                }
+                total_cost = sum(costs[master["resolution"]] for master in rendition_plan)
+                try:
+                    not_before, defer_reason = schedule_decision(total_cost, priority, user, daily_budget, user_budget)
+                except BudgetExceededError as e:
+                    st.error(f"🔴 RENDITIONS REJECTED - {e}")
+                    st.stop()
+                if not_before is not None:
+                    st.warning(f"⏳ RENDITIONS NOT RENDERED - {defer_reason}")
+                    st.stop()
+                usage_ids = {
+                    (master["aspect_ratio"], master["resolution"]): record_usage(user, costs[master["resolution"]])
+                    for master in rendition_plan
+                }
+                
+                rendition_config = {
+                    "actor_id": actor_id,
+                    "voice_id": voice_id,
+                    "fps": fps,
+                    "extras": extras or None,
+                    "reuse_renders": reuse_renders,
+                    "max_seconds": max_poll,
+                    "interval": poll_interval,
+                    "http": http,
+                }
+                progress_text = st.empty()
+                with st.spinner(f"Rendering {len(rendition_plan)} masters..."):
+                    for result in run_rendition_plan(api_key, script_text, rendition_plan, rendition_config, key_pool):
+                        label = f"{result['aspect_ratio']} · {result['resolution']}"
+                        if "parent_job_id" in result and result["status"] != "SKIPPED":
+                            # A master may finish with a video but no job ID; never share "None:..." IDs
+                            parent = result["parent_job_id"] or f"rendition-{uuid.uuid4().hex[:12]}"
+                            add_job_to_history(
+                                job_id=f"{parent}:{result['aspect_ratio']}@{result['resolution']}",
+                                status=result["status"],
+                                script_preview=result["script"][:120],
+                                video_url=None,
+                                actor_id=actor_id,
+                                voice_id=voice_id,
+                                extra={
+                                    "parent_job_id": result["parent_job_id"],
+                                    "aspect_ratio": result["aspect_ratio"],
+                                    "resolution": result["resolution"],
+                                    "rendition": result.get("path"),
+                                    "error": result.get("error"),
+                                },
+                            )
+                        elif "parent_job_id" not in result:
+                            record_actual_usage(
+                                usage_ids[(result["aspect_ratio"], result["resolution"])],
+                                0.0 if result.get("reused") or result["status"] == "CIRCUIT OPEN" else actual_render_cost(
+                                    result.get("payload", {}), result["status"],
+                                    costs[result["resolution"]], result["resolution"], fps,
+                                ),
+                                result.get("job_id"),
+                            )
+                            add_job_to_history(
+                                job_id=result.get("job_id"),
+                                status=result["status"],
+                                script_preview=result["script"][:120],
+                                video_url=result.get("video_url"),
+                                actor_id=actor_id,
+                                voice_id=voice_id,
+                                extra={
+                                    "payload_hash": result.get("payload_hash"),
+                                    "reused": result.get("reused", False),
+                                    "reused_from": result.get("reused_from"),
+                                    "aspect_ratio": result["aspect_ratio"],
+                                    "resolution": result["resolution"],
+                                },
+                            )
+                            schedule_media_artifacts(result.get("video_url"))
+                        progress_text.info(f"{label}: {job_status_badge(result['status'])}")
+                st.success("✅ Renditions finished - see the HISTORY tab")
+        
+        if batch_mode:
+            st.markdown("#### 📨 Template Campaign")
+            st.caption(
+                "One video per CSV row. Use `{column}` placeholders in the script; "
+                "optional `actor_id` / `voice_id` columns override the GENERATE tab settings."
+            )
+            templates = {**campaign_templates(), **script_templates()}
+            campaign_template_name = st.selectbox(
+                "Campaign template",
+                ["Custom"] + list(templates.keys()),
+                index=list(templates.keys()).index("Personalized Outreach") + 1,
+            )
+            campaign_source = st.text_area(
+                "Template script",
+                value=templates.get(campaign_template_name, ""),
+                height=120,
+                key=f"campaign_source_{campaign_template_name}",
+            )
+            recipients_file = st.file_uploader("Recipients CSV", type=["csv"])
+            campaign_presets = load_presets(session.owner)
+            campaign_settings_id = st.selectbox(
+                "Campaign settings",
+                [""] + list(campaign_presets.keys()),
+                format_func=lambda pid: campaign_presets[pid]["name"] if pid else "Current GENERATE settings",
+                help="A `preset` column in the CSV overrides this per row",
+            )
+            max_in_flight = st.slider("Jobs in flight", 1, max(16, batch_in_flight), min(batch_in_flight, 64))
+            
+            try:
+                campaign_template = compile_script_template(campaign_source)
+            except ValueError as e:
+                campaign_template = None
+                st.error(f"⚠️ TEMPLATE ERROR: {e}")
+            
+            if campaign_template is not None:
+                st.caption(f"Placeholders: {', '.join(campaign_template.fields) or 'none'}")
+            
+            campaign_run = st.session_state.get("campaign_run")
+            campaign_running = campaign_run is not None and not campaign_run.done
+            if campaign_run is not None:
+                counts = campaign_run.counts
+                tally = f"✅ {counts['completed']} · ❌ {counts['failed']} · ⏭️ {counts['skipped']}"
+                if campaign_run.error:
+                    st.error(f"🔴 CAMPAIGN STOPPED: {campaign_run.error} | {tally}")
+                elif campaign_run.done:
+                    st.success(
+                        f"✅ Campaign finished: {counts['completed']} videos, "
+                        f"{counts['failed']} failed, {counts['skipped']} skipped or deferred"
+                    )
+                else:
+                    st.info(f"📨 CAMPAIGN RUNNING in the background - {campaign_run.last_row or 'starting'} | {tally}")
+                    st.button("🔄 Refresh progress")
+            
+            if campaign_template is not None and recipients_file is not None:
+                recipients_header = csv_header(recipients_file)
+                missing = missing_template_columns(campaign_template, recipients_header)
+                if missing:
+                    st.error(f"⚠️ CSV is missing columns: {', '.join(missing)}")
+                else:
+                    first_row = next(iter_csv_rows(recipients_file), None)
+                    recipients_file.seek(0)
+                    if first_row is not None:
+                        try:
+                            st.text_area("Preview (first row)", campaign_template.render(first_row), disabled=True)
+                        except KeyError as e:
+                            st.warning(f"First row has no value for {{{e.args[0]}}}")
+                    
+                    if st.button("🚀 LAUNCH CAMPAIGN", type="primary", disabled=campaign_running):
+                        if not api_key and not dry_run and not replay:
+                            st.error("⚠️ API KEY REQUIRED - Enter your key in the sidebar")
+                            st.stop()
+                        if campaign_settings_id:
+                            campaign_base = dict(campaign_presets[campaign_settings_id]["settings"])
+                        else:
+                            campaign_base = {
+                                "actor_id": actor_id,
+                                "voice_id": voice_id,
+                                "aspect_ratio": aspect_ratio,
+                                "resolution": resolution,
+                                "fps": fps,
+                                "extras": extras or None,
+                            }
+                        unset_ids = [
+                            label for column, label in (("actor_id", "ACTOR ID"), ("voice_id", "VOICE ID"))
+                            if not (campaign_base.get(column) or "").strip()
+                            and column not in recipients_header and CAMPAIGN_PRESET_COLUMN not in recipients_header
+                        ]
+                        if unset_ids:
+                            st.error(
+                                f"⚠️ {' and '.join(unset_ids)} REQUIRED - set them on the GENERATE tab, "
+                                "pick campaign settings or add the columns to the CSV"
+                            )
+                            st.stop()
+                        campaign_config = {
+                            **campaign_base,
+                            "reuse_renders": reuse_renders,
+                            "max_seconds": max_poll,
+                            "interval": poll_interval,
+                            "http": http,
+                        }
+                        # The campaign outlives this rerun, so it reads its own copy of the upload
+                        rows = iter_csv_rows(io.BytesIO(recipients_file.getvalue()))
+                        if dry_run:
+                            rendered = skipped = 0
+                            for row in rows:
+                                try:
+                                    campaign_template.render(row)
+                                    rendered += 1
+                                except KeyError:
+                                    skipped += 1
+                            st.info(f"🔧 DRY RUN - {rendered} scripts rendered, {skipped} rows skipped")
+                            st.stop()
+                        
+                        user = usage_user(api_key)
+                        # Worker threads cannot see the transport mode, so it is fixed at launch
+                        campaign_replay = replaying()
+                        
+                        def admit_campaign_row(info: Dict[str, Any], job_config: Dict[str, Any]) -> Optional[str]:
+                            cost = estimate_render_cost(
+                                info["script"], job_config["resolution"], job_config["fps"], info["voice_id"],
+                                (job_config.get("extras") or {}).get("speakingRate"),
+                            )
+                            if campaign_replay:
+                                info["projected"], info["usage_id"] = 0.0, 0
+                                return None
+                            try:
+                                not_before, reason = schedule_decision(cost, priority, user, daily_budget, user_budget)
+                            except BudgetExceededError as e:
+                                return f"rejected - {e}"
+                            if not_before is None and health_registry(http).breaker("generate").is_open():
+                                not_before, reason = circuit_retry_time("generate", http), "generate endpoint circuit open"
+                            if not_before is not None:
+                                request = {k: job_config[k] for k in ("actor_id", "voice_id", "aspect_ratio", "resolution", "fps", "extras")}
+                                enqueue_job(user, priority, cost, {**request, "script": info["script"]}, not_before, reason)
+                                return reason
+                            info["projected"] = cost
+                            info["usage_id"] = record_usage(user, cost)
+                            return None
+                        
+                        campaign_owner = session.owner
+                        
+                        def finish_campaign_row(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                            if result["status"] == "CIRCUIT OPEN":
+                                record_actual_usage(result["usage_id"], 0.0)
+                                if not campaign_replay:
+                                    enqueue_job(
+                                        user, priority, result["projected"], {**result["settings"], "script": result["script"]},
+                                        circuit_retry_time("generate", http), result["error"],
+                                    )
+                                return None
+                            if result["status"] in {"SKIPPED", "DEFERRED"}:
+                                return None
+                            settings = result["settings"]
+                            record_actual_usage(
+                                result["usage_id"],
+                                0.0 if result.get("reused") else actual_render_cost(
+                                    result.get("payload", {}), result["status"], result["projected"],
+                                    settings["resolution"], settings["fps"],
+                                ),
+                                result.get("job_id"),
+                            )
+                            record = {
+                                "job_id": result.get("job_id") or "N/A",
+                                "status": result["status"],
+                                "script": result["script"][:120],
+                                "video_url": result.get("video_url"),
+                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                "actor_id": result["actor_id"],
+                                "voice_id": result["voice_id"],
+                                "payload_hash": result.get("payload_hash"),
+                                "reused": result.get("reused", False),
+                                "reused_from": result.get("reused_from"),
+                                "branding": branding_steps,
+                                "owner": campaign_owner,
+                            }
+                            if not campaign_replay:
+                                store_jobs([record], replace=True)
+                            schedule_media_artifacts(result.get("video_url"))
+                            schedule_branding(result.get("video_url"), branding_steps, campaign_owner)
+                            return record
+                        
+                        check_ids = functools.partial(resolve_catalog_ids, catalog_key, http=http)
+                        st.session_state["campaign_run"] = CampaignRun(
+                            run_template_campaign(
+                                api_key, campaign_template, rows, campaign_config, max_in_flight, admit_campaign_row,
+                                check_ids, key_pool, campaign_presets,
+                            ),
+                            finish_campaign_row,
+                            campaign_owner,
+                        )
+                        st.rerun()
+        
+        st.markdown("---")
+        st.markdown("#### ⏰ Scheduled Jobs")
+        st.caption(
+            "Recurring (cron) or one-off generations that run unattended and land in the history. "
+            "Placeholders {date}, {weekday}, {month}, {time} and {run} are filled when a job fires."
+        )
+        dispatcher = schedule_dispatcher()
+        st.caption(
+            f"Scheduler: last check {dispatcher.last_tick.strftime('%H:%M:%S') if dispatcher.last_tick else 'pending'} · "
+            f"{len(dispatcher.waiting)} waiting · {dispatcher.running} running · {dispatcher.completed} finished"
+        )
+        if dispatcher.last_error:
+            st.warning(f"⚠️ SCHEDULER ERROR: {dispatcher.last_error}")
+        
+        with st.expander("➕ New schedule", expanded=False):
+            templates = script_templates()
+            schedule_template_name = st.selectbox(
+                "Schedule template",
+                ["GENERATE script"] + list(templates.keys()),
+                key="schedule_template",
+            )
+            if schedule_template_name in templates:
+                schedule_source = st.text_area(
+                    "Scheduled script",
+                    value=templates[schedule_template_name],
+                    height=120,
+                    key=f"schedule_source_{schedule_template_name}",
+                )
+            else:
+                schedule_source = script_text
+                st.text_area("Scheduled script", script_text, height=120, disabled=True)
+            schedule_presets = load_presets(session.owner)
+            schedule_settings_id = st.selectbox(
+                "Schedule settings",
+                [""] + list(schedule_presets.keys()),
+                format_func=lambda pid: schedule_presets[pid]["name"] if pid else "Current GENERATE settings",
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                schedule_name = st.text_input("Schedule name", placeholder="e.g., Weekday morning update")
+                schedule_kind = st.radio("Repeat", ["Recurring (cron)", "Once"], horizontal=True)
+            with col2:
+                if schedule_kind == "Once":
+                    soon = datetime.now() + timedelta(hours=1)
+                    run_date = st.date_input("Run on", soon.date())
+                    run_time = st.time_input("At", soon.time().replace(second=0, microsecond=0))
+                    schedule_cron, schedule_run_at = None, datetime.combine(run_date, run_time)
+                else:
+                    schedule_cron = st.text_input(
+                        "Cron expression",
+                        "0 9 * * 1-5",
+                        help="minute hour day month weekday (0 = Sunday), or @hourly / @daily / @weekly / @monthly",
+                    )
+                    schedule_run_at = None
+            
+            schedule_problem = None
+            try:
+                if schedule_cron is not None:
+                    upcoming = CronSchedule.parse(schedule_cron).upcoming(datetime.now())
+                    st.caption("Next runs: " + " · ".join(run.strftime("%a %Y-%m-%d %H:%M") for run in upcoming))
+                elif schedule_run_at <= datetime.now():
+                    schedule_problem = "Pick a time in the future"
+                sample_script = render_schedule_script(schedule_source, schedule_run_at or upcoming[0], 1)
+                if schedule_settings_id:
+                    schedule_settings = dict(schedule_presets[schedule_settings_id]["settings"])
+                else:
+                    schedule_settings = build_preset_settings(
+                        actor_id, voice_id, aspect_ratio, resolution, fps, extras or None
+                    )
+                GenerationRequest.build(script=sample_script, **schedule_settings)
+            except (ValueError, KeyError) as e:
+                schedule_problem = str(e)
+            if schedule_problem:
+                st.error(f"⚠️ SCHEDULE ERROR: {schedule_problem}")
+            if not api_key:
+                st.caption("Enter an API key in the sidebar to schedule jobs")
+            
+            if st.button("➕ Add schedule", disabled=bool(schedule_problem or not api_key or not schedule_name.strip())):
+                create_schedule(
+                    schedule_name.strip(),
+                    api_key,
+                    {**schedule_settings, "script": schedule_source},
+                    cron=schedule_cron,
+                    run_at=schedule_run_at,
+                    options={"branding": branding_steps, "daily_budget": daily_budget, "user_budget": user_budget},
+                )
+                st.success(f"✅ Scheduled '{schedule_name.strip()}'")
+                st.rerun()
+            st.caption(
+                "Schedules store only a masked label of the key and run on it while the server knows it. "
+                "After a restart they run once you open the app with the key again."
+            )
+        
+        schedule_owner = usage_user(api_key) if api_key else ""
+        schedules = list_schedules(schedule_owner) if api_key else []
+        if schedules:
+            dispatcher.authorize(api_key)
+            st.dataframe(
+                [
+                    {
+                        "id": s["id"],
+                        "name": s["name"],
+                        "repeat": s["cron"] or "once",
+                        "next run": s["next_run"] if s["enabled"] else "paused",
+                        "last run": s["last_run"],
+                        "last status": s["last_status"],
+                        "runs": s["runs"],
+                        "key": s["key_label"],
+                    }
+                    for s in schedules
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+            by_id = {s["id"]: s for s in schedules}
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+            with col1:
+                schedule_choice = st.selectbox(
+                    "Schedule", list(by_id), format_func=lambda sid: f"{sid} · {by_id[sid]['name']}"
+                )
+            chosen = by_id[schedule_choice]
+            if chosen["last_error"]:
+                st.caption(f"Last error: {chosen['last_error']}")
+            with col2:
+                if chosen["enabled"]:
+                    st.button(
+                        "⏸️ Pause", on_click=set_schedule_enabled, args=(schedule_choice, schedule_owner, False),
+                        use_container_width=True,
+                    )
+                else:
+                    st.button(
+                        "▶️ Resume", on_click=set_schedule_enabled, args=(schedule_choice, schedule_owner, True),
+                        use_container_width=True,
+                    )
+            with col3:
+                st.button(
+                    "⚡ Run now", on_click=run_schedule_now, args=(schedule_choice, schedule_owner), use_container_width=True
+                )
+            with col4:
+                st.button(
+                    "🗑️ Delete", on_click=delete_schedule, args=(schedule_choice, schedule_owner), use_container_width=True
+                )
+        
         st.markdown("---")
         st.markdown("#### 💾 Import/Export")
         
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("📥 Import Configuration"):
-                st.info("Upload a JSON configuration file (feature in development)")
+            import_file = st.file_uploader(
+                "History / configuration file",
+                type=["json", "jsonl"],
+                help="JSON or JSONL exports, including 'Export History as JSON' files",
+            )
+            if st.button("📥 Import Configuration", disabled=import_file is None):
+                try:
+                    with st.spinner("Importing records..."):
+                        result = import_history_file(import_file, session.owner)
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(f"🔴 IMPORT FAILED: {e}")
+                else:
+                    session.jobs = load_recent_jobs(session.owner)
+                    st.success(
+                        f"✅ Imported {result['imported']} jobs "
+                        f"({result['duplicates']} duplicates, {result['invalid']} invalid)"
+                    )
+                    st.caption(f"Job store now holds {count_stored_jobs(session.owner)} jobs")
+                    if result["presets"]:
+                        st.info(f"💾 Imported {result['presets']} presets")
+                    if result["config"]:
+                        st.session_state["pending_config"] = result["config"]
+                        st.info("Configuration imported - applied on next refresh")
         
         with col2:
             if st.button("📤 Export Configuration"):
@@ -1098,8 +6430,9 @@ def main():
                     "api_url": PIPIO_GENERATE_URL,
                     "max_poll_seconds": max_poll,
                     "poll_interval": poll_interval,
-                    "total_videos": st.session_state.get("total_videos", 0),
-                    "successful_videos": st.session_state.get("successful_videos", 0),
+                    "total_videos": session.count("total_videos"),
+                    "successful_videos": session.count("successful_videos"),
+                    "presets": [{"name": p["name"], "settings": p["settings"]} for p in load_presets(session.owner).values()],
                 }
                 st.download_button(
                     "Download Config",
@@ -1107,6 +6440,34 @@ def main():
                     file_name="pipio_config.json",
                     mime="application/json"
                 )
+        
+        with st.expander("🗄️ Export Full History", expanded=False):
+            st.caption(f"{count_stored_jobs(session.owner)} jobs in the job store")
+            col1, col2 = st.columns(2)
+            with col1:
+                export_format = st.selectbox("Format", HISTORY_EXPORT_FORMATS)
+                export_statuses = st.multiselect(
+                    "Status filter",
+                    ["completed", "failed", "processing", "queued", "unknown"],
+                    default=[],
+                    key="history_export_statuses",
+                )
+            with col2:
+                export_fields = st.multiselect("Fields", HISTORY_EXPORT_FIELDS, default=HISTORY_EXPORT_FIELDS)
+                export_search = st.text_input("Script contains", "", key="history_export_search")
+            if pa is None:
+                st.caption("Install pyarrow to enable Parquet export")
+            
+            if st.button("📤 Export History", disabled=not export_fields):
+                with st.spinner("Streaming history..."):
+                    result = export_history_file(session.owner, export_format, export_fields, export_statuses, export_search)
+                st.success(f"✅ Exported {result['rows']} jobs to `{result['path']}`")
+                mime = {
+                    "jsonl": "application/x-ndjson",
+                    "csv": "text/csv",
+                    "parquet": "application/vnd.apache.parquet",
+                }[export_format]
+                render_export_download("⬇️ Download Export", result["path"], mime, key="download_history_export")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# app.py derives its data paths from the environment at import time
+os.environ.setdefault("PIPIO_DATA_DIR", tempfile.mkdtemp(prefix="pipio-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def job_store_path(tmp_path, monkeypatch):
+    """A fresh job store for one test."""
+    path = str(tmp_path / "jobs.db")
+    monkeypatch.setattr(app, "JOB_STORE_PATH", path)
+    app.load_presets.clear()
+    return path
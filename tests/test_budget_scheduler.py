@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app
+
+NOON = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+LATE = NOON.replace(hour=23)
+
+
+def _item(priority, created_at, projected):
+    return {"priority": priority, "created_at": created_at, "projected": projected}
+
+
+def test_pack_jobs_takes_priority_order_first_fit():
+    queue = [_item(1, "a", 5), _item(0, "b", 8), _item(2, "c", 2), _item(1, "d", 1)]
+    packed = app.pack_jobs(queue, 10)
+    assert [item["created_at"] for item in packed] == ["b", "d"]
+
+
+def test_pack_jobs_lets_small_jobs_past_a_large_one():
+    queue = [_item(0, "a", 50), _item(1, "b", 3), _item(1, "c", 4)]
+    assert [item["created_at"] for item in app.pack_jobs(queue, 8)] == ["b", "c"]
+    assert app.pack_jobs(queue, 0) == []
+
+
+def test_schedule_decision_runs_affordable_jobs_now(job_store_path):
+    assert app.schedule_decision(10, "Normal", "user", 100, 50, now=NOON) == (None, "")
+
+
+def test_schedule_decision_rejects_jobs_no_budget_fits(job_store_path):
+    with pytest.raises(app.BudgetExceededError) as excinfo:
+        app.schedule_decision(60, "High", "user", 100, 50, now=NOON)
+    assert excinfo.value.limit == 50
+
+
+def test_schedule_decision_caps_budgets_at_the_server_ceiling(job_store_path, monkeypatch):
+    monkeypatch.setattr(app, "MAX_USER_BUDGET", 20.0)
+    with pytest.raises(app.BudgetExceededError):
+        app.schedule_decision(30, "Normal", "user", 1000, 1000, now=NOON)
+
+
+def test_schedule_decision_defers_when_budgets_are_spent(job_store_path):
+    tomorrow = (NOON + timedelta(days=1)).replace(hour=0)
+    app.record_usage("someone-else", 90)
+    assert app.schedule_decision(20, "Normal", "user", 100, 50, now=NOON) == (tomorrow, "daily budget exhausted")
+
+    app.record_usage("user", 40)
+    assert app.schedule_decision(20, "Normal", "user", 1000, 50, now=NOON) == (
+        tomorrow, "per-user budget exhausted"
+    )
+
+
+def test_schedule_decision_holds_low_priority_until_off_peak(job_store_path):
+    when, reason = app.schedule_decision(5, "Low", "user", 100, 50, now=NOON)
+    assert when == NOON.replace(hour=app.OFF_PEAK_START_HOUR)
+    assert reason.startswith("low priority")
+    assert app.schedule_decision(5, "Low", "user", 100, 50, now=LATE) == (None, "")
+
+
+def test_queued_jobs_are_claimed_once(job_store_path):
+    for n in range(3):
+        app.enqueue_job("user", "Normal", 1.0, {"script": str(n)}, NOON, "deferred")
+    queue = app.queued_jobs("user")
+    first = app.claim_queued_jobs(queue[:2])
+    second = app.claim_queued_jobs(queue)
+    assert [item["request"]["script"] for item in first] == ["0", "1"]
+    assert [item["request"]["script"] for item in second] == ["2"]
+    assert app.queued_jobs("user") == []
@@ -0,0 +1,65 @@
+import time
+
+import app
+
+ACTORS = [
+    {"id": "anna-studio", "name": "Anna Studio"},
+    {"id": "ben-office", "name": "Ben Office"},
+    {"id": "annabelle", "name": "Annabelle Park"},
+    {"id": "carl", "name": "Carl"},
+]
+
+
+def _no_network(*args, **kwargs):
+    raise AssertionError("the catalog was fetched")
+
+
+def test_get_is_case_insensitive():
+    index = app.CatalogIndex(ACTORS)
+    assert len(index) == 4
+    assert index.get(" ANNA-Studio ")["id"] == "anna-studio"
+    assert index.get("anna") is None
+
+
+def test_search_matches_prefixes_of_ids_names_and_words():
+    index = app.CatalogIndex(ACTORS)
+    assert [item["id"] for item in index.search("ann")] == ["anna-studio", "annabelle"]
+    assert [item["id"] for item in index.search("park")] == ["annabelle"]
+    assert [item["id"] for item in index.search("ann", limit=1)] == ["anna-studio"]
+    assert index.search("  ") == []
+
+
+def test_search_falls_back_to_fuzzy_matches():
+    index = app.CatalogIndex(ACTORS)
+    assert [item["id"] for item in index.search("ofice")] == ["ben-office"]
+    assert index.search("zzzz") == []
+
+
+def test_parse_catalog_items_accepts_common_shapes():
+    assert app.parse_catalog_items({"data": [{"actorId": 7, "displayName": "Seven"}]}) == [
+        {"id": "7", "name": "Seven"}
+    ]
+    assert app.parse_catalog_items([{"id": "x"}, {"name": "no id"}, "junk"]) == [{"id": "x", "name": "x"}]
+    assert app.parse_catalog_items({"unexpected": True}) == []
+
+
+def test_resolve_catalog_ids_uses_catalog_spelling_and_suggests(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CATALOG_DIR", str(tmp_path))
+    now = time.time()
+    app._save_catalog(app._catalog_path("actors", "key"), {"items": ACTORS, "fetched_at": now, "failed_at": 0})
+    app._save_catalog(
+        app._catalog_path("voices", "key"),
+        {"items": [{"id": "Warm-1", "name": "Warm"}], "fetched_at": now, "failed_at": 0},
+    )
+
+    assert app.resolve_catalog_ids("key", "ANNA-STUDIO", "warm-1") == ("anna-studio", "Warm-1", [])
+
+    actor, voice, problems = app.resolve_catalog_ids("key", "anna", "warm-1")
+    assert (actor, voice) == ("anna", "Warm-1")
+    assert problems == ["Unknown Actor ID 'anna' - did you mean `anna-studio`, `annabelle`?"]
+
+
+def test_catalog_index_without_refresh_never_fetches(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CATALOG_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "fetch_catalog", _no_network)
+    assert app.catalog_index("other-key", "actors", refresh=False) is None
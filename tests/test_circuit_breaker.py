@@ -0,0 +1,111 @@
+import pytest
+import requests
+
+import app
+
+
+def _tripped(endpoint="generate"):
+    breaker = app.CircuitBreaker(endpoint)
+    for _ in range(app.HEALTH_MIN_REQUESTS):
+        assert breaker.acquire() is None
+        breaker.record(False, 0.1, "HTTP 503")
+    return breaker
+
+
+def _cool_down(breaker):
+    breaker.opened_at -= app.BREAKER_OPEN_SECONDS + 1
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """A transport with its own health registry, answering with canned outcomes."""
+
+    def __init__(self, *outcomes):
+        self.health = app.HealthRegistry()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def test_breaker_waits_for_enough_requests_before_opening():
+    breaker = app.CircuitBreaker("generate")
+    for _ in range(app.HEALTH_MIN_REQUESTS - 1):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert 0 < breaker.acquire() <= app.BREAKER_OPEN_SECONDS
+
+
+def test_breaker_stays_closed_below_the_error_rate():
+    breaker = app.CircuitBreaker("generate")
+    for n in range(app.HEALTH_MIN_REQUESTS * 2):
+        breaker.record(n % 3 != 2, 0.1)  # one failure in three
+    assert breaker.state == "closed"
+
+
+def test_successful_probe_closes_the_breaker():
+    breaker = _tripped()
+    _cool_down(breaker)
+    assert breaker.acquire() is None
+    assert breaker.state == "half-open"
+    assert breaker.acquire() is not None  # only one probe at a time
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["requests"] == 0
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = _tripped()
+    _cool_down(breaker)
+    assert breaker.acquire() is None
+    breaker.record(False, 0.1, "HTTP 500")
+    assert breaker.state == "open"
+    assert breaker.is_open()
+
+
+def test_released_probe_lets_the_next_call_through():
+    breaker = _tripped()
+    _cool_down(breaker)
+    assert breaker.acquire() is None
+    breaker.release()
+    assert breaker.acquire() is None
+
+
+def test_slow_successes_count_as_failures():
+    breaker = app.CircuitBreaker("status")
+    breaker.record(True, app.BREAKER_SLOW_SECONDS + 1)
+    snapshot = breaker.snapshot()
+    assert snapshot["error_rate"] == 1.0
+    assert snapshot["last_error"].startswith("slow response")
+
+
+def test_send_request_counts_server_errors_and_exceptions():
+    http = FakeSession(503, requests.ConnectionError(), 200)
+    assert app.send_request(http, "POST", app.PIPIO_GENERATE_URL).status_code == 503
+    with pytest.raises(requests.ConnectionError):
+        app.send_request(http, "POST", app.PIPIO_GENERATE_URL)
+    app.send_request(http, "POST", app.PIPIO_GENERATE_URL)
+    snapshot = http.health.snapshot()[0]
+    assert snapshot["endpoint"] == "generate"
+    assert snapshot["requests"] == 3
+    assert snapshot["last_error"] == "ConnectionError"
+
+
+def test_send_request_refuses_calls_while_open():
+    http = FakeSession(*[503] * app.HEALTH_MIN_REQUESTS)
+    for _ in range(app.HEALTH_MIN_REQUESTS):
+        app.send_request(http, "POST", app.PIPIO_GENERATE_URL)
+    with pytest.raises(app.CircuitOpenError):
+        app.send_request(http, "POST", app.PIPIO_GENERATE_URL)
+    assert http.calls == app.HEALTH_MIN_REQUESTS
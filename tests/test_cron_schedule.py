@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+import app
+
+MONDAY = datetime(2024, 1, 1, 9, 0, 30)
+
+
+def test_parse_expands_fields():
+    cron = app.CronSchedule.parse("*/15 9-17 1,15 * 1-5")
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.hours == set(range(9, 18))
+    assert cron.days == {1, 15}
+    assert cron.months == set(range(1, 13))
+    assert cron.weekdays == {1, 2, 3, 4, 5}
+    assert not cron.any_day and not cron.any_weekday
+
+
+def test_parse_accepts_macros_and_sunday_as_seven():
+    assert app.CronSchedule.parse(" @Daily ").next_after(MONDAY) == datetime(2024, 1, 2, 0, 0)
+    assert app.CronSchedule.parse("0 0 * * 7").weekdays == {0}
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["* * * *", "60 * * * *", "x * * * *", "*/0 * * * *", "0 0 0 * *", "0 0 * 13 *", "0 0 5-1 * *"],
+)
+def test_parse_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        app.CronSchedule.parse(expression)
+
+
+def test_next_after_is_strictly_later():
+    cron = app.CronSchedule.parse("0 9 * * *")
+    assert cron.next_after(datetime(2024, 1, 1, 8, 59)) == datetime(2024, 1, 1, 9, 0)
+    assert cron.next_after(MONDAY) == datetime(2024, 1, 2, 9, 0)
+
+
+def test_next_after_skips_to_matching_weekdays_and_months():
+    weekdays = app.CronSchedule.parse("0 9 * * 1-5")
+    assert weekdays.next_after(datetime(2024, 1, 5, 10, 0)) == datetime(2024, 1, 8, 9, 0)
+    monthly = app.CronSchedule.parse("@monthly")
+    assert monthly.next_after(datetime(2024, 1, 31, 23, 59)) == datetime(2024, 2, 1, 0, 0)
+    assert app.CronSchedule.parse("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+
+
+def test_restricted_day_fields_match_either_day():
+    cron = app.CronSchedule.parse("0 0 13 * 5")
+    assert cron.upcoming(MONDAY) == [datetime(2024, 1, 5), datetime(2024, 1, 12), datetime(2024, 1, 13)]
+
+
+def test_next_after_raises_for_dates_that_never_come():
+    with pytest.raises(ValueError, match="never fires"):
+        app.CronSchedule.parse("0 0 30 2 *").next_after(MONDAY)
+
+
+def test_upcoming_lists_the_next_runs():
+    runs = app.CronSchedule.parse("@hourly").upcoming(MONDAY, count=3)
+    assert runs == [datetime(2024, 1, 1, hour) for hour in (10, 11, 12)]
+
+
+def test_render_schedule_script_fills_run_fields():
+    script = app.render_schedule_script("{weekday} {date} at {time}, run {run} in {month}", MONDAY, 4)
+    assert script == "Monday 2024-01-01 at 09:00, run 4 in January"
+    with pytest.raises(ValueError, match="Unknown placeholders"):
+        app.render_schedule_script("Hi {name}", MONDAY, 1)
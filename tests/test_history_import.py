@@ -0,0 +1,85 @@
+import io
+import json
+
+import app
+
+
+def _file(records, jsonl=False):
+    if jsonl:
+        return io.BytesIO("\n".join(json.dumps(r) for r in records).encode("utf-8"))
+    return io.BytesIO(json.dumps(records).encode("utf-8"))
+
+
+def test_fingerprint_uses_job_id_when_present():
+    assert app.job_fingerprint({"job_id": "abc", "script": "one"}) == "id:abc"
+    assert app.job_fingerprint({"job_id": "abc", "script": "two"}) == "id:abc"
+
+
+def test_fingerprint_hashes_content_without_job_id():
+    job = {"job_id": "N/A", "timestamp": "2024-01-01 00:00:00", "status": "failed", "script": "hi"}
+    fingerprint = app.job_fingerprint(job)
+    assert fingerprint.startswith("sha1:")
+    assert app.job_fingerprint(dict(job)) == fingerprint
+    assert app.job_fingerprint({**job, "script": "bye"}) != fingerprint
+
+
+def test_normalize_rejects_unusable_records():
+    assert app.normalize_job_record(["not", "a", "dict"]) is None
+    assert app.normalize_job_record({"unrelated": 1}) is None
+
+
+def test_normalize_fills_history_fields():
+    job = app.normalize_job_record({"job_id": 7, "video_url": 42, "custom": "kept"})
+    assert job["job_id"] == "7"
+    assert job["status"] == "unknown"
+    assert job["script"] == ""
+    assert job["video_url"] is None
+    assert job["actor_id"] == "" and job["voice_id"] == ""
+    assert job["timestamp"]
+    assert job["custom"] == "kept"
+
+
+def test_iter_json_records_reads_arrays_lines_and_wrapped_jobs():
+    records = [{"job_id": str(i), "script": "x" * 50} for i in range(20)]
+    assert list(app.iter_json_records(_file(records), chunk_size=16)) == records
+    assert list(app.iter_json_records(_file(records, jsonl=True), chunk_size=16)) == records
+    assert list(app.iter_json_records(_file({"jobs": records}), chunk_size=16)) == records
+
+
+def test_import_skips_duplicates_and_reads_config(job_store_path):
+    records = [{"job_id": "a"}, {"job_id": "a"}, {"job_id": "b"}, "junk", {"max_poll_seconds": "120"}]
+    stats = app.import_history_file(_file(records), "owner-a")
+    assert stats["jobs"] == 3
+    assert stats["imported"] == 2
+    assert stats["duplicates"] == 1
+    assert stats["invalid"] == 1
+    assert stats["config"] == {"max_poll_seconds": 120}
+    assert app.count_stored_jobs("owner-a") == 2
+
+
+def test_import_of_the_same_file_by_two_owners(job_store_path):
+    records = [{"job_id": "abc", "status": "completed"}]
+    assert app.import_history_file(_file(records), "owner-a")["imported"] == 1
+
+    stats = app.import_history_file(_file(records), "owner-b")
+    assert stats["imported"] == 1
+    assert stats["duplicates"] == 0
+    assert [job["job_id"] for job in app.load_recent_jobs("owner-b")] == ["abc"]
+    assert [job["owner"] for job in app.load_recent_jobs("owner-a")] == ["owner-a"]
+
+
+def test_replacing_a_job_keeps_other_owners_rows(job_store_path):
+    app.store_jobs([{"job_id": "abc", "status": "completed", "owner": "owner-a"}])
+    app.store_jobs([{"job_id": "abc", "status": "failed", "owner": "owner-b"}], replace=True)
+    assert app.load_recent_jobs("owner-a")[0]["status"] == "completed"
+    assert app.load_recent_jobs("owner-b")[0]["status"] == "failed"
+
+
+def test_import_saves_presets_after_batched_jobs(job_store_path):
+    settings = {"actor_id": "actor", "voice_id": "voice", "resolution": "720p"}
+    records = [{"job_id": str(i)} for i in range(3)] + [{"presets": [{"name": "Promo", "settings": settings}]}]
+    stats = app.import_history_file(_file(records, jsonl=True), "owner-a", batch_size=2)
+    assert stats["imported"] == 3
+    assert stats["presets"] == 1
+    assert app.load_presets("owner-a")["promo"]["settings"]["resolution"] == "720p"
+    assert app.load_presets("owner-b") == {}
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(app.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_paces_requests(clock):
+    bucket = app.TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(0.5)]
+    assert bucket.granted == 4
+    assert bucket.waited == pytest.approx(0.5)
+
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    bucket = app.TokenBucket(rate=1.0, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.slept == []
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_configure_clamps_saved_tokens(clock):
+    bucket = app.TokenBucket(rate=1.0, capacity=5)
+    bucket.configure(rate=1.0, capacity=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_least_loaded_policy_spreads_jobs():
+    registry = app.ApiKeyRegistry()
+    keys = ["key-a", "key-b"]
+    for key in keys:
+        registry.register(key, max_concurrency=2)
+    first = registry.acquire(keys)
+    second = registry.acquire(keys)
+    assert {first.api_key, second.api_key} == set(keys)
+
+
+def test_round_robin_policy_cycles_through_keys():
+    registry = app.ApiKeyRegistry()
+    keys = ["key-a", "key-b", "key-c"]
+    for key in keys:
+        registry.register(key, max_concurrency=5)
+    picked = [registry.acquire(keys, "round-robin").api_key for _ in range(4)]
+    assert picked == ["key-a", "key-b", "key-c", "key-a"]
+
+
+def test_acquire_waits_for_a_free_slot():
+    registry = app.ApiKeyRegistry()
+    state = registry.register("key-a", max_concurrency=1)
+    registry.acquire(["key-a"])
+
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (registry.acquire(["key-a"]), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    registry.release(state, ok=True)
+    assert acquired.wait(2)
+    waiter.join()
+    assert state.jobs == 2 and state.completed == 1
+
+
+def test_acquire_without_registered_keys_fails():
+    with pytest.raises(KeyError):
+        app.ApiKeyRegistry().acquire(["unknown"])
+
+
+def test_register_updates_limits_of_a_known_key():
+    registry = app.ApiKeyRegistry()
+    state = registry.register("key-a", max_concurrency=1)
+    assert registry.register("key-a", max_concurrency=3) is state
+    assert state.max_concurrency == 3
+    assert registry.snapshot(["key-a"])[0]["in flight"] == "0/3"
@@ -0,0 +1,46 @@
+import app
+
+
+def _masters(plan):
+    return [(master["aspect_ratio"], master["resolution"]) for master in plan]
+
+
+def test_frame_size_names_the_short_side():
+    assert app.frame_size("16:9", "1080p") == (1920, 1080)
+    assert app.frame_size("9:16", "720p") == (720, 1280)
+    assert app.frame_size("1:1", "480p") == (480, 480)
+    assert app.frame_size("4:3", "720p") == (960, 720)
+
+
+def test_can_derive_crops_and_scales_down_only():
+    assert app.can_derive(("16:9", "1080p"), ("16:9", "720p"))
+    assert app.can_derive(("16:9", "1080p"), ("9:16", "480p"))
+    assert not app.can_derive(("16:9", "1080p"), ("9:16", "1080p"))
+    assert not app.can_derive(("16:9", "720p"), ("16:9", "1080p"))
+
+
+def test_single_target_is_its_own_master():
+    assert app.plan_renditions([("16:9", "1080p")]) == [{"aspect_ratio": "16:9", "resolution": "1080p", "derived": []}]
+
+
+def test_smaller_sizes_are_derived_from_one_render():
+    plan = app.plan_renditions([("16:9", "1080p"), ("16:9", "720p")])
+    assert plan == [{"aspect_ratio": "16:9", "resolution": "1080p", "derived": [("16:9", "720p")]}]
+
+
+def test_full_size_shapes_each_need_their_own_render():
+    plan = app.plan_renditions([("16:9", "1080p"), ("9:16", "1080p")])
+    assert _masters(plan) == [("16:9", "1080p"), ("9:16", "1080p")]
+    assert all(master["derived"] == [] for master in plan)
+
+
+def test_one_larger_master_can_cover_every_target():
+    targets = [("16:9", "720p"), ("1:1", "480p"), ("9:16", "480p")]
+    plan = app.plan_renditions(targets)
+    assert _masters(plan) == [("16:9", "1080p")]
+    assert plan[0]["derived"] == targets
+
+
+def test_duplicate_and_empty_targets():
+    assert _masters(app.plan_renditions([("1:1", "480p"), ("1:1", "480p")])) == [("1:1", "480p")]
+    assert app.plan_renditions([]) == []
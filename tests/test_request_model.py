@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import app
+
+
+def _problems(**kwargs):
+    args = {"actor_id": "actor", "voice_id": "voice", "script": "Hello there."}
+    args.update(kwargs)
+    with pytest.raises(app.PayloadValidationError) as excinfo:
+        app.GenerationRequest.build(**args)
+    return excinfo.value.problems
+
+
+def test_build_normalizes_inputs():
+    request = app.GenerationRequest.build(
+        " actor ", "voice", "Hello  \r\nworld  \n", aspect_ratio="9 x 16", resolution="720", fps="30fps",
+        extras={"pitch": 1.2345, "captions": True, "backgroundColor": "0f0", "backgroundBlur": 10.0},
+    )
+    assert request.actor_id == "actor"
+    assert request.script == "Hello\nworld"
+    assert request.aspect_ratio == "9:16"
+    assert request.resolution == "720p"
+    assert request.fps == 30
+    assert request.extras == {"pitch": 1.234, "captions": True, "backgroundColor": "#00FF00", "backgroundBlur": 10}
+
+
+def test_build_drops_unset_options():
+    request = app.GenerationRequest.build("actor", "voice", "Hi", extras={"captions": False, "pitch": None})
+    assert request.to_payload() == {"actorId": "actor", "voiceId": "voice", "script": "Hi"}
+
+
+def test_build_reports_every_problem_at_once():
+    problems = _problems(actor_id="", voice_id="two words", script=" ", aspect_ratio="2:1", resolution="4k", fps=25)
+    assert len(problems) == 6
+    assert "Actor ID is required" in problems
+    assert "Script cannot be empty" in problems
+
+
+@pytest.mark.parametrize(
+    "extras, expected",
+    [
+        ({"pitch": 3}, "pitch must be between 0.5 and 2.0 (got 3)"),
+        ({"pitch": True}, "pitch must be a number"),
+        ({"captions": "yes"}, "captions must be true or false"),
+        ({"backgroundColor": "green"}, "backgroundColor must be a hex color like #00FF41"),
+        ({"sparkles": 1}, "Unknown option 'sparkles'"),
+    ],
+)
+def test_build_rejects_bad_extras(extras, expected):
+    assert _problems(extras=extras) == [expected]
+
+
+def test_build_limits_script_and_id_length():
+    assert _problems(script="x" * (app.MAX_SCRIPT_CHARS + 1))[0].startswith("Script is")
+    assert _problems(actor_id="a" * (app.MAX_ID_LENGTH + 1))[0].startswith("Actor ID must be")
+
+
+def test_build_rejects_unfilled_placeholders():
+    problems = _problems(script="Hi {first_name}, meet {company} and {first_name}")
+    assert problems[0].startswith("Script has unfilled placeholders {first_name}, {company}")
+
+
+def test_canonical_json_and_fingerprint_ignore_input_order():
+    one = app.GenerationRequest.build("a", "v", "Hi", extras={"pitch": 1.1, "volume": 0.5})
+    two = app.GenerationRequest.build("a", "v", "Hi", extras={"volume": 0.5, "pitch": 1.1})
+    assert one.to_json() == two.to_json()
+    assert one.fingerprint() == two.fingerprint()
+    assert list(json.loads(one.to_json())) == sorted(json.loads(one.to_json()))